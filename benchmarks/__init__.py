@@ -0,0 +1,32 @@
+"""
+Performance benchmarks for the cinema API.
+
+Each module can be run on its own, e.g. ``python -m benchmarks.throttling``.
+They use ``benchmarks.settings`` and a throwaway SQLite database unless
+``DJANGO_SETTINGS_MODULE`` points elsewhere.
+"""
+import os
+
+
+def setup_django():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+
+    import django
+
+    django.setup()
+
+
+def setup_database():
+    """Bring the benchmark database schema (and seed data) up to date"""
+    from django.conf import settings
+    from django.core.management import call_command
+
+    from cinema.models import Movie
+
+    call_command("migrate", verbosity=0)
+    if not Movie.objects.exists():
+        call_command(
+            "bulk_load",
+            str(settings.BASE_DIR / "fixture_data.json"),
+            verbosity=0,
+        )
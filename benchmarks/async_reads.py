@@ -0,0 +1,140 @@
+"""
+Throughput and latency of the catalog read endpoints under uvicorn with
+sync DRF viewsets versus the native async views (``ASYNC_READ_VIEWS``).
+
+Every request opens its own connection, and up to ``--connections`` of
+them are in flight at once. Requires ``uvicorn`` to be installed.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks import setup_database, setup_django
+
+HOST = "127.0.0.1"
+PATHS = (
+    "/api/cinema/movies/",
+    "/api/cinema/movies/1/",
+    "/api/cinema/movie_sessions/",
+    "/api/cinema/movie_sessions/1/",
+    "/api/cinema/movie_sessions/1/seat-map/",
+)
+
+
+def get_token():
+    from django.contrib.auth import get_user_model
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    user, _ = get_user_model().objects.get_or_create(
+        email="benchmark@cinema.local"
+    )
+    return str(AccessToken.for_user(user))
+
+
+def start_server(port, async_reads):
+    env = {
+        **os.environ,
+        "ASYNC_READ_VIEWS": str(async_reads).lower(),
+    }
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "cinema_api.asgi:application",
+            "--host", HOST, "--port", str(port),
+            "--log-level", "warning", "--backlog", "4096",
+        ],
+        env=env,
+    )
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((HOST, port), timeout=1).close()
+            return server
+        except OSError:
+            time.sleep(0.1)
+
+    server.kill()
+    raise RuntimeError("uvicorn did not start")
+
+
+async def fetch(port, path, token):
+    started = time.perf_counter()
+    reader, writer = await asyncio.open_connection(HOST, port)
+    writer.write(
+        f"GET {path} HTTP/1.1\r\n"
+        f"Host: {HOST}\r\n"
+        f"Authorization: Bearer {token}\r\n"
+        "Connection: close\r\n\r\n".encode()
+    )
+    await writer.drain()
+
+    status_line = await reader.readline()
+    await reader.read()
+    writer.close()
+
+    return int(status_line.split()[1]), time.perf_counter() - started
+
+
+async def load(port, token, connections, requests):
+    semaphore = asyncio.Semaphore(connections)
+
+    async def one(i):
+        async with semaphore:
+            try:
+                return await fetch(port, PATHS[i % len(PATHS)], token)
+            except OSError:
+                return None, None
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for code, latency in results if code == 200)
+    errors = sum(1 for code, _ in results if code != 200)
+
+    return elapsed, latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--connections", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    setup_django()
+    setup_database()
+    token = get_token()
+
+    print(
+        f"{'mode':>6} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}"
+    )
+    for async_reads in (False, True):
+        server = start_server(args.port, async_reads)
+        try:
+            elapsed, latencies, errors = asyncio.run(
+                load(args.port, token, args.connections, args.requests)
+            )
+        finally:
+            server.terminate()
+            server.wait()
+
+        p50 = p99 = 0
+        if latencies:
+            p50 = statistics.median(latencies) * 1000
+            p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+
+        print(
+            f"{'async' if async_reads else 'sync':>6} "
+            f"{args.requests / elapsed:>9.0f} {p50:>9.1f} {p99:>9.1f} "
+            f"{errors:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
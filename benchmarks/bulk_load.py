@@ -0,0 +1,125 @@
+"""
+Time and peak memory of ``loaddata`` versus ``bulk_load`` on a generated
+data set of ``--tickets`` tickets (plus the sessions, orders and user
+they belong to). Each load runs in its own process on a fresh database.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SEATS = 100
+
+
+def generate(tickets):
+    """Yield fixture objects in dependency order"""
+    yield {
+        "model": "user.user",
+        "pk": 1,
+        "fields": {"email": "benchmark@cinema.local", "password": "!"},
+    }
+    yield {
+        "model": "cinema.cinemahall",
+        "pk": 1,
+        "fields": {"name": "Benchmark", "rows": SEATS, "seats_in_row": SEATS},
+    }
+    yield {
+        "model": "cinema.movie",
+        "pk": 1,
+        "fields": {"title": "Benchmark", "description": "", "duration": 90},
+    }
+
+    sessions = tickets // SEATS ** 2 + 1
+    for session in range(1, sessions + 1):
+        yield {
+            "model": "cinema.moviesession",
+            "pk": session,
+            "fields": {
+                "show_time": "2030-01-01T00:00:00Z",
+                "movie": 1,
+                "cinema_hall": 1,
+            },
+        }
+    for order in range(1, tickets // 4 + 2):
+        yield {
+            "model": "cinema.order",
+            "pk": order,
+            "fields": {"created_at": "2030-01-01T00:00:00Z", "user": 1},
+        }
+    for ticket in range(tickets):
+        session, place = divmod(ticket, SEATS ** 2)
+        yield {
+            "model": "cinema.ticket",
+            "pk": ticket + 1,
+            "fields": {
+                "movie_session": session + 1,
+                "order": ticket // 4 + 1,
+                "row": place // SEATS + 1,
+                "seat": place % SEATS + 1,
+            },
+        }
+
+
+def write_files(directory, tickets):
+    json_path = directory / "benchmark.json"
+    ndjson_path = directory / "benchmark.ndjson"
+
+    with open(json_path, "w") as array, open(ndjson_path, "w") as lines:
+        array.write("[\n")
+        for index, obj in enumerate(generate(tickets)):
+            line = json.dumps(obj)
+            array.write(("," if index else "") + line + "\n")
+            lines.write(line + "\n")
+        array.write("]\n")
+
+    return json_path, ndjson_path
+
+
+def run(directory, name, command):
+    """Load into a fresh database, return (seconds, peak RSS in MB)"""
+    env = {
+        **os.environ,
+        "DJANGO_SETTINGS_MODULE": "benchmarks.settings",
+        "BENCHMARK_DB": str(directory / f"{name}.sqlite3"),
+    }
+    manage = [sys.executable, "manage.py"]
+    subprocess.run([*manage, "migrate", "-v0"], env=env, check=True)
+
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [*manage, *command], env=env, stdout=subprocess.DEVNULL
+    )
+    _, status, usage = os.wait4(process.pid, 0)
+    elapsed = time.perf_counter() - started
+    if status:
+        raise RuntimeError(f"{name} failed")
+
+    # ru_maxrss is in kilobytes on Linux
+    return elapsed, usage.ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tickets", type=int, default=200000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = Path(tmp)
+        json_path, ndjson_path = write_files(directory, args.tickets)
+
+        print(f"{'command':>20} {'seconds':>9} {'peak MB':>9}")
+        for name, command in (
+            ("loaddata", ["loaddata", str(json_path)]),
+            ("bulk_load json", ["bulk_load", str(json_path)]),
+            ("bulk_load ndjson", ["bulk_load", str(ndjson_path)]),
+        ):
+            elapsed, peak = run(directory, name.replace(" ", "_"), command)
+            print(f"{name:>20} {elapsed:>9.1f} {peak:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
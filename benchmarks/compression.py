@@ -0,0 +1,118 @@
+"""
+CPU time versus bytes on the wire for each response encoding.
+
+For a few catalog responses this prints the body size per encoding, the
+CPU time of compressing it (what every request would pay without the
+cache), the time of a cache hit in ``CompressionMiddleware`` (a body
+digest and a lookup), and the time the body takes to transfer at
+``--mbps``. ``--movies`` movies are added to the benchmark database
+first so that the lists are production-sized.
+"""
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+
+from benchmarks import setup_database, setup_django
+
+PATHS = (
+    "/api/cinema/movies/",
+    "/api/cinema/movie_sessions/",
+    "/api/cinema/movie_sessions/1/",
+)
+
+
+def seed(movies):
+    from cinema.models import Actor, CinemaHall, Genre, Movie, MovieSession
+
+    missing = movies - Movie.objects.count()
+    if missing <= 0:
+        return
+
+    genres = list(Genre.objects.all()[:3])
+    actors = list(Actor.objects.all()[:5])
+    halls = list(CinemaHall.objects.all())
+    created = Movie.objects.bulk_create(
+        Movie(
+            title=f"Benchmark movie {number}",
+            description="A benchmark movie. " * 20,
+            duration=120,
+        )
+        for number in range(missing)
+    )
+    for movie in created:
+        movie.genres.set(genres)
+        movie.actors.set(actors)
+
+    start = datetime(2031, 1, 1, tzinfo=timezone.utc)
+    MovieSession.objects.bulk_create(
+        MovieSession(
+            show_time=start + timedelta(hours=3 * (number // len(halls))),
+            movie=movie,
+            cinema_hall=halls[number % len(halls)],
+        )
+        for number, movie in enumerate(created)
+    )
+
+
+def timed(function, body, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        result = function(body)
+    return result, (time.perf_counter() - started) / iterations * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--movies", type=int, default=1000)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--mbps", type=float, default=10.0)
+    args = parser.parse_args()
+
+    setup_django()
+    setup_database()
+    seed(args.movies)
+
+    from django.core.cache import cache
+    from django.test import Client
+    from django.test.client import RequestFactory
+
+    from benchmarks.async_reads import get_token
+    from cinema_api.compression import ENCODERS, cache_key
+
+    client = Client(
+        HTTP_HOST="localhost", HTTP_AUTHORIZATION=f"Bearer {get_token()}"
+    )
+    request = RequestFactory().get("/")
+
+    print(
+        f"{'path':<32} {'encoding':>8} {'bytes':>9} {'ratio':>6} "
+        f"{'cpu ms':>8} {'hit ms':>7} {'wire ms':>8}"
+    )
+    for path in PATHS:
+        response = client.get(path)
+        body = response.content
+        wire = len(body) * 8 / (args.mbps * 1000)
+        print(
+            f"{path:<32} {'identity':>8} {len(body):>9} {1:>6.1f} "
+            f"{0:>8.2f} {0:>7.2f} {wire:>8.1f}"
+        )
+
+        for encoding, encoder in ENCODERS.items():
+            compressed, cpu = timed(encoder, body, args.iterations)
+            key = cache_key(request, response, encoding)
+            cache.set(key, compressed)
+            _, hit = timed(
+                lambda body: cache.get(cache_key(request, response, encoding)),
+                body,
+                args.iterations,
+            )
+            wire = len(compressed) * 8 / (args.mbps * 1000)
+            print(
+                f"{path:<32} {encoding:>8} {len(compressed):>9} "
+                f"{len(body) / len(compressed):>6.1f} {cpu:>8.2f} "
+                f"{hit:>7.2f} {wire:>8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
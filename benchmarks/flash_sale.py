@@ -0,0 +1,167 @@
+"""
+Orders per second for one hot session, created synchronously versus
+through the booking queue (``cinema.booking``).
+
+``--clients`` processes post ``--orders`` orders of ``--tickets`` seats
+each for the same session at once, like an on-sale opening. In the
+synchronous mode every order is its own transaction; in the queued mode
+the orders are queued and a committer process books them in batches of
+``--batch-size``, and the clock stops once the last one is booked.
+
+SQLite lets one transaction write at a time whatever the mode, so run
+against PostgreSQL (``DJANGO_SETTINGS_MODULE`` with a ``POSTGRES_HOST``)
+to see the lock contention the queue avoids.
+"""
+import argparse
+import multiprocessing
+import time
+
+from benchmarks import setup_database, setup_django
+
+SEATS_IN_ROW = 100
+
+
+def create_session(orders, tickets, queued_booking):
+    from cinema.models import CinemaHall, Movie, MovieSession
+
+    hall = CinemaHall.objects.create(
+        name="Flash sale",
+        rows=-(-orders * tickets // SEATS_IN_ROW),
+        seats_in_row=SEATS_IN_ROW,
+    )
+    return MovieSession.objects.create(
+        show_time="2031-01-01T20:00:00Z",
+        movie=Movie.objects.first(),
+        cinema_hall=hall,
+        queued_booking=queued_booking,
+    )
+
+
+def post_orders(movie_session_id, places, tickets):
+    """Client process: post orders for ``places``. Returns the errors"""
+    from django.contrib.auth import get_user_model
+    from django.db import connections
+    from rest_framework.test import APIClient
+
+    client = APIClient(SERVER_NAME="localhost")
+    client.force_authenticate(
+        get_user_model().objects.get(email="benchmark@cinema.local")
+    )
+    errors = 0
+    for start in range(0, len(places), tickets):
+        response = client.post(
+            "/api/cinema/orders/",
+            {
+                "tickets": [
+                    {
+                        "row": row,
+                        "seat": seat,
+                        "movie_session": movie_session_id,
+                    }
+                    for row, seat in places[start:start + tickets]
+                ]
+            },
+            format="json",
+        )
+        errors += response.status_code not in (201, 202)
+
+    connections.close_all()
+    return errors
+
+
+def commit(movie_session_id, batch_size, intake_done):
+    """Committer process: book queued orders until intake is done"""
+    from django.db import connections
+
+    from cinema.booking import commit_batch
+
+    while True:
+        # check before committing, so the last orders aren't left over
+        done = intake_done.is_set()
+        if not commit_batch(movie_session_id, batch_size):
+            if done:
+                break
+            time.sleep(0.01)
+
+    connections.close_all()
+
+
+def run(args, queued_booking):
+    from django.db import connections
+
+    movie_session = create_session(args.orders, args.tickets, queued_booking)
+    hall = movie_session.cinema_hall
+    places = [
+        (row, seat)
+        for row in range(1, hall.rows + 1)
+        for seat in range(1, hall.seats_in_row + 1)
+    ][:args.orders * args.tickets]
+    # clients take turns at the orders, all of them in the same rows
+    shares = [
+        [
+            place
+            for index in range(0, len(places), args.clients * args.tickets)
+            for place in places[
+                index + client * args.tickets:
+                index + (client + 1) * args.tickets
+            ]
+        ]
+        for client in range(args.clients)
+    ]
+
+    connections.close_all()
+    intake_done = multiprocessing.Event()
+    committer = multiprocessing.Process(
+        target=commit,
+        args=(movie_session.id, args.batch_size, intake_done),
+    )
+
+    with multiprocessing.Pool(args.clients) as pool:
+        started = time.perf_counter()
+        if queued_booking:
+            committer.start()
+        errors = sum(
+            pool.starmap(
+                post_orders,
+                [(movie_session.id, share, args.tickets) for share in shares],
+            )
+        )
+        intake = time.perf_counter() - started
+        intake_done.set()
+        if queued_booking:
+            committer.join()
+        elapsed = time.perf_counter() - started
+
+    return intake, elapsed, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--tickets", type=int, default=2)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    setup_django()
+    setup_database()
+
+    from django.contrib.auth import get_user_model
+
+    get_user_model().objects.get_or_create(email="benchmark@cinema.local")
+
+    print(
+        f"{'mode':>7} {'intake s':>9} {'booked s':>9} "
+        f"{'orders/s':>9} {'errors':>7}"
+    )
+    for queued_booking in (False, True):
+        intake, elapsed, errors = run(args, queued_booking)
+        print(
+            f"{'queued' if queued_booking else 'sync':>7} "
+            f"{intake:>9.2f} {elapsed:>9.2f} "
+            f"{args.orders / elapsed:>9.0f} {errors:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
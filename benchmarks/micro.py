@@ -0,0 +1,320 @@
+"""
+Microbenchmarks of the serializers, validators and querysets on the hot
+read and order paths.
+
+Every case runs at each of ``--sizes`` rows (movies, sessions and orders,
+two tickets each) of synthetic data and reports operations per second,
+an operation being a pass over all the rows: serializing them,
+validating their tickets or evaluating the view's queryset (100k rows
+take minutes). Querysets are planned by the viewsets themselves, so the
+cases follow the query planner and the sparse fieldsets. One untimed
+pass runs under ``tracemalloc`` first for the peak memory allocated.
+
+Results are compared against a stored baseline, and cases that got
+slower or hungrier than ``--tolerance`` are flagged. ``manage.py
+run_benchmarks`` runs the suite on a throwaway test database, e.g.:
+
+    python manage.py run_benchmarks --sizes 10,1000 --save-baseline
+    python manage.py run_benchmarks --sizes 10,1000
+"""
+import json
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+HALLS = 20
+CHUNK_SIZE = 2000
+
+
+def seed(size):
+    """Top the synthetic data up to ``size`` movies, sessions and orders"""
+    from django.contrib.auth import get_user_model
+
+    from cinema.models import (
+        Actor,
+        CinemaHall,
+        Genre,
+        Movie,
+        MovieSession,
+        Order,
+        Ticket,
+    )
+
+    user, _ = get_user_model().objects.get_or_create(
+        email="benchmark@cinema.com"
+    )
+    if not CinemaHall.objects.exists():
+        Genre.objects.bulk_create(
+            Genre(name=f"Genre {number}") for number in range(3)
+        )
+        Actor.objects.bulk_create(
+            Actor(first_name="Actor", last_name=str(number))
+            for number in range(5)
+        )
+        CinemaHall.objects.bulk_create(
+            CinemaHall(name=f"Hall {number}", rows=20, seats_in_row=20)
+            for number in range(HALLS)
+        )
+
+    existing = Movie.objects.count()
+    if existing >= size:
+        return user
+
+    genres = list(Genre.objects.all())
+    actors = list(Actor.objects.all())
+    halls = list(CinemaHall.objects.all())
+    start = datetime(2031, 1, 1, tzinfo=timezone.utc)
+    numbers = range(existing, size)
+
+    movies = Movie.objects.bulk_create(
+        (
+            Movie(
+                title=f"Benchmark movie {number}",
+                description="A benchmark movie. " * 20,
+                duration=120,
+            )
+            for number in numbers
+        ),
+        batch_size=CHUNK_SIZE,
+    )
+    Movie.genres.through.objects.bulk_create(
+        (
+            Movie.genres.through(
+                movie_id=movie.id, genre_id=genres[number % len(genres)].id
+            )
+            for number, movie in zip(numbers, movies)
+        ),
+        batch_size=CHUNK_SIZE,
+    )
+    Movie.actors.through.objects.bulk_create(
+        (
+            Movie.actors.through(
+                movie_id=movie.id,
+                actor_id=actors[(number + offset) % len(actors)].id,
+            )
+            for number, movie in zip(numbers, movies)
+            for offset in (0, 1)
+        ),
+        batch_size=CHUNK_SIZE,
+    )
+    movie_sessions = MovieSession.objects.bulk_create(
+        (
+            MovieSession(
+                show_time=start + timedelta(hours=3 * (number // HALLS)),
+                movie=movie,
+                cinema_hall=halls[number % HALLS],
+            )
+            for number, movie in zip(numbers, movies)
+        ),
+        batch_size=CHUNK_SIZE,
+    )
+    orders = Order.objects.bulk_create(
+        (Order(user=user) for _ in numbers), batch_size=CHUNK_SIZE
+    )
+    Ticket.objects.bulk_create(
+        (
+            Ticket(movie_session=movie_session, order=order, row=1, seat=seat)
+            for movie_session, order in zip(movie_sessions, orders)
+            for seat in (1, 2)
+        ),
+        batch_size=CHUNK_SIZE,
+    )
+
+    return user
+
+
+def make_view(viewset, action, user):
+    """A ``viewset`` ready to plan the queryset of ``action`` for ``user``"""
+    from django.test.client import RequestFactory
+
+    view = viewset()
+    view.action_map = {"get": action}
+    view.args, view.kwargs, view.format_kwarg = (), {}, None
+    view.request = view.initialize_request(RequestFactory().get("/"))
+    view.request.user = user
+    return view
+
+
+def planned(view):
+    return view.filter_queryset(view.get_queryset())
+
+
+def fetch(view):
+    return list(planned(view).iterator(chunk_size=CHUNK_SIZE))
+
+
+def serializer_case(viewset, action):
+    def prepare(user):
+        view = make_view(viewset, action, user)
+        objects = fetch(view)
+        serializer_class = view.get_serializer_class()
+        context = view.get_serializer_context()
+
+        def run():
+            return serializer_class(objects, many=True, context=context).data
+
+        return run
+
+    return prepare
+
+
+def queryset_case(viewset, action):
+    def prepare(user):
+        view = make_view(viewset, action, user)
+
+        def run():
+            for _ in planned(view).iterator(chunk_size=CHUNK_SIZE):
+                pass
+
+        return run
+
+    return prepare
+
+
+def validate_ticket_case(user):
+    from rest_framework.exceptions import ValidationError
+
+    from cinema.models import Ticket
+
+    tickets = [
+        (ticket.row, ticket.seat, ticket.movie_session.cinema_hall)
+        for ticket in Ticket.objects.select_related(
+            "movie_session__cinema_hall"
+        ).iterator(chunk_size=CHUNK_SIZE)
+    ]
+
+    def run():
+        for row, seat, cinema_hall in tickets:
+            Ticket.validate_ticket(row, seat, cinema_hall, ValidationError)
+
+    return run
+
+
+def cases():
+    """``{name: prepare(user) -> run()}``"""
+    from cinema.views import MovieSessionViewSet, MovieViewSet, OrderViewSet
+
+    return {
+        "MovieListSerializer": serializer_case(MovieViewSet, "list"),
+        "MovieSessionListSerializer": serializer_case(
+            MovieSessionViewSet, "list"
+        ),
+        "MovieSessionDetailSerializer": serializer_case(
+            MovieSessionViewSet, "retrieve"
+        ),
+        "OrderListSerializer": serializer_case(OrderViewSet, "list"),
+        "Ticket.validate_ticket": validate_ticket_case,
+        "MovieViewSet.get_queryset": queryset_case(MovieViewSet, "list"),
+        "MovieSessionViewSet.get_queryset": queryset_case(
+            MovieSessionViewSet, "list"
+        ),
+    }
+
+
+def measure(run, min_time):
+    """``{"ops_per_sec", "peak_kib", "runs"}`` of ``run``"""
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    durations = []
+    started = time.perf_counter()
+    while not durations or time.perf_counter() - started < min_time:
+        run_started = time.perf_counter()
+        run()
+        durations.append(time.perf_counter() - run_started)
+
+    return {
+        # the fastest run is the least disturbed by the rest of the system
+        "ops_per_sec": 1 / min(durations),
+        "peak_kib": peak / 1024,
+        "runs": len(durations),
+    }
+
+
+def key(name, size):
+    return f"{name}[{size}]"
+
+
+def run_suite(sizes, min_time=0.5, selected=None, report=None):
+    """
+    ``{"name[size]": measurement}`` for the ``selected`` cases (all by
+    default) at each of ``sizes``; ``report(name, size, measurement)``
+    is called as they finish
+    """
+    results = {}
+    for size in sorted(sizes):
+        user = seed(size)
+        for name, prepare in cases().items():
+            if selected and name not in selected:
+                continue
+            measurement = measure(prepare(user), min_time)
+            results[key(name, size)] = measurement
+            if report:
+                report(name, size, measurement)
+
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    ``{"name[size]": [regressions]}``: slower or allocating more than
+    ``tolerance`` (a fraction) compared to the ``baseline`` results
+    """
+    regressions = {}
+    for name, measurement in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+
+        found = []
+        speed = measurement["ops_per_sec"] / before["ops_per_sec"] - 1
+        if speed < -tolerance:
+            found.append(f"{-speed:.0%} slower")
+        memory = measurement["peak_kib"] / max(before["peak_kib"], 1) - 1
+        if memory > tolerance:
+            found.append(f"{memory:.0%} more memory")
+        if found:
+            regressions[name] = found
+
+    return regressions
+
+
+def read_baseline(path):
+    try:
+        with open(path) as file:
+            return json.load(file)["results"]
+    except FileNotFoundError:
+        return {}
+
+
+def write_baseline(path, results, previous=None):
+    """Store ``results`` over the ``previous`` ones at ``path``"""
+    with open(path, "w") as file:
+        json.dump(
+            {
+                "python": sys.version.split()[0],
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "results": {**(previous or {}), **results},
+            },
+            file,
+            indent=2,
+            sort_keys=True,
+        )
+
+
+def main():
+    from django.core.management import call_command
+
+    from benchmarks import setup_django
+
+    setup_django()
+    call_command("run_benchmarks", *sys.argv[1:])
+
+
+if __name__ == "__main__":
+    main()
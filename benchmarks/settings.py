@@ -0,0 +1,24 @@
+"""Settings for running the benchmarks against a throwaway database"""
+import os
+
+from cinema_api.settings import *  # noqa: F401, F403
+from cinema_api.settings import BASE_DIR, REST_FRAMEWORK
+
+DEBUG = False
+
+ALLOWED_HOSTS = ["127.0.0.1", "localhost"]
+
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": os.getenv(
+            "BENCHMARK_DB", BASE_DIR / "benchmarks" / "bench.sqlite3"
+        ),
+    }
+}
+
+DATABASE_REPLICAS = {}
+
+# Benchmarks hammer the API from a single user, which is exactly what
+# the throttles exist to stop.
+REST_FRAMEWORK = {**REST_FRAMEWORK, "DEFAULT_THROTTLE_CLASSES": []}
@@ -0,0 +1,61 @@
+"""
+Per-request overhead of DRF's history-list throttle versus the GCRA
+throttle, as the number of requests inside the window grows.
+"""
+import tempfile
+import time
+from types import SimpleNamespace
+
+from benchmarks import setup_django
+
+HISTORY_SIZES = (10, 100, 1000, 10000)
+ITERATIONS = 1000
+
+
+def time_throttle(throttle, request, prefill):
+    for _ in range(prefill):
+        throttle.allow_request(request, None)
+
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        throttle.allow_request(request, None)
+
+    return (time.perf_counter() - start) / ITERATIONS * 1e6
+
+
+def main():
+    setup_django()
+
+    from django.core.cache.backends.locmem import LocMemCache
+    from django.test import override_settings
+    from rest_framework.throttling import UserRateThrottle
+
+    from cinema import throttling
+
+    rate = "1000000/hour"
+    request = SimpleNamespace(
+        user=SimpleNamespace(is_authenticated=True, pk=1)
+    )
+
+    print(f"{'history':>8} {'drf (us/hit)':>14} {'gcra (us/hit)':>14}")
+    for size in HISTORY_SIZES:
+        drf = UserRateThrottle()
+        drf.rate = rate
+        drf.num_requests, drf.duration = drf.parse_rate(rate)
+        drf.cache = LocMemCache("throttle-bench", {})
+
+        with tempfile.NamedTemporaryFile() as tmp, override_settings(
+            THROTTLE_STORE={"OPTIONS": {"path": tmp.name}}
+        ):
+            gcra = throttling.UserGCRAThrottle()
+            gcra.rate = rate
+            gcra.num_requests, gcra.duration = gcra.parse_rate(rate)
+
+            drf_us = time_throttle(drf, request, size)
+            gcra_us = time_throttle(gcra, request, size)
+
+        print(f"{size:>8} {drf_us:>14.1f} {gcra_us:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,11 @@
+from django import forms
 from django.contrib import admin
+from django.contrib.admin.widgets import ForeignKeyRawIdWidget
+from django.core.paginator import Paginator
+from django.db import connections
+from django.urls import NoReverseMatch, reverse
+from django.utils.functional import cached_property
+from django.utils.text import Truncator
 
 from .models import (
     CinemaHall,
@@ -8,12 +15,249 @@ from .models import (
     MovieSession,
     Order,
     Ticket,
+    ArchivedTicket,
+    SessionOccupancy,
+    MovieDaySales,
+    HallDayOccupancy,
+    OutboxEvent,
+    OutboxCheckpoint,
+    Job,
+    BookingRequest,
+    ShardPlacement,
 )
 
-admin.site.register(CinemaHall)
-admin.site.register(Genre)
-admin.site.register(Actor)
-admin.site.register(Movie)
-admin.site.register(MovieSession)
-admin.site.register(Order)
-admin.site.register(Ticket)
+# below this many rows an exact COUNT(*) is cheap enough
+EXACT_COUNT_LIMIT = 100_000
+
+
+def estimated_count(queryset):
+    """
+    Row count of an unfiltered ``queryset`` from the PostgreSQL planner
+    statistics (summed over partitions), or None when there is no
+    estimate to use.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql" or queryset.query.where:
+        return None
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT COALESCE(SUM(GREATEST(reltuples, 0)), 0)::bigint "
+            "FROM pg_class WHERE oid = %s::regclass OR oid IN ("
+            "SELECT inhrelid FROM pg_inherits WHERE inhparent = %s::regclass"
+            ")",
+            [queryset.model._meta.db_table] * 2,
+        )
+        return cursor.fetchone()[0]
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for changelists of large tables: unfiltered pages use the
+    planner's row estimate instead of counting millions of rows.
+    """
+
+    @cached_property
+    def count(self):
+        estimate = estimated_count(self.object_list)
+        if estimate is not None and estimate >= EXACT_COUNT_LIMIT:
+            return estimate
+        return super().count
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class ReadOnlyAdmin(admin.ModelAdmin):
+    """Rows maintained by the application (see ``cinema.rollups``)"""
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(CinemaHall)
+class CinemaHallAdmin(admin.ModelAdmin):
+    list_display = ["name", "rows", "seats_in_row"]
+    search_fields = ["name"]
+
+
+@admin.register(Genre)
+class GenreAdmin(admin.ModelAdmin):
+    search_fields = ["name"]
+
+
+@admin.register(Actor)
+class ActorAdmin(admin.ModelAdmin):
+    list_display = ["first_name", "last_name"]
+    search_fields = ["first_name", "last_name"]
+
+
+@admin.register(Movie)
+class MovieAdmin(admin.ModelAdmin):
+    list_display = ["title", "duration"]
+    search_fields = ["title"]
+    list_filter = ["genres"]
+    autocomplete_fields = ["genres", "actors"]
+
+
+@admin.register(MovieSession)
+class MovieSessionAdmin(LargeTableAdmin):
+    list_display = ["show_time", "movie", "cinema_hall"]
+    list_select_related = ["movie", "cinema_hall"]
+    list_filter = ["cinema_hall", "queued_booking"]
+    autocomplete_fields = ["movie", "cinema_hall"]
+    date_hierarchy = "show_time"
+
+
+class LoadedRawIdWidget(ForeignKeyRawIdWidget):
+    """
+    Raw id widget labelled with the object the form's instance already
+    holds (``loaded``), instead of fetching it again for every inline row
+    """
+
+    loaded = None
+
+    def label_and_url_for_value(self, value):
+        obj = self.loaded
+        if obj is None or str(obj.pk) != str(value):
+            return super().label_and_url_for_value(value)
+
+        try:
+            url = reverse(
+                f"{self.admin_site.name}:{obj._meta.app_label}_"
+                f"{obj._meta.model_name}_change",
+                args=(obj.pk,),
+            )
+        except NoReverseMatch:
+            url = ""
+
+        return Truncator(obj).words(14), url
+
+
+class TicketInlineForm(forms.ModelForm):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.movie_session_id:
+            self.fields["movie_session"].widget.loaded = (
+                self.instance.movie_session
+            )
+
+
+class TicketInline(admin.TabularInline):
+    model = Ticket
+    form = TicketInlineForm
+    extra = 0
+    raw_id_fields = ["movie_session"]
+
+    def get_queryset(self, request):
+        return (
+            super()
+            .get_queryset(request)
+            .select_related(
+                "movie_session__movie", "movie_session__cinema_hall"
+            )
+        )
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name in self.raw_id_fields:
+            kwargs["widget"] = LoadedRawIdWidget(
+                db_field.remote_field,
+                self.admin_site,
+                using=kwargs.get("using"),
+            )
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+
+@admin.register(Order)
+class OrderAdmin(LargeTableAdmin):
+    list_display = ["id", "created_at", "user"]
+    list_select_related = ["user"]
+    raw_id_fields = ["user"]
+    date_hierarchy = "created_at"
+    inlines = [TicketInline]
+
+
+@admin.register(Ticket)
+class TicketAdmin(LargeTableAdmin):
+    list_display = ["id", "movie_session", "order", "row", "seat"]
+    list_select_related = ["movie_session__movie", "order"]
+    raw_id_fields = ["movie_session", "order"]
+    # the model orders by row and seat, which would sort the whole table
+    ordering = ["-id"]
+
+
+@admin.register(ArchivedTicket)
+class ArchivedTicketAdmin(LargeTableAdmin, ReadOnlyAdmin):
+    list_display = ["id", "movie_session", "order", "row", "seat"]
+    list_select_related = ["movie_session__movie", "order"]
+    raw_id_fields = ["movie_session", "order"]
+    ordering = ["-id"]
+
+
+@admin.register(SessionOccupancy)
+class SessionOccupancyAdmin(LargeTableAdmin, ReadOnlyAdmin):
+    list_display = ["movie_session", "tickets_sold", "capacity"]
+    list_select_related = ["movie_session__movie"]
+    ordering = ["-movie_session"]
+
+
+@admin.register(MovieDaySales)
+class MovieDaySalesAdmin(LargeTableAdmin, ReadOnlyAdmin):
+    list_display = ["day", "movie", "sessions", "tickets_sold", "capacity"]
+    list_select_related = ["movie"]
+    date_hierarchy = "day"
+
+
+@admin.register(HallDayOccupancy)
+class HallDayOccupancyAdmin(LargeTableAdmin, ReadOnlyAdmin):
+    list_display = [
+        "day", "cinema_hall", "sessions", "tickets_sold", "capacity"
+    ]
+    list_select_related = ["cinema_hall"]
+    list_filter = ["cinema_hall"]
+    date_hierarchy = "day"
+
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(LargeTableAdmin, ReadOnlyAdmin):
+    list_display = ["id", "topic", "created_at"]
+    list_filter = ["topic"]
+    ordering = ["-id"]
+
+
+@admin.register(BookingRequest)
+class BookingRequestAdmin(LargeTableAdmin, ReadOnlyAdmin):
+    list_display = [
+        "id", "movie_session", "user", "status", "order", "created_at"
+    ]
+    list_select_related = ["movie_session__movie", "user"]
+    list_filter = ["status"]
+    raw_id_fields = ["movie_session", "user", "order"]
+
+
+@admin.register(ShardPlacement)
+class ShardPlacementAdmin(ReadOnlyAdmin):
+    list_display = ["group", "shard", "moving", "updated_at"]
+    list_filter = ["shard", "moving"]
+
+
+@admin.register(Job)
+class JobAdmin(LargeTableAdmin, ReadOnlyAdmin):
+    list_display = [
+        "id", "task", "queue", "status", "attempts", "run_at", "finished_at"
+    ]
+    list_filter = ["status", "queue"]
+    search_fields = ["task", "key"]
+
+
+@admin.register(OutboxCheckpoint)
+class OutboxCheckpointAdmin(ReadOnlyAdmin):
+    list_display = ["consumer", "last_event_id", "updated_at"]
@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_migrate, post_save
 
 
 class CinemaConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "cinema"
+
+    def ready(self):
+        from cinema_api.db import sharding
+
+        post_migrate.connect(sharding.seed_id_ranges, sender=self)
+        post_save.connect(sharding.broadcast_save)
+        post_delete.connect(sharding.broadcast_delete)
@@ -0,0 +1,106 @@
+"""
+Archival of tickets of past sessions.
+
+``archive_tickets`` moves tickets of sessions that started before a
+cut-off from ``Ticket`` to ``ArchivedTicket`` one batch per transaction,
+so the table behind seat maps, availability counts and bookings only
+holds current sessions. Orders keep showing archived tickets through
+``Order.all_tickets``. Each batch can also be written out as gzipped
+NDJSON in the ``bulk_load`` format.
+"""
+import gzip
+import json
+from pathlib import Path
+
+from django.db import connections, router, transaction
+
+from cinema.models import ArchivedTicket, Ticket
+
+
+def ensure_partitions(show_times):
+    """Create the yearly partitions of the archive (PostgreSQL only)"""
+    connection = connections[router.db_for_write(ArchivedTicket)]
+    if connection.vendor != "postgresql":
+        return
+
+    table = ArchivedTicket._meta.db_table
+    with connection.cursor() as cursor:
+        for year in sorted({show_time.year for show_time in show_times}):
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS "{table}_{year}" '
+                f'PARTITION OF "{table}" FOR VALUES FROM (%s) TO (%s)',
+                [f"{year}-01-01T00:00:00Z", f"{year + 1}-01-01T00:00:00Z"],
+            )
+
+
+def export_batch(directory, archived):
+    path = Path(directory) / (
+        f"archived-tickets-{archived[0].id}-{archived[-1].id}.ndjson.gz"
+    )
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    with gzip.open(path, "wt", encoding="utf-8") as ndjson:
+        for ticket in archived:
+            ndjson.write(
+                json.dumps(
+                    {
+                        "model": "cinema.archivedticket",
+                        "pk": ticket.id,
+                        "fields": {
+                            "movie_session": ticket.movie_session_id,
+                            "order": ticket.order_id,
+                            "row": ticket.row,
+                            "seat": ticket.seat,
+                            "show_time": ticket.show_time.isoformat(),
+                        },
+                    }
+                )
+                + "\n"
+            )
+
+    return path
+
+
+def tickets_to_archive(before):
+    return Ticket.objects.filter(movie_session__show_time__lt=before)
+
+
+def archive_tickets(before, batch_size=5000, export_dir=None):
+    """
+    Move tickets of sessions starting before ``before`` to the archive.
+    Yields the number of tickets moved by each batch.
+    """
+    tickets = tickets_to_archive(before).order_by("id")
+
+    while True:
+        with transaction.atomic(using=router.db_for_write(Ticket)):
+            archived = [
+                ArchivedTicket(
+                    id=ticket_id,
+                    movie_session_id=movie_session_id,
+                    order_id=order_id,
+                    row=row,
+                    seat=seat,
+                    show_time=show_time,
+                )
+                for ticket_id, movie_session_id, order_id, row, seat, show_time
+                in tickets.values_list(
+                    "id",
+                    "movie_session_id",
+                    "order_id",
+                    "row",
+                    "seat",
+                    "movie_session__show_time",
+                )[:batch_size]
+            ]
+            if not archived:
+                return
+
+            if export_dir:
+                export_batch(export_dir, archived)
+            ensure_partitions(ticket.show_time for ticket in archived)
+            ArchivedTicket.objects.bulk_create(archived, batch_size=1000)
+            # ids only grow, so the batch is everything up to its last id
+            tickets.filter(id__lte=archived[-1].id).delete()
+
+        yield len(archived)
@@ -0,0 +1,107 @@
+from asgiref.sync import sync_to_async
+from django.http import Http404
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+ASYNC_ACTIONS = ("list", "retrieve", "seat_map")
+
+
+async def aauthenticate(request):
+    """
+    Async counterpart of ``Request._authenticate``.
+
+    Authenticators providing ``aauthenticate`` are awaited directly,
+    any others are run in a worker thread.
+    """
+    for authenticator in request.authenticators:
+        if hasattr(authenticator, "aauthenticate"):
+            user_auth_tuple = await authenticator.aauthenticate(request)
+        else:
+            user_auth_tuple = await sync_to_async(
+                authenticator.authenticate
+            )(request)
+
+        if user_auth_tuple is not None:
+            request._authenticator = authenticator
+            request.user, request.auth = user_auth_tuple
+            return
+
+    request._authenticator = None
+    request._not_authenticated()
+
+
+async def alist(view):
+    queryset = view.filter_queryset(view.get_queryset())
+    objects = [obj async for obj in queryset]
+
+    return Response(view.get_serializer(objects, many=True).data)
+
+
+async def aretrieve(view):
+    queryset = view.filter_queryset(view.get_queryset())
+    lookup_url_kwarg = view.lookup_url_kwarg or view.lookup_field
+
+    try:
+        obj = await queryset.aget(
+            **{view.lookup_field: view.kwargs[lookup_url_kwarg]}
+        )
+    except (queryset.model.DoesNotExist, TypeError, ValueError):
+        raise Http404
+
+    view.check_object_permissions(view.request, obj)
+
+    return Response(view.get_serializer(obj).data)
+
+
+HANDLERS = {
+    "list": alist,
+    "retrieve": aretrieve,
+    "seat_map": aretrieve,
+}
+
+
+def as_async_view(viewset, actions):
+    """
+    Build a view for ``viewset`` that serves the read-only ``actions``
+    natively on the event loop.
+
+    Querysets are evaluated with the async ORM (prefetches included) and
+    the serializers then only touch loaded objects. Any other method is
+    handed over to the regular sync viewset in a worker thread.
+    """
+    sync_view = sync_to_async(viewset.as_view(dict(actions)))
+    actions = dict(actions)
+    if "get" in actions:
+        actions.setdefault("head", actions["get"])
+
+    async def view(request, *args, **kwargs):
+        action = actions.get(request.method.lower())
+        if action not in ASYNC_ACTIONS:
+            return await sync_view(request, *args, **kwargs)
+
+        self = viewset(action_map=actions, action=action)
+        self.args, self.kwargs = args, kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await aauthenticate(request)
+            # The user is already resolved, so this only negotiates the
+            # renderer and checks permissions and throttles.
+            self.initial(request, *args, **kwargs)
+            response = await HANDLERS[action](self)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        response = self.finalize_response(request, response, *args, **kwargs)
+
+        # JSON renders from plain data; other renderers (e.g. the
+        # browsable API) may query the database and are left to Django.
+        if isinstance(request.accepted_renderer, JSONRenderer):
+            response.render()
+
+        return response
+
+    view.csrf_exempt = True
+    return view
@@ -0,0 +1,246 @@
+"""
+Queued booking for flash sales.
+
+When thousands of orders for one session arrive at once, creating each
+in a transaction of its own makes them wait on each other's locks on
+the ticket index of that session. Orders for a session with
+``queued_booking`` set are instead stored as a ``BookingRequest`` and
+answered with ``202 Accepted`` and a receipt, which clients poll at
+``/api/cinema/bookings/<id>/`` until it is booked or rejected.
+
+``manage.py commit_bookings`` is the single committer of each session:
+it takes the session's queued requests in arrival order, ``batch_size``
+at a time, checks their seats against a ``SeatGrid`` of the session in
+memory and writes the orders and tickets of all accepted requests, with
+their rollups and outbox events, in one transaction. A request for a
+seat that is taken, also by an earlier request of the same batch, is
+rejected with the reason. Every batch adds one ``booking.processed``
+outbox event, so a consumer can push the receipts to clients.
+
+On PostgreSQL the committer locks the session row with ``SKIP LOCKED``,
+so any number of committers share the hot sessions and never work on
+the same one. SQLite has a single writer anyway: run one committer.
+"""
+from contextlib import nullcontext
+
+from django.db import connections, router, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.reverse import reverse
+
+from cinema import outbox, rollups
+from cinema.models import BookingRequest, MovieSession, Order, Ticket
+from cinema.seating import SeatGrid
+from cinema.serializers import BookingRequestSerializer
+from cinema_api.db.routers import use_primary
+
+
+def queued_session(tickets_data):
+    """
+    The session to queue an order with ``tickets_data`` for, or None if
+    the order is created right away.
+    """
+    movie_sessions = {
+        ticket_data["movie_session"] for ticket_data in tickets_data
+    }
+    queued = [
+        movie_session
+        for movie_session in movie_sessions
+        if movie_session.queued_booking
+    ]
+    if not queued:
+        return None
+    if len(movie_sessions) > 1:
+        raise ValidationError(
+            {
+                "tickets": [
+                    "Tickets of a session sold through the booking queue "
+                    "must be ordered on their own."
+                ]
+            }
+        )
+
+    return queued[0]
+
+
+def submit(user, movie_session, tickets_data):
+    """Queue an order of ``user`` for ``tickets_data``"""
+    return BookingRequest.objects.create(
+        user=user,
+        movie_session=movie_session,
+        places=[
+            [ticket_data["row"], ticket_data["seat"]]
+            for ticket_data in tickets_data
+        ],
+    )
+
+
+def queued_places(movie_session):
+    """(row, seat) of the requests still queued for ``movie_session``"""
+    return [
+        tuple(place)
+        for places in BookingRequest.objects.filter(
+            movie_session=movie_session, status=BookingRequest.QUEUED
+        ).values_list("places", flat=True)
+        for place in places
+    ]
+
+
+def queued_response(request, booking_request):
+    """``202 Accepted`` with the receipt of ``booking_request``"""
+    return Response(
+        BookingRequestSerializer(booking_request).data,
+        status=status.HTTP_202_ACCEPTED,
+        headers={
+            "Location": reverse(
+                "cinema:bookingrequest-detail",
+                args=[booking_request.id],
+                request=request,
+            )
+        },
+    )
+
+
+def check(grid, places):
+    """Errors of booking ``places``, or None once they are taken"""
+    places = [tuple(place) for place in places]
+    if len(set(places)) < len(places):
+        return {"tickets": ["A seat is ordered more than once."]}
+
+    for row, seat in places:
+        if not (grid.contains(row, seat) and grid.is_free(row, seat)):
+            return {
+                "tickets": [
+                    f"Seat {seat} in row {row} is not available."
+                ]
+            }
+
+    for row, seat in places:
+        grid.take(row, seat)
+    return None
+
+
+def book(movie_session, booking_requests):
+    """Write the outcome of ``booking_requests``, checked in order"""
+    grid = SeatGrid.load(movie_session)
+    now = timezone.now()
+    accepted = []
+    for booking_request in booking_requests:
+        booking_request.errors = check(grid, booking_request.places)
+        booking_request.processed_at = now
+        if booking_request.errors:
+            booking_request.status = BookingRequest.REJECTED
+            continue
+
+        booking_request.status = BookingRequest.BOOKED
+        booking_request.order = Order(user_id=booking_request.user_id)
+        accepted.append(booking_request)
+
+    with transaction.atomic(using=router.db_for_write(Order)):
+        Order.objects.bulk_create(
+            [booking_request.order for booking_request in accepted]
+        )
+        orders = [
+            (
+                booking_request.order,
+                [
+                    Ticket(
+                        order=booking_request.order,
+                        movie_session=movie_session,
+                        row=row,
+                        seat=seat,
+                    )
+                    for row, seat in booking_request.places
+                ],
+            )
+            for booking_request in accepted
+        ]
+        tickets = [
+            ticket for _, order_tickets in orders for ticket in order_tickets
+        ]
+        Ticket.objects.bulk_create(tickets)
+        if tickets:
+            rollups.record_tickets(tickets)
+        outbox.record_orders(orders)
+
+        BookingRequest.objects.bulk_update(
+            booking_requests, ["status", "order", "errors", "processed_at"]
+        )
+        outbox.record_bookings(movie_session, booking_requests)
+
+
+def commit_batch(movie_session_id, batch_size=500):
+    """
+    Book the next ``batch_size`` queued requests for a session. Returns
+    how many were processed: 0 if none are queued or another committer
+    has the session.
+    """
+    db = router.db_for_write(MovieSession)
+    skip_locked = connections[db].features.has_select_for_update_skip_locked
+    movie_sessions = MovieSession.objects.select_related(
+        "cinema_hall"
+    ).filter(pk=movie_session_id)
+    if skip_locked:
+        movie_sessions = movie_sessions.select_for_update(
+            skip_locked=True, of=("self",)
+        )
+        committing = transaction.atomic(using=db)
+    else:
+        # SQLite can't turn a read into a write transaction while
+        # another process writes; ``book`` opens its own
+        committing = nullcontext()
+
+    # the grid must hold every seat sold so far, not a replica's view
+    token = use_primary.set(True)
+    try:
+        with committing:
+            movie_session = movie_sessions.first()
+            if movie_session is None:
+                return 0
+
+            booking_requests = list(
+                BookingRequest.objects.filter(
+                    movie_session=movie_session,
+                    status=BookingRequest.QUEUED,
+                ).order_by("id")[:batch_size]
+            )
+            if booking_requests:
+                book(movie_session, booking_requests)
+    finally:
+        use_primary.reset(token)
+
+    return len(booking_requests)
+
+
+def queued_sessions():
+    """Ids of the sessions with requests in their queue"""
+    return list(
+        BookingRequest.objects.using(router.db_for_write(BookingRequest))
+        .filter(status=BookingRequest.QUEUED)
+        .values_list("movie_session_id", flat=True)
+        .order_by("movie_session_id")
+        .distinct()
+    )
+
+
+class QueuedBookingMixin:
+    """Queue orders for sessions with ``queued_booking`` in ``create``"""
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        tickets_data = serializer.validated_data["tickets"]
+
+        movie_session = queued_session(tickets_data)
+        if movie_session is None:
+            self.perform_create(serializer)
+            return Response(
+                serializer.data,
+                status=status.HTTP_201_CREATED,
+                headers=self.get_success_headers(serializer.data),
+            )
+
+        booking_request = submit(request.user, movie_session, tickets_data)
+        return queued_response(request, booking_request)
@@ -0,0 +1,107 @@
+"""
+``Idempotency-Key`` support for creating objects.
+
+The first request with a key stores its response for
+``IDEMPOTENCY_KEY_TTL_SECONDS``; retries with the same key and data get
+it back from a single lookup by key, without running the create again.
+The key is inserted before the object is created, in the same
+transaction, so a concurrent duplicate waits on the key's unique index
+and then replays the response of the request that got there first. If
+creating fails, the key goes away with the rest of the transaction and
+the request can be retried.
+
+When sharded, keys are stored on the shard of the order they create
+(``ShardedViewMixin`` has picked it from the tickets by then), so the
+key commits or rolls back with the order.
+"""
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, router, transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from cinema.models import IdempotencyKey
+
+HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+def fingerprint(data):
+    return hashlib.sha256(
+        json.dumps(data, sort_keys=True, cls=DjangoJSONEncoder).encode()
+    ).hexdigest()
+
+
+def replay(record, request_fingerprint):
+    if record.fingerprint != request_fingerprint:
+        raise ValidationError(
+            {
+                "idempotency_key": [
+                    "This key was already used for a different request."
+                ]
+            }
+        )
+
+    return Response(
+        record.response,
+        status=record.status_code,
+        headers={REPLAYED_HEADER: "true"},
+    )
+
+
+def purge_expired(batch_size=1000):
+    """Delete expired keys, ``batch_size`` at a time. Returns the count"""
+    expired = IdempotencyKey.objects.filter(expires_at__lt=timezone.now())
+    purged = 0
+    while True:
+        batch = list(expired.values_list("pk", flat=True)[:batch_size])
+        if not batch:
+            return purged
+        purged += IdempotencyKey.objects.filter(pk__in=batch).delete()[0]
+
+
+class IdempotentCreateMixin:
+    """Honour the ``Idempotency-Key`` header in ``create``"""
+
+    def create(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return super().create(request, *args, **kwargs)
+        if len(key) > IdempotencyKey._meta.get_field("key").max_length:
+            raise ValidationError({"idempotency_key": ["Key is too long."]})
+
+        request_fingerprint = fingerprint(request.data)
+        now = timezone.now()
+        keys = IdempotencyKey.objects.filter(user=request.user, key=key)
+
+        # the order's transaction, on its shard
+        db = router.db_for_write(IdempotencyKey)
+        with transaction.atomic(using=db):
+            keys.filter(expires_at__lte=now).delete()
+            try:
+                with transaction.atomic(using=db):
+                    record = IdempotencyKey.objects.create(
+                        user=request.user,
+                        key=key,
+                        fingerprint=request_fingerprint,
+                        expires_at=now + timedelta(
+                            seconds=settings.IDEMPOTENCY_KEY_TTL_SECONDS
+                        ),
+                    )
+            except IntegrityError:
+                # locking reads go to the primary
+                return replay(
+                    keys.select_for_update().get(), request_fingerprint
+                )
+
+            response = super().create(request, *args, **kwargs)
+            record.status_code = response.status_code
+            record.response = response.data
+            record.save(update_fields=["status_code", "response"])
+
+        return response
@@ -0,0 +1,317 @@
+"""
+Background jobs in a database table, without an external broker.
+
+``enqueue("cinema.tasks.resize_movie_image", {"movie_id": 1})`` adds a
+job in the current transaction; ``manage.py run_workers`` runs it in
+another process by calling the task with the keyword arguments. Jobs
+can be scheduled (``run_at``), retried with exponential backoff
+(``max_attempts``) and deduplicated (``key``: at most one queued or
+running job per key).
+
+Workers claim jobs with ``SELECT ... FOR UPDATE SKIP LOCKED`` where the
+database has it, so any number of them poll the table without waiting
+on each other. Elsewhere (SQLite) the claim is a conditional UPDATE
+that only one worker wins.
+
+``settings.JOB_QUEUE_CONCURRENCY`` limits how many jobs of a queue run
+at once over all workers: a running job takes one of the queue's slots,
+which are unique among running jobs. ``settings.JOB_SCHEDULE`` lists
+periodic jobs, which workers enqueue with their name as the key::
+
+    JOB_SCHEDULE = {
+        "rebuild-rollups": {
+            "task": "cinema.tasks.rebuild_rollups",
+            "every": 24 * 3600,
+        },
+    }
+
+While a job runs, its worker refreshes ``locked_at`` every
+``JOB_HEARTBEAT_SECONDS``. Jobs whose worker stopped doing so for
+``JOB_TIMEOUT_SECONDS`` (it died, e.g. killed for running out of memory)
+are queued again; the run counts as one of their ``max_attempts``, so a
+job that keeps killing its worker ends up failed.
+"""
+import os
+import socket
+import threading
+import traceback
+from contextlib import contextmanager, nullcontext
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connections
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from cinema.models import Job
+
+PENDING = (Job.QUEUED, Job.RUNNING)
+CLAIM_ATTEMPTS = 3
+
+
+def enqueue(
+    task,
+    kwargs=None,
+    *,
+    queue="default",
+    run_at=None,
+    key=None,
+    max_attempts=None,
+):
+    """
+    Add a job calling ``task`` (a dotted path) with ``kwargs``. Returns
+    None when a job with ``key`` is already pending.
+    """
+    job = Job(
+        task=task,
+        kwargs=kwargs or {},
+        queue=queue,
+        run_at=run_at or timezone.now(),
+        key=key,
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+    )
+    if key is None:
+        job.save()
+        return job
+
+    try:
+        with transaction.atomic():
+            job.save()
+    except IntegrityError:
+        return None
+    return job
+
+
+def retry_delay(attempts):
+    return timedelta(
+        seconds=settings.JOB_RETRY_BACKOFF_SECONDS * 2 ** (attempts - 1)
+    )
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def free_slot(queue, limit):
+    """A concurrency slot of ``queue`` no running job has, or None"""
+    taken = set(
+        Job.objects.using(DEFAULT_DB_ALIAS)
+        .filter(queue=queue, status=Job.RUNNING)
+        .values_list("slot", flat=True)
+    )
+    return min(set(range(limit)) - taken, default=None)
+
+
+def full_queues():
+    running = (
+        Job.objects.using(DEFAULT_DB_ALIAS)
+        .filter(
+            status=Job.RUNNING,
+            queue__in=list(settings.JOB_QUEUE_CONCURRENCY),
+        )
+        .values("queue")
+        .annotate(running=Count("id"))
+        .order_by()
+    )
+    return [
+        row["queue"]
+        for row in running
+        if row["running"] >= settings.JOB_QUEUE_CONCURRENCY[row["queue"]]
+    ]
+
+
+def claim(queues=None, worker=None):
+    """Mark the next due job of ``queues`` (all by default) as running"""
+    skip_locked = connections[
+        DEFAULT_DB_ALIAS
+    ].features.has_select_for_update_skip_locked
+
+    for _ in range(CLAIM_ATTEMPTS):
+        now = timezone.now()
+        candidates = (
+            Job.objects.using(DEFAULT_DB_ALIAS)
+            .filter(status=Job.QUEUED, run_at__lte=now)
+            .exclude(queue__in=full_queues())
+            .order_by("run_at", "id")
+        )
+        if queues:
+            candidates = candidates.filter(queue__in=queues)
+        if skip_locked:
+            candidates = candidates.select_for_update(skip_locked=True)
+            claiming = transaction.atomic(using=DEFAULT_DB_ALIAS)
+        else:
+            # SQLite can't turn a read into a write transaction while
+            # another process writes; the conditional UPDATE suffices
+            claiming = nullcontext()
+
+        try:
+            with claiming:
+                job = candidates.first()
+                if job is None:
+                    return None
+
+                limit = settings.JOB_QUEUE_CONCURRENCY.get(job.queue)
+                if limit is not None:
+                    job.slot = free_slot(job.queue, limit)
+                    if job.slot is None:
+                        continue
+
+                job.status = Job.RUNNING
+                job.attempts += 1
+                job.locked_by = worker or worker_name()
+                job.locked_at = now
+                # only one worker gets to move the job out of "queued"
+                claimed = Job.objects.filter(
+                    pk=job.pk, status=Job.QUEUED
+                ).update(
+                    status=job.status,
+                    slot=job.slot,
+                    attempts=job.attempts,
+                    locked_by=job.locked_by,
+                    locked_at=job.locked_at,
+                )
+        except IntegrityError:
+            # another worker took the last free slot meanwhile
+            continue
+
+        if claimed:
+            return job
+
+    return None
+
+
+@contextmanager
+def heartbeat(job):
+    """Keep refreshing ``job.locked_at`` while the block runs"""
+    stop = threading.Event()
+
+    def beat():
+        try:
+            while not stop.wait(settings.JOB_HEARTBEAT_SECONDS):
+                Job.objects.filter(
+                    pk=job.pk, status=Job.RUNNING, locked_by=job.locked_by
+                ).update(locked_at=timezone.now())
+        finally:
+            # this thread's connection
+            connections.close_all()
+
+    thread = threading.Thread(target=beat, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def execute(job):
+    """Run a claimed ``job`` and record how it went"""
+    try:
+        with heartbeat(job):
+            import_string(job.task)(**job.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.QUEUED,
+                slot=None,
+                run_at=timezone.now() + retry_delay(job.attempts),
+                last_error=error,
+            )
+        else:
+            Job.objects.filter(pk=job.pk).update(
+                status=Job.FAILED,
+                slot=None,
+                finished_at=timezone.now(),
+                last_error=error,
+            )
+        return False
+
+    Job.objects.filter(pk=job.pk).update(
+        status=Job.DONE, slot=None, finished_at=timezone.now()
+    )
+    return True
+
+
+def schedule_periodic():
+    """Enqueue the next run of each ``JOB_SCHEDULE`` job not pending"""
+    now = timezone.now()
+    for key, entry in settings.JOB_SCHEDULE.items():
+        jobs = Job.objects.using(DEFAULT_DB_ALIAS).filter(key=key)
+        if jobs.filter(status__in=PENDING).exists():
+            continue
+
+        last_run = jobs.order_by("-run_at").values_list(
+            "run_at", flat=True
+        ).first()
+        run_at = now
+        if last_run is not None:
+            run_at = max(now, last_run + timedelta(seconds=entry["every"]))
+
+        enqueue(
+            entry["task"],
+            entry.get("kwargs"),
+            queue=entry.get("queue", "default"),
+            run_at=run_at,
+            key=key,
+        )
+
+
+def requeue_stale():
+    """
+    Queue again the jobs of workers that died while running them, or
+    fail them if that was their last attempt. Returns the count queued.
+    """
+    now = timezone.now()
+    stale = Job.objects.filter(
+        status=Job.RUNNING,
+        locked_at__lt=now - timedelta(seconds=settings.JOB_TIMEOUT_SECONDS),
+    )
+    error = f"Worker stopped responding while running the job ({now})."
+    stale.filter(attempts__gte=F("max_attempts")).update(
+        status=Job.FAILED, slot=None, finished_at=now, last_error=error
+    )
+    return stale.update(
+        status=Job.QUEUED, slot=None, run_at=now, last_error=error
+    )
+
+
+def prune():
+    """Delete finished jobs older than ``JOB_RETENTION_SECONDS``"""
+    return Job.objects.filter(
+        status=Job.DONE,
+        finished_at__lt=timezone.now()
+        - timedelta(seconds=settings.JOB_RETENTION_SECONDS),
+    ).delete()[0]
+
+
+def run_worker(queues=None, once=False, poll_interval=1.0, stop=None):
+    """
+    Claim and run jobs until ``stop`` (a ``threading.Event``) is set or,
+    with ``once``, until no job is due. Returns the number of jobs run.
+    """
+    stop = stop or threading.Event()
+    worker = worker_name()
+    ran = 0
+    requeue_stale()
+    schedule_periodic()
+
+    while not stop.is_set():
+        job = claim(queues, worker)
+        if job is None:
+            if once:
+                break
+            requeue_stale()
+            schedule_periodic()
+            prune()
+            stop.wait(poll_interval)
+            continue
+
+        execute(job)
+        ran += 1
+        if job.key in settings.JOB_SCHEDULE:
+            schedule_periodic()
+
+    return ran
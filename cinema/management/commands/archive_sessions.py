@@ -0,0 +1,59 @@
+from datetime import date, datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from cinema.archive import archive_tickets, tickets_to_archive
+from cinema_api.db.sharding import each_shard
+
+
+class Command(BaseCommand):
+    """Django command to move tickets of past sessions to the archive"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--before",
+            required=True,
+            type=date.fromisoformat,
+            help="Archive sessions that started before this day.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Tickets to move per transaction.",
+        )
+        parser.add_argument(
+            "--export",
+            metavar="DIRECTORY",
+            help="Also write each batch to gzipped NDJSON files here.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report how many tickets would be archived.",
+        )
+
+    def handle(self, *args, **options):
+        before = timezone.make_aware(
+            datetime.combine(options["before"], time.min)
+        )
+        if before > timezone.now():
+            raise CommandError("--before must not be in the future")
+
+        if options["dry_run"]:
+            count = sum(
+                tickets_to_archive(before).count() for _ in each_shard()
+            )
+            self.stdout.write(f"{count} tickets would be archived")
+            return
+
+        total = 0
+        for _ in each_shard():
+            for moved in archive_tickets(
+                before, options["batch_size"], options["export"]
+            ):
+                total += moved
+                self.stdout.write(f"archived {total} tickets ...")
+
+        self.stdout.write(self.style.SUCCESS(f"{total} tickets archived"))
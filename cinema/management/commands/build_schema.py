@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from cinema_api.schema import (
+    compress,
+    read_manifest,
+    render_schema,
+    source_fingerprint,
+    write_artifacts,
+)
+
+
+class Command(BaseCommand):
+    """Django command to prebuild the OpenAPI schema served at /api/schema/"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output",
+            default=str(settings.SCHEMA_ARTIFACT_DIR),
+            help="Directory to write the schema artifacts to.",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Rebuild even if the code has not changed.",
+        )
+
+    def handle(self, *args, **options):
+        fingerprint = source_fingerprint()
+        manifest = read_manifest(options["output"])
+
+        if (
+            not options["force"]
+            and manifest
+            and manifest["fingerprint"] == fingerprint
+        ):
+            self.stdout.write("schema is up to date")
+            return
+
+        write_artifacts(
+            options["output"], compress(render_schema(), fingerprint)
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"schema written to {options['output']}")
+        )
@@ -0,0 +1,159 @@
+import time
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.base import DeserializationError
+from django.db import DEFAULT_DB_ALIAS, DatabaseError
+
+from cinema.models import ArchivedTicket, MovieSession, Ticket
+from cinema.rollups import rebuild
+from cinema_api.bulk_load import FORMATS, load
+from cinema_api.db.routers import use_primary
+from cinema_api.db.sharding import (
+    is_sharded,
+    shards,
+    sync_broadcast,
+    using_shard,
+)
+
+DAYS_QUERY_SIZE = 1000
+
+
+class LoadedSessions:
+    """``on_flush`` callback collecting the sessions a load touched"""
+
+    def __init__(self):
+        self.ids = set()
+
+    def __call__(self, model, instances):
+        if model is MovieSession:
+            self.ids.update(instance.pk for instance in instances)
+        elif model in (Ticket, ArchivedTicket):
+            self.ids.update(
+                instance.movie_session_id for instance in instances
+            )
+
+    def days(self):
+        """Show days of the sessions, a query per thousand of them"""
+        days = set()
+        session_ids = iter(self.ids)
+        while chunk := list(islice(session_ids, DAYS_QUERY_SIZE)):
+            days.update(
+                MovieSession.objects.filter(pk__in=chunk).dates(
+                    "show_time", "day"
+                )
+            )
+        return days
+
+
+class Command(BaseCommand):
+    """
+    Django command to stream fixtures and seed data into the database,
+    then rebuild the rollups of the days it loaded sessions or tickets
+    for and copy loaded halls and movies to the other shards
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "paths",
+            nargs="+",
+            help="JSON fixture, NDJSON or CSV files, optionally gzipped "
+                 "(- reads stdin).",
+        )
+        parser.add_argument(
+            "--format",
+            choices=sorted(set(FORMATS.values())),
+            help="Format of the files (default: from the extension).",
+        )
+        parser.add_argument(
+            "--model",
+            help="Model the rows of a CSV file belong to (app_label.Model).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Rows per model to buffer before inserting them.",
+        )
+        parser.add_argument(
+            "--database",
+            default=DEFAULT_DB_ALIAS,
+            help="Database alias to load into.",
+        )
+        parser.add_argument(
+            "-e",
+            "--exclude",
+            action="append",
+            default=[],
+            help="Skip an app_label or app_label.Model (can be repeated).",
+        )
+        parser.add_argument(
+            "--no-copy",
+            action="store_true",
+            help="Use INSERT instead of COPY on PostgreSQL.",
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        sessions = LoadedSessions()
+
+        try:
+            counts = load(
+                options["paths"],
+                file_format=options["format"],
+                model=options["model"],
+                using=options["database"],
+                batch_size=options["batch_size"],
+                use_copy=not options["no_copy"],
+                exclude=options["exclude"],
+                on_flush=sessions,
+            )
+        except (
+            OSError,
+            ValueError,
+            LookupError,
+            DeserializationError,
+            DatabaseError,
+        ) as error:
+            raise CommandError(f"Loading failed: {error}")
+
+        for label, count in sorted(counts.items()):
+            self.stdout.write(f"{label}: {count}")
+
+        self.update_rollups(options["database"], sessions)
+        self.sync_shards(options["database"], counts)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Loaded {sum(counts.values())} objects "
+                f"in {time.monotonic() - started:.1f}s"
+            )
+        )
+
+    def update_rollups(self, database, sessions):
+        # bulk_load sends no signals, so the rollups never saw the rows
+        token = use_primary.set(True)
+        try:
+            with using_shard(database):
+                days = sessions.days()
+                if days:
+                    for _ in rebuild(min(days), max(days)):
+                        pass
+                    self.stdout.write(
+                        f"rebuilt rollups from {min(days)} to {max(days)}"
+                    )
+        finally:
+            use_primary.reset(token)
+
+    def sync_shards(self, database, counts):
+        if (
+            database != DEFAULT_DB_ALIAS
+            or not is_sharded()
+            or not counts.keys() & set(settings.SHARD_BROADCAST_MODELS)
+        ):
+            return
+
+        for alias in shards()[1:]:
+            sync_broadcast(alias)
+            self.stdout.write(f"copied halls and movies to {alias}")
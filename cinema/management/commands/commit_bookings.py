@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from cinema.booking import commit_batch, queued_sessions
+from cinema_api.db.sharding import each_shard
+
+
+class Command(BaseCommand):
+    """Django command to book the orders queued for hot sessions"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Queued orders of a session to book in one transaction.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=0.05,
+            help="Seconds to wait when no order is queued.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once no order is queued.",
+        )
+
+    def commit(self, batch_size):
+        committed = 0
+        for _ in each_shard():
+            for movie_session_id in queued_sessions():
+                try:
+                    committed += commit_batch(movie_session_id, batch_size)
+                except Exception as exc:
+                    # the batch is checked against a fresh grid next poll
+                    self.stderr.write(
+                        f"session {movie_session_id} failed: {exc!r}"
+                    )
+
+        return committed
+
+    def handle(self, *args, **options):
+        processed = 0
+        while True:
+            committed = self.commit(options["batch_size"])
+            processed += committed
+            if committed:
+                continue
+            if options["once"]:
+                break
+            time.sleep(options["poll_interval"])
+
+        self.stdout.write(self.style.SUCCESS(f"processed {processed} orders"))
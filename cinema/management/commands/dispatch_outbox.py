@@ -0,0 +1,61 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from cinema.outbox import deliver, get_consumers, prune
+from cinema_api.db.sharding import each_shard
+
+
+class Command(BaseCommand):
+    """Django command to deliver outbox events to their consumers"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Events to hand to a consumer at a time.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=1.0,
+            help="Seconds to wait when all consumers are caught up.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once all consumers are caught up.",
+        )
+
+    def dispatch(self, consumers, batch_size):
+        delivered = 0
+        # each shard has its own events and checkpoints
+        for _ in each_shard():
+            for name, (handler, topics) in consumers.items():
+                try:
+                    delivered += deliver(name, handler, topics, batch_size)
+                except Exception as exc:
+                    # the batch is delivered again on the next poll
+                    self.stderr.write(f"consumer {name} failed: {exc!r}")
+
+        return delivered
+
+    def handle(self, *args, **options):
+        consumers = get_consumers()
+        self.stdout.write(
+            f"dispatching to {', '.join(consumers) or 'no consumers'}"
+        )
+
+        while True:
+            if self.dispatch(consumers, options["batch_size"]):
+                continue
+
+            pruned = sum(prune(consumers) for _ in each_shard())
+            if pruned:
+                self.stdout.write(f"pruned {pruned} delivered events")
+            if options["once"]:
+                break
+            time.sleep(options["poll_interval"])
+
+        self.stdout.write(self.style.SUCCESS("consumers are caught up"))
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+
+from cinema.sharding import (
+    GroupChanged,
+    group_sizes,
+    move_group,
+    plan_moves,
+)
+from cinema_api.db.sharding import is_sharded, shards, sync_broadcast
+
+
+class Command(BaseCommand):
+    """Django command to even out the sessions on the shards"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report the groups of halls that would move.",
+        )
+
+    def handle(self, *args, **options):
+        if not is_sharded():
+            self.stdout.write("only one shard is configured")
+            return
+
+        for alias in shards()[1:]:
+            sync_broadcast(alias)
+        self.stdout.write("copied the catalog to every shard")
+
+        moves = plan_moves(group_sizes())
+        moved = 0
+        for group, source, target, sessions in moves:
+            self.stdout.write(
+                f"group {group} ({sessions} sessions): {source} -> {target}"
+            )
+            if options["dry_run"]:
+                continue
+            try:
+                move_group(group, target)
+            except GroupChanged as error:
+                # moved by a later run
+                self.stderr.write(f"{error} Left on {source}.")
+            else:
+                moved += 1
+
+        if options["dry_run"]:
+            self.stdout.write(f"{len(moves)} groups would move")
+            return
+
+        self.stdout.write(self.style.SUCCESS(f"{moved} groups moved"))
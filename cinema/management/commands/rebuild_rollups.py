@@ -0,0 +1,39 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from cinema.rollups import rebuild
+from cinema_api.db.sharding import each_shard
+
+
+class Command(BaseCommand):
+    """Django command to recompute the occupancy rollups from tickets"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--from",
+            dest="start",
+            type=date.fromisoformat,
+            help="First day to rebuild (default: earliest session).",
+        )
+        parser.add_argument(
+            "--to",
+            dest="end",
+            type=date.fromisoformat,
+            help="Last day to rebuild (default: latest session).",
+        )
+        parser.add_argument(
+            "--chunk-days",
+            type=int,
+            default=7,
+            help="Days to recompute per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        for shard in each_shard():
+            for day in rebuild(
+                options["start"], options["end"], options["chunk_days"]
+            ):
+                self.stdout.write(f"rebuilt rollups from {day} on {shard}")
+
+        self.stdout.write(self.style.SUCCESS("rollups are up to date"))
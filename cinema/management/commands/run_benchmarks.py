@@ -0,0 +1,117 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import (
+    override_settings,
+    setup_databases,
+    teardown_databases,
+)
+
+from benchmarks.micro import (
+    cases,
+    compare,
+    key,
+    read_baseline,
+    run_suite,
+    write_baseline,
+)
+
+
+def sizes(value):
+    return [int(size) for size in value.split(",")]
+
+
+class Command(BaseCommand):
+    """
+    Django command to run the microbenchmarks (see ``benchmarks.micro``)
+    on a throwaway test database and compare them against a baseline
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            type=sizes,
+            default=[10, 1000, 100000],
+            help="Comma-separated numbers of rows to run each case on.",
+        )
+        parser.add_argument(
+            "--case",
+            action="append",
+            dest="cases",
+            help="Only run this case (repeatable).",
+        )
+        parser.add_argument(
+            "--min-time",
+            type=float,
+            default=0.5,
+            help="Seconds to repeat each case for.",
+        )
+        parser.add_argument(
+            "--baseline",
+            default=str(settings.BASE_DIR / "benchmarks" / "baseline.json"),
+            help="Results to compare against.",
+        )
+        parser.add_argument(
+            "--save-baseline",
+            action="store_true",
+            help="Store these results as the baseline.",
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.25,
+            help="Slowdown or memory growth flagged as a regression.",
+        )
+
+    def handle(self, *args, **options):
+        unknown = set(options["cases"] or ()) - cases().keys()
+        if unknown:
+            raise CommandError(f"unknown cases: {', '.join(sorted(unknown))}")
+
+        baseline = read_baseline(options["baseline"])
+        self.stdout.write(
+            f"{'case':<34} {'rows':>7} {'ops/s':>10} {'peak KiB':>10} "
+            f"{'vs baseline':>12}"
+        )
+
+        def report(name, size, measurement):
+            before = baseline.get(key(name, size))
+            change = ""
+            if before:
+                speed = measurement["ops_per_sec"] / before["ops_per_sec"]
+                change = f"{speed - 1:+.0%}"
+            self.stdout.write(
+                f"{name:<34} {size:>7} {measurement['ops_per_sec']:>10.2f} "
+                f"{measurement['peak_kib']:>10.0f} {change:>12}"
+            )
+
+        # query logging would grow with every run
+        with override_settings(DEBUG=False):
+            old_config = setup_databases(verbosity=0, interactive=False)
+            try:
+                results = run_suite(
+                    options["sizes"],
+                    options["min_time"],
+                    options["cases"],
+                    report,
+                )
+            finally:
+                teardown_databases(old_config, verbosity=0)
+
+        if options["save_baseline"]:
+            write_baseline(options["baseline"], results, baseline)
+            self.stdout.write(
+                self.style.SUCCESS(f"baseline saved to {options['baseline']}")
+            )
+            return
+
+        regressions = compare(results, baseline, options["tolerance"])
+        if regressions:
+            raise CommandError(
+                "regressions:\n"
+                + "\n".join(
+                    f"  {name}: {', '.join(found)}"
+                    for name, found in regressions.items()
+                )
+            )
+        if baseline:
+            self.stdout.write(self.style.SUCCESS("no regressions"))
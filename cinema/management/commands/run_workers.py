@@ -0,0 +1,82 @@
+import multiprocessing
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from cinema.jobs import run_worker
+
+
+def work(queues, once, poll_interval):
+    """Worker process: finishes its current job on SIGTERM/SIGINT"""
+    stop = threading.Event()
+    handlers = {
+        signum: signal.signal(signum, lambda *args: stop.set())
+        for signum in (signal.SIGTERM, signal.SIGINT)
+    }
+
+    try:
+        return run_worker(queues, once, poll_interval, stop)
+    finally:
+        for signum, handler in handlers.items():
+            signal.signal(signum, handler)
+
+
+class Command(BaseCommand):
+    """Django command to run background jobs from the job table"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=1,
+            help="Worker processes to run.",
+        )
+        parser.add_argument(
+            "--queues",
+            type=lambda value: value.split(","),
+            help="Comma-separated queues to take jobs from (default: all).",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=1.0,
+            help="Seconds to wait when no job is due.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once no job is due.",
+        )
+
+    def handle(self, *args, **options):
+        worker_args = (
+            options["queues"], options["once"], options["poll_interval"]
+        )
+
+        if options["processes"] == 1:
+            ran = work(*worker_args)
+            self.stdout.write(self.style.SUCCESS(f"ran {ran} jobs"))
+            return
+
+        # each process opens connections of its own
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(target=work, args=worker_args)
+            for _ in range(options["processes"])
+        ]
+        for process in processes:
+            process.start()
+        self.stdout.write(f"started {len(processes)} workers")
+
+        def stop(*args):
+            for process in processes:
+                process.terminate()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        for process in processes:
+            process.join()
+
+        self.stdout.write(self.style.SUCCESS("workers stopped"))
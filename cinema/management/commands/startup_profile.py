@@ -0,0 +1,107 @@
+import json
+import subprocess
+import sys
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from cinema_api.startup import IMPORT_TIME_PREFIX, parse_import_times
+
+PROBE = "from cinema_api.startup import probe; probe({path!r}, {host!r})"
+
+
+def milliseconds(seconds):
+    return f"{seconds * 1000:8.1f} ms"
+
+
+class Command(BaseCommand):
+    """
+    Django command to profile a cold start: boots the project in a fresh
+    interpreter under ``-X importtime`` and reports the slowest imports,
+    the cost of every app and the time to the first request
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--path",
+            default="/api/health/ready/",
+            help="Path of the first request.",
+        )
+        parser.add_argument(
+            "--host",
+            default="localhost",
+            help="Host header of the first request (see ALLOWED_HOSTS).",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=15,
+            help="Number of modules and packages to list.",
+        )
+
+    def handle(self, *args, **options):
+        process = subprocess.run(
+            [
+                sys.executable,
+                "-X",
+                "importtime",
+                "-c",
+                PROBE.format(path=options["path"], host=options["host"]),
+            ],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+        )
+        if process.returncode:
+            errors = [
+                line
+                for line in process.stderr.splitlines()
+                if not line.startswith(IMPORT_TIME_PREFIX)
+            ]
+            raise CommandError("\n".join(errors[-20:]))
+
+        report = json.loads(process.stdout.splitlines()[-1])
+        modules = parse_import_times(process.stderr.splitlines())
+        limit = options["limit"]
+
+        self.stdout.write(
+            f"cold start: {milliseconds(report['total']).strip()}, "
+            f"{len(modules)} modules imported"
+        )
+        self.stdout.write("\nphases:")
+        for phase, seconds in report["phases"].items():
+            self.stdout.write(f"  {milliseconds(seconds)}  {phase}")
+        self.stdout.write(
+            f"  first request: {options['path']} -> {report['status']}"
+        )
+
+        self.stdout.write("\napps (import, models, ready):")
+        for label, timings in sorted(
+            report["apps"].items(),
+            key=lambda item: -sum(item[1].values()),
+        ):
+            self.stdout.write(
+                f"  {milliseconds(sum(timings.values()))}  {label} ("
+                + ", ".join(
+                    milliseconds(timings.get(step, 0)).strip()
+                    for step in ("import", "models", "ready")
+                )
+                + ")"
+            )
+
+        packages = Counter()
+        for name, (own, _) in modules.items():
+            packages[name.partition(".")[0]] += own
+        self.stdout.write("\npackages by import time:")
+        for package, seconds in packages.most_common(limit):
+            self.stdout.write(f"  {milliseconds(seconds)}  {package}")
+
+        self.stdout.write("\nmodules by own import time:")
+        for name, (own, cumulative) in sorted(
+            modules.items(), key=lambda item: -item[1][0]
+        )[:limit]:
+            self.stdout.write(
+                f"  {milliseconds(own)}  {name} "
+                f"(with imports {milliseconds(cumulative).strip()})"
+            )
@@ -1,22 +1,58 @@
 import time
 
-from django.core.management.base import BaseCommand
-from django.db import connections
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
 from django.db.utils import OperationalError
 
 
 class Command(BaseCommand):
     """ Django command to pause execution until database is available"""
 
-    def handle(self, *args, **kwargs):
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--database",
+            default=DEFAULT_DB_ALIAS,
+            help="Database alias to wait for.",
+        )
+        parser.add_argument(
+            "--timeout",
+            type=float,
+            default=60,
+            help="Give up after this many seconds.",
+        )
+        parser.add_argument(
+            "--max-delay",
+            type=float,
+            default=5,
+            help="Upper bound for the delay between attempts.",
+        )
+
+    def handle(self, *args, **options):
         self.stdout.write("waiting for db ...")
-        db_conn = None
-        while not db_conn:
+        db_conn = connections[options["database"]]
+        deadline = time.monotonic() + options["timeout"]
+        delay = 0.1
+
+        while True:
             try:
-                # get the database with keyword 'default' from settings.py
-                db_conn = connections["default"]
-                # prints success message in green
-                self.stdout.write(self.style.SUCCESS("db available"))
+                # actually open a connection and run a trivial query
+                with db_conn.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                break
             except OperationalError:
-                self.stdout.write("Database unavailable, waiting 1 second ...")
-                time.sleep(1)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise CommandError(
+                        f"Database unavailable after {options['timeout']}s"
+                    )
+
+                delay = min(delay * 2, options["max_delay"], remaining)
+                self.stdout.write(
+                    f"Database unavailable, waiting {delay:.1f} seconds ..."
+                )
+                db_conn.close()
+                time.sleep(delay)
+
+        db_conn.close()
+        # prints success message in green
+        self.stdout.write(self.style.SUCCESS("db available"))
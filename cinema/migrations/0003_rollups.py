@@ -0,0 +1,192 @@
+# Generated by Django 4.2.1 on 2026-10-19 07:16
+
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models.functions import TruncDate
+
+BATCH_SIZE = 1000
+
+
+def fill_rollups(apps, schema_editor):
+    # the rollups of the sessions and tickets sold so far, in one pass
+    db = schema_editor.connection.alias
+    movie_session = apps.get_model("cinema", "MovieSession")
+    session_occupancy = apps.get_model("cinema", "SessionOccupancy")
+    movie_day_sales = apps.get_model("cinema", "MovieDaySales")
+    hall_day_occupancy = apps.get_model("cinema", "HallDayOccupancy")
+
+    movie_totals = defaultdict(lambda: [0, 0, 0])
+    hall_totals = defaultdict(lambda: [0, 0, 0])
+    occupancy = []
+    rows = (
+        movie_session.objects.using(db)
+        .order_by()
+        .annotate(day=TruncDate("show_time"), sold=models.Count("tickets"))
+        .values_list(
+            "id",
+            "movie_id",
+            "cinema_hall_id",
+            "day",
+            "sold",
+            "cinema_hall__rows",
+            "cinema_hall__seats_in_row",
+        )
+    )
+    for session_id, movie_id, hall_id, day, sold, hall_rows, seats_in_row in (
+        rows.iterator(chunk_size=BATCH_SIZE)
+    ):
+        capacity = hall_rows * seats_in_row
+        occupancy.append(
+            session_occupancy(
+                movie_session_id=session_id,
+                tickets_sold=sold,
+                capacity=capacity,
+            )
+        )
+        for totals in (movie_totals[movie_id, day], hall_totals[hall_id, day]):
+            totals[0] += 1
+            totals[1] += sold
+            totals[2] += capacity
+        if len(occupancy) == BATCH_SIZE:
+            session_occupancy.objects.using(db).bulk_create(occupancy)
+            occupancy = []
+
+    session_occupancy.objects.using(db).bulk_create(occupancy)
+    movie_day_sales.objects.using(db).bulk_create(
+        [
+            movie_day_sales(
+                movie_id=movie_id,
+                day=day,
+                sessions=sessions,
+                tickets_sold=sold,
+                capacity=capacity,
+            )
+            for (movie_id, day), (sessions, sold, capacity)
+            in movie_totals.items()
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    hall_day_occupancy.objects.using(db).bulk_create(
+        [
+            hall_day_occupancy(
+                cinema_hall_id=hall_id,
+                day=day,
+                sessions=sessions,
+                tickets_sold=sold,
+                capacity=capacity,
+            )
+            for (hall_id, day), (sessions, sold, capacity)
+            in hall_totals.items()
+        ],
+        batch_size=BATCH_SIZE,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("cinema", "0002_auto_20230517_1421"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SessionOccupancy",
+            fields=[
+                (
+                    "movie_session",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="occupancy",
+                        serialize=False,
+                        to="cinema.moviesession",
+                    ),
+                ),
+                ("tickets_sold", models.PositiveIntegerField(default=0)),
+                ("capacity", models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="HallDayOccupancy",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("sessions", models.PositiveIntegerField(default=0)),
+                ("tickets_sold", models.PositiveIntegerField(default=0)),
+                ("capacity", models.PositiveIntegerField(default=0)),
+                (
+                    "cinema_hall",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="day_occupancy",
+                        to="cinema.cinemahall",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["day", "cinema_hall"],
+            },
+        ),
+        migrations.CreateModel(
+            name="MovieDaySales",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("sessions", models.PositiveIntegerField(default=0)),
+                ("tickets_sold", models.PositiveIntegerField(default=0)),
+                ("capacity", models.PositiveIntegerField(default=0)),
+                (
+                    "movie",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="day_sales",
+                        to="cinema.movie",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["day", "movie"],
+                "indexes": [
+                    models.Index(
+                        fields=["day"], name="cinema_movi_day_6b1842_idx"
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="moviedaysales",
+            constraint=models.UniqueConstraint(
+                fields=("movie", "day"), name="unique_movie_day_sales"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="halldayoccupancy",
+            index=models.Index(
+                fields=["day"], name="cinema_hall_day_1f358b_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="halldayoccupancy",
+            constraint=models.UniqueConstraint(
+                fields=("cinema_hall", "day"), name="unique_hall_day_occupancy"
+            ),
+        ),
+        migrations.RunPython(fill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,89 @@
+# Generated by Django 4.2.1 on 2026-10-19 07:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# On PostgreSQL the archive is range-partitioned by show_time; partitions
+# are created on demand by cinema.archive.ensure_partitions. The primary
+# key of a partitioned table has to include the partition key.
+PARTITIONED_TABLE_SQL = [
+    """
+    CREATE TABLE "cinema_archivedticket" (
+        "id" bigint NOT NULL,
+        "row" integer NOT NULL,
+        "seat" integer NOT NULL,
+        "show_time" timestamp with time zone NOT NULL,
+        "movie_session_id" bigint NOT NULL
+            REFERENCES "cinema_moviesession" ("id")
+            DEFERRABLE INITIALLY DEFERRED,
+        "order_id" bigint NOT NULL
+            REFERENCES "cinema_order" ("id")
+            DEFERRABLE INITIALLY DEFERRED,
+        PRIMARY KEY ("id", "show_time")
+    ) PARTITION BY RANGE ("show_time")
+    """,
+    'CREATE INDEX "cinema_archivedticket_movie_session_id" '
+    'ON "cinema_archivedticket" ("movie_session_id")',
+    'CREATE INDEX "cinema_archivedticket_order_id" '
+    'ON "cinema_archivedticket" ("order_id")',
+]
+
+
+def create_archive_table(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        schema_editor.create_model(apps.get_model("cinema", "ArchivedTicket"))
+        return
+
+    for sql in PARTITIONED_TABLE_SQL:
+        schema_editor.execute(sql)
+
+
+def drop_archive_table(apps, schema_editor):
+    schema_editor.delete_model(apps.get_model("cinema", "ArchivedTicket"))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("cinema", "0003_rollups"),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name="ArchivedTicket",
+                    fields=[
+                        (
+                            "id",
+                            models.BigIntegerField(
+                                primary_key=True, serialize=False
+                            ),
+                        ),
+                        ("row", models.IntegerField()),
+                        ("seat", models.IntegerField()),
+                        ("show_time", models.DateTimeField()),
+                        (
+                            "movie_session",
+                            models.ForeignKey(
+                                on_delete=django.db.models.deletion.CASCADE,
+                                related_name="archived_tickets",
+                                to="cinema.moviesession",
+                            ),
+                        ),
+                        (
+                            "order",
+                            models.ForeignKey(
+                                on_delete=django.db.models.deletion.CASCADE,
+                                related_name="archived_tickets",
+                                to="cinema.order",
+                            ),
+                        ),
+                    ],
+                    options={
+                        "ordering": ["row", "seat"],
+                    },
+                ),
+            ],
+        ),
+        migrations.RunPython(create_archive_table, drop_archive_table),
+    ]
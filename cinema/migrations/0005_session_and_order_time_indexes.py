@@ -0,0 +1,22 @@
+# Generated by Django 4.2.1 on 2026-10-19 07:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("cinema", "0004_archivedticket"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="moviesession",
+            name="show_time",
+            field=models.DateTimeField(db_index=True),
+        ),
+        migrations.AlterField(
+            model_name="order",
+            name="created_at",
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
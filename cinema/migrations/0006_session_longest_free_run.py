@@ -0,0 +1,73 @@
+# Generated by Django 4.2.1 on 2026-10-19 07:28
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+from cinema.seating import SeatGrid
+
+BATCH_SIZE = 500
+
+
+def fill_free_runs(apps, schema_editor):
+    # from the live and archived tickets of the sessions, a batch at a time
+    db = schema_editor.connection.alias
+    session_occupancy = apps.get_model("cinema", "SessionOccupancy")
+    ticket_models = [
+        apps.get_model("cinema", "Ticket"),
+        apps.get_model("cinema", "ArchivedTicket"),
+    ]
+
+    last = None
+    while True:
+        batch = session_occupancy.objects.using(db).order_by("pk")
+        if last is not None:
+            batch = batch.filter(pk__gt=last)
+        batch = list(
+            batch.values_list(
+                "pk",
+                "movie_session__cinema_hall__rows",
+                "movie_session__cinema_hall__seats_in_row",
+            )[:BATCH_SIZE]
+        )
+        if not batch:
+            return
+        last = batch[-1][0]
+
+        taken = defaultdict(list)
+        for ticket_model in ticket_models:
+            for session_id, row, seat in (
+                ticket_model.objects.using(db)
+                .filter(movie_session_id__in=[pk for pk, _, _ in batch])
+                .order_by()
+                .values_list("movie_session_id", "row", "seat")
+            ):
+                taken[session_id].append((row, seat))
+
+        session_occupancy.objects.using(db).bulk_update(
+            [
+                session_occupancy(
+                    movie_session_id=pk,
+                    longest_free_run=SeatGrid(
+                        rows, seats_in_row, taken[pk]
+                    ).longest_free_run(),
+                )
+                for pk, rows, seats_in_row in batch
+            ],
+            ["longest_free_run"],
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("cinema", "0005_session_and_order_time_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="sessionoccupancy",
+            name="longest_free_run",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_free_runs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.1 on 2026-10-19 09:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("cinema", "0012_idempotency_key_shards"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="outboxcheckpoint",
+            name="gaps",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
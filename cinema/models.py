@@ -3,9 +3,12 @@ import uuid
 
 from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.utils.text import slugify
 
+from cinema.reads import reads
+
 
 class CinemaHall(models.Model):
     name = models.CharField(max_length=255)
@@ -13,6 +16,7 @@ class CinemaHall(models.Model):
     seats_in_row = models.IntegerField()
 
     @property
+    @reads("rows", "seats_in_row")
     def capacity(self) -> int:
         return self.rows * self.seats_in_row
 
@@ -35,6 +39,7 @@ class Actor(models.Model):
         return self.first_name + " " + self.last_name
 
     @property
+    @reads("first_name", "last_name")
     def full_name(self):
         return f"{self.first_name} {self.last_name}"
 
@@ -62,9 +67,11 @@ class Movie(models.Model):
 
 
 class MovieSession(models.Model):
-    show_time = models.DateTimeField()
+    show_time = models.DateTimeField(db_index=True)
     movie = models.ForeignKey(Movie, on_delete=models.CASCADE)
     cinema_hall = models.ForeignKey(CinemaHall, on_delete=models.CASCADE)
+    # orders go through the booking queue (see cinema.booking)
+    queued_booking = models.BooleanField(default=False)
 
     class Meta:
         ordering = ["-show_time"]
@@ -74,14 +81,24 @@ class MovieSession(models.Model):
 
 
 class Order(models.Model):
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    # users live on the default database, orders on any shard
     user = models.ForeignKey(
-        settings.AUTH_USER_MODEL, on_delete=models.CASCADE
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, db_constraint=False
     )
 
     def __str__(self):
         return str(self.created_at)
 
+    @property
+    @reads("tickets", "archived_tickets")
+    def all_tickets(self):
+        """Live and archived tickets of the order (see ``cinema.archive``)"""
+        return sorted(
+            [*self.tickets.all(), *self.archived_tickets.all()],
+            key=lambda ticket: (ticket.row, ticket.seat, ticket.id),
+        )
+
     class Meta:
         ordering = ["-created_at"]
 
@@ -141,3 +158,274 @@ class Ticket(models.Model):
     class Meta:
         unique_together = ("movie_session", "row", "seat")
         ordering = ["row", "seat"]
+
+
+class ArchivedTicket(models.Model):
+    """
+    Ticket of a past session moved out of the hot ``Ticket`` table by
+    ``manage.py archive_sessions``. ``show_time`` is copied from the
+    session: on PostgreSQL the table is range-partitioned by it.
+    """
+
+    id = models.BigIntegerField(primary_key=True)  # noqa: VNE003
+    movie_session = models.ForeignKey(
+        MovieSession,
+        on_delete=models.CASCADE,
+        related_name="archived_tickets",
+    )
+    order = models.ForeignKey(
+        Order, on_delete=models.CASCADE, related_name="archived_tickets"
+    )
+    row = models.IntegerField()
+    seat = models.IntegerField()
+    show_time = models.DateTimeField()
+
+    class Meta:
+        ordering = ["row", "seat"]
+
+    def __str__(self):
+        return (
+            f"{str(self.movie_session)} (row: {self.row}, seat: {self.seat})"
+        )
+
+
+class SessionOccupancy(models.Model):
+    """Tickets sold per movie session, maintained by ``cinema.rollups``"""
+
+    movie_session = models.OneToOneField(
+        MovieSession,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="occupancy",
+    )
+    tickets_sold = models.PositiveIntegerField(default=0)
+    capacity = models.PositiveIntegerField(default=0)
+    # most adjacent free seats in any row, for group searches
+    longest_free_run = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.movie_session_id}: {self.tickets_sold}/{self.capacity}"
+
+
+class MovieDaySales(models.Model):
+    """Sessions and tickets sold per movie and day"""
+
+    movie = models.ForeignKey(
+        Movie, on_delete=models.CASCADE, related_name="day_sales"
+    )
+    day = models.DateField()
+    sessions = models.PositiveIntegerField(default=0)
+    tickets_sold = models.PositiveIntegerField(default=0)
+    capacity = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["day", "movie"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["movie", "day"], name="unique_movie_day_sales"
+            )
+        ]
+        indexes = [models.Index(fields=["day"])]
+
+    def __str__(self):
+        return f"{self.movie_id} {self.day}: {self.tickets_sold}"
+
+
+class HallDayOccupancy(models.Model):
+    """Sessions and tickets sold per cinema hall and day"""
+
+    cinema_hall = models.ForeignKey(
+        CinemaHall, on_delete=models.CASCADE, related_name="day_occupancy"
+    )
+    day = models.DateField()
+    sessions = models.PositiveIntegerField(default=0)
+    tickets_sold = models.PositiveIntegerField(default=0)
+    capacity = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["day", "cinema_hall"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["cinema_hall", "day"], name="unique_hall_day_occupancy"
+            )
+        ]
+        indexes = [models.Index(fields=["day"])]
+
+    def __str__(self):
+        return f"{self.cinema_hall_id} {self.day}: {self.tickets_sold}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    Response of an order created with an ``Idempotency-Key`` header,
+    replayed to retries of the request until ``expires_at``.
+    """
+
+    # users live on the default database, keys next to their orders
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="+",
+        db_constraint=False,
+    )
+    key = models.CharField(max_length=255)
+    # digest of the request data, so a key can't be reused for another
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(default=0)
+    response = models.JSONField(null=True, encoder=DjangoJSONEncoder)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "key"], name="unique_user_idempotency_key"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.key}"
+
+
+class OutboxEvent(models.Model):
+    """
+    Change event written in the transaction of the change it describes,
+    and delivered to consumers by ``manage.py dispatch_outbox`` (see
+    ``cinema.outbox``).
+    """
+
+    id = models.BigAutoField(primary_key=True)  # noqa: VNE003
+    topic = models.CharField(max_length=64)
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["id"]
+
+    def __str__(self):
+        return f"{self.id} {self.topic}"
+
+
+class OutboxCheckpoint(models.Model):
+    """Last outbox event a consumer has processed"""
+
+    consumer = models.CharField(max_length=64, primary_key=True)
+    last_event_id = models.BigIntegerField(default=0)
+    # ids below last_event_id not seen yet, with the time they were
+    # skipped at: events of transactions still open (see cinema.outbox)
+    gaps = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.consumer}: {self.last_event_id}"
+
+
+class BookingRequest(models.Model):
+    """Order waiting in the queue of its session (see ``cinema.booking``)"""
+
+    QUEUED = "queued"
+    BOOKED = "booked"
+    REJECTED = "rejected"
+    STATUSES = [
+        (QUEUED, "Queued"),
+        (BOOKED, "Booked"),
+        (REJECTED, "Rejected"),
+    ]
+
+    id = models.BigAutoField(primary_key=True)  # noqa: VNE003
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="+",
+        db_constraint=False,
+    )
+    movie_session = models.ForeignKey(
+        MovieSession, on_delete=models.CASCADE, related_name="+"
+    )
+    # [[row, seat], ...]
+    places = models.JSONField()
+    status = models.CharField(max_length=16, choices=STATUSES, default=QUEUED)
+    order = models.OneToOneField(
+        Order,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    errors = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-id"]
+        indexes = [models.Index(fields=["movie_session", "status", "id"])]
+
+    def __str__(self):
+        return f"{self.id} ({self.status})"
+
+
+class ShardPlacement(models.Model):
+    """Shard of a group of cinema halls (see ``cinema.sharding``)"""
+
+    group = models.PositiveIntegerField(primary_key=True)
+    shard = models.CharField(max_length=64)
+    # set while ``manage.py rebalance_shards`` copies the group
+    moving = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["group"]
+
+    def __str__(self):
+        return f"{self.group}: {self.shard}"
+
+
+class Job(models.Model):
+    """Background job run by ``manage.py run_workers`` (see ``cinema.jobs``)"""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUSES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    id = models.BigAutoField(primary_key=True)  # noqa: VNE003
+    queue = models.CharField(max_length=64, default="default")
+    task = models.CharField(max_length=255)
+    kwargs = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    status = models.CharField(max_length=16, choices=STATUSES, default=QUEUED)
+    # periodic jobs and deduplicated jobs are pending at most once per key
+    key = models.CharField(max_length=255, null=True, blank=True)
+    run_at = models.DateTimeField()
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=1)
+    # concurrency slot of a running job in a limited queue
+    slot = models.PositiveIntegerField(null=True, blank=True)
+    locked_by = models.CharField(max_length=255, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-id"]
+        indexes = [models.Index(fields=["status", "run_at"])]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["key"],
+                condition=models.Q(status__in=["queued", "running"]),
+                name="unique_pending_job_key",
+            ),
+            models.UniqueConstraint(
+                fields=["queue", "slot"],
+                condition=models.Q(status="running"),
+                name="unique_running_job_slot",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.id} {self.task} ({self.status})"
@@ -0,0 +1,229 @@
+"""
+Transactional outbox for ticket and catalog changes.
+
+Write paths add an ``OutboxEvent`` in the transaction of the change, so
+an event exists if and only if its change was committed, and the write
+only pays for one INSERT: one event per order or schedule change, not
+per ticket or session. Topics:
+
+* ``order.created``: ``{"order", "user", "tickets": [...]}``
+* ``movie_session.created``/``updated``/``deleted``:
+  ``{"movie_sessions": [...]}``
+* ``movie.created``/``updated``: ``{"movie"}``
+* ``booking.processed``: ``{"movie_session", "bookings": [...]}``, the
+  outcome of a batch of queued orders (see ``cinema.booking``)
+
+``manage.py dispatch_outbox`` tails the outbox and hands the events, in
+batches and in order, to the consumers in ``settings.OUTBOX_CONSUMERS``::
+
+    OUTBOX_CONSUMERS = {
+        "seat-maps": {
+            "handler": "notifications.push_seat_maps",
+            "topics": ["order.created", "movie_session.deleted"],
+        },
+    }
+
+Each consumer keeps an ``OutboxCheckpoint``, which moves past a batch
+only once its handler has returned. A handler that raises gets the same
+batch again on the next poll, so delivery is at least once and handlers
+should be idempotent. The handler runs in the transaction that moves
+the checkpoint, so its own database writes commit together with it.
+
+Event ids are taken at INSERT but become visible at COMMIT, so a
+smaller id may show up after a bigger one was delivered. A checkpoint
+keeps the ids it moved past without seeing them (``gaps``), and each
+poll looks for them again until ``OUTBOX_GAP_TIMEOUT_SECONDS`` after
+they were skipped, which must be longer than write transactions take.
+Events come in id order, except for those that show up late.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import Min, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from cinema.models import OutboxCheckpoint, OutboxEvent
+
+
+def record(topic, payload):
+    """Add an event to the outbox, in the current transaction"""
+    return OutboxEvent.objects.create(topic=topic, payload=payload)
+
+
+def order_created(order, tickets):
+    return OutboxEvent(
+        topic="order.created",
+        payload={
+            "order": order.id,
+            "user": order.user_id,
+            "tickets": [
+                {
+                    "id": ticket.id,
+                    "movie_session": ticket.movie_session_id,
+                    "row": ticket.row,
+                    "seat": ticket.seat,
+                }
+                for ticket in tickets
+            ],
+        },
+    )
+
+
+def record_order(order, tickets):
+    event = order_created(order, tickets)
+    event.save()
+    return event
+
+
+def record_orders(orders):
+    """``order.created`` events of ``(order, tickets)`` in one INSERT"""
+    return OutboxEvent.objects.bulk_create(
+        [order_created(order, tickets) for order, tickets in orders]
+    )
+
+
+def record_bookings(movie_session, booking_requests):
+    return record(
+        "booking.processed",
+        {
+            "movie_session": movie_session.id,
+            "bookings": [
+                {
+                    "id": booking_request.id,
+                    "user": booking_request.user_id,
+                    "status": booking_request.status,
+                    "order": booking_request.order_id,
+                    "errors": booking_request.errors,
+                }
+                for booking_request in booking_requests
+            ],
+        },
+    )
+
+
+def record_sessions(change, movie_sessions):
+    return record(
+        f"movie_session.{change}",
+        {
+            "movie_sessions": [
+                {
+                    "id": movie_session.id,
+                    "show_time": movie_session.show_time,
+                    "movie": movie_session.movie_id,
+                    "cinema_hall": movie_session.cinema_hall_id,
+                }
+                for movie_session in movie_sessions
+            ]
+        },
+    )
+
+
+def record_movie(change, movie):
+    return record(f"movie.{change}", {"movie": movie.id})
+
+
+def get_consumers():
+    """``{name: (handler, topics)}`` from ``settings.OUTBOX_CONSUMERS``"""
+    return {
+        name: (import_string(consumer["handler"]), consumer.get("topics"))
+        for name, consumer in settings.OUTBOX_CONSUMERS.items()
+    }
+
+
+def pending_events(last_event_id, gaps=()):
+    # read next to the checkpoints, not from a lagging replica
+    return (
+        OutboxEvent.objects.using(router.db_for_write(OutboxEvent))
+        .filter(Q(id__gt=last_event_id) | Q(id__in=list(gaps)))
+        .order_by("id")
+    )
+
+
+def skipped_ids(last_event_id, events):
+    """Ids between the checkpoint and the new ``events`` not among them"""
+    ids = [event.id for event in events if event.id > last_event_id]
+    # the ids before the first event of a shard start its id range
+    previous = last_event_id or ids[0] - 1
+    skipped = []
+    for pk in ids:
+        skipped.extend(range(previous + 1, pk))
+        previous = pk
+
+    return skipped
+
+
+def deliver(name, handler, topics=None, batch_size=500):
+    """
+    Hand the next batch of events to consumer ``name`` and move its
+    checkpoint past them. Returns the number of events read, of which
+    only those in ``topics`` (all by default) go to the handler.
+    """
+    with transaction.atomic(using=router.db_for_write(OutboxCheckpoint)):
+        # concurrent dispatchers wait here instead of delivering twice
+        checkpoint, _ = (
+            OutboxCheckpoint.objects.select_for_update().get_or_create(
+                consumer=name
+            )
+        )
+        now = timezone.now().timestamp()
+        gaps = {
+            int(pk): skipped_at
+            for pk, skipped_at in checkpoint.gaps.items()
+            # else given up on, as rolled back
+            if now - skipped_at < settings.OUTBOX_GAP_TIMEOUT_SECONDS
+        }
+        events = list(
+            pending_events(checkpoint.last_event_id, gaps)[:batch_size]
+        )
+        if not events:
+            if len(gaps) < len(checkpoint.gaps):
+                checkpoint.gaps = {str(pk): at for pk, at in gaps.items()}
+                checkpoint.save()
+            return 0
+
+        wanted = [
+            event for event in events if not topics or event.topic in topics
+        ]
+        if wanted:
+            handler(wanted)
+
+        if events[-1].id > checkpoint.last_event_id:
+            gaps.update(
+                dict.fromkeys(
+                    skipped_ids(checkpoint.last_event_id, events), now
+                )
+            )
+            checkpoint.last_event_id = events[-1].id
+        for event in events:
+            gaps.pop(event.id, None)
+        checkpoint.gaps = {str(pk): at for pk, at in gaps.items()}
+        checkpoint.save()
+
+    return len(events)
+
+
+def prune(consumers):
+    """
+    Delete the events all ``consumers`` have processed once they are
+    older than ``OUTBOX_RETENTION_SECONDS``.
+    """
+    events = OutboxEvent.objects.filter(
+        created_at__lt=timezone.now()
+        - timedelta(seconds=settings.OUTBOX_RETENTION_SECONDS)
+    )
+    if consumers:
+        checkpoints = OutboxCheckpoint.objects.using(
+            router.db_for_write(OutboxCheckpoint)
+        ).filter(consumer__in=consumers)
+        if checkpoints.count() < len(consumers):
+            # a consumer that hasn't started yet needs every event
+            return 0
+        events = events.filter(
+            id__lte=checkpoints.aggregate(Min("last_event_id"))[
+                "last_event_id__min"
+            ]
+        )
+
+    return events.delete()[0]
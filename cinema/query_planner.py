@@ -0,0 +1,186 @@
+"""
+Query plans derived from serializers.
+
+``QueryPlannerMixin`` walks the fields of a viewset's serializer, down
+through nested serializers, related fields and dotted sources like
+``movie.title``, and fits the queryset to them: single-valued relations
+are joined with ``select_related``, multi-valued ones are prefetched
+with querysets planned the same way, and every model loads ``.only()``
+the columns read from it. As the plan follows the serializer it can't
+drift from it, and fields dropped by ``?fields=``/``?omit=`` (see
+``cinema.sparse_fields``) are neither joined, prefetched nor loaded.
+
+Model properties and ``SerializerMethodField`` methods may read
+anything, so their objects are loaded whole unless they declare what
+they read with ``@reads(...)``.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+from rest_framework.relations import (
+    ManyRelatedField,
+    PrimaryKeyRelatedField,
+    SlugRelatedField,
+)
+
+from cinema.reads import declared_reads
+
+
+class QueryPlan:
+    """The columns and relations read from one model"""
+
+    def __init__(self, model):
+        self.model = model
+        self.columns = {model._meta.pk.name}
+        self.whole = False
+        self.joined = {}
+        self.prefetched = {}
+
+    @classmethod
+    def for_serializer(cls, queryset, serializer):
+        plan = cls(queryset.model)
+        plan.read_fields(serializer.fields, queryset.query.annotations)
+        return plan
+
+    def read_fields(self, fields, annotations=()):
+        for field in fields.values():
+            if not field.write_only:
+                self.read_field(field, annotations)
+
+    def read_field(self, field, annotations=()):
+        if isinstance(field, serializers.SerializerMethodField):
+            method = getattr(field.parent, field.method_name)
+            self.read_declared(declared_reads(method), None)
+        elif not field.source_attrs:
+            # source="*"
+            if isinstance(field, serializers.Serializer):
+                self.read_fields(field.fields)
+            else:
+                self.whole = True
+        elif field.source_attrs[0] not in annotations:
+            self.read(field.source_attrs, field)
+
+    def read_declared(self, paths, field, rest=()):
+        if paths is None:
+            self.whole = True
+            return
+
+        for path in paths:
+            self.read([*path.split("__"), *rest], field)
+
+    def read(self, attrs, field):
+        """Plan reading ``field``'s value from the path ``attrs``"""
+        name, *rest = attrs
+        try:
+            model_field = self.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            if hasattr(self.model, name):
+                attribute = getattr(self.model, name)
+                self.read_declared(declared_reads(attribute), field, rest)
+            # anything else is set on the objects elsewhere, like the
+            # annotations of another viewset
+            return
+
+        if not model_field.is_relation:
+            self.columns.add(name)
+            return
+
+        if model_field.concrete and not model_field.many_to_many:
+            self.columns.add(model_field.name)
+            if name == model_field.attname or (
+                not rest and isinstance(field, PrimaryKeyRelatedField)
+            ):
+                # the foreign key column is all that is read
+                return
+
+        related = self.relation(model_field)
+        if rest:
+            related.read(rest, field)
+        else:
+            related.read_objects(field)
+
+    def read_objects(self, field):
+        """Plan ``field`` reading the objects of this plan's model"""
+        if isinstance(field, serializers.ListSerializer):
+            field = field.child
+        if isinstance(field, ManyRelatedField):
+            field = field.child_relation
+
+        if isinstance(field, serializers.Serializer):
+            self.read_fields(field.fields)
+        elif isinstance(field, SlugRelatedField):
+            self.read(field.slug_field.split("__"), None)
+        elif not isinstance(field, PrimaryKeyRelatedField):
+            self.whole = True
+
+    def relation(self, model_field):
+        if model_field.one_to_many or model_field.many_to_many:
+            plans = self.prefetched
+        else:
+            plans = self.joined
+
+        if model_field.name not in plans:
+            plan = QueryPlan(model_field.related_model)
+            if model_field.one_to_many:
+                # prefetched objects are matched by their foreign key
+                plan.columns.add(model_field.field.name)
+            plans[model_field.name] = plan
+
+        return plans[model_field.name]
+
+    def only(self, prefix=""):
+        if self.whole:
+            columns = [
+                field.name for field in self.model._meta.concrete_fields
+            ]
+        else:
+            columns = self.columns
+
+        for column in columns:
+            yield prefix + column
+        for name, plan in self.joined.items():
+            yield from plan.only(f"{prefix}{name}__")
+
+    def select_related(self, prefix=""):
+        for name, plan in self.joined.items():
+            yield prefix + name
+            yield from plan.select_related(f"{prefix}{name}__")
+
+    def prefetches(self, prefix=""):
+        for name, plan in self.prefetched.items():
+            yield Prefetch(
+                prefix + name,
+                queryset=plan.apply(plan.model._default_manager.all()),
+            )
+        for name, plan in self.joined.items():
+            yield from plan.prefetches(f"{prefix}{name}__")
+
+    def apply(self, queryset):
+        queryset = queryset.select_related(None).prefetch_related(None)
+        if self.joined:
+            queryset = queryset.select_related(*self.select_related())
+
+        return queryset.prefetch_related(*self.prefetches()).only(
+            *self.only()
+        )
+
+
+class QueryPlannerMixin:
+    """
+    Plan the queryset of the ``planned_actions`` of a viewset from its
+    serializer, in place of hand-written ``select_related`` and
+    ``prefetch_related`` calls.
+    """
+
+    planned_actions = ("list", "retrieve")
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action not in self.planned_actions:
+            return queryset
+
+        serializer = self.get_serializer()
+        if not isinstance(serializer, serializers.Serializer):
+            return queryset
+
+        return QueryPlan.for_serializer(queryset, serializer).apply(queryset)
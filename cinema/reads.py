@@ -0,0 +1,27 @@
+"""
+``@reads``, for models and serializers to declare what a property or a
+``SerializerMethodField`` method reads (see ``cinema.query_planner``).
+
+Kept apart from the planner so that ``cinema.models`` doesn't import
+Django REST framework: processes that only run jobs or commands start
+without it.
+"""
+
+
+def reads(*paths):
+    """
+    Declare the fields (``"rows"``, ``"movie__title"``) a model property
+    or a serializer method reads, for the query planner.
+    """
+
+    def decorate(function):
+        function.reads = paths
+        return function
+
+    return decorate
+
+
+def declared_reads(attribute):
+    if isinstance(attribute, property):
+        attribute = attribute.fget
+    return getattr(attribute, "reads", None)
@@ -0,0 +1,405 @@
+"""
+Occupancy rollups for reporting.
+
+``SessionOccupancy``, ``MovieDaySales`` and ``HallDayOccupancy`` hold
+pre-aggregated ticket counts so reports never group the ticket table.
+Selling tickets increments the affected rows in place; schedule changes
+recompute the movie-days and hall-days they touch from their sessions,
+and ``manage.py rebuild_rollups`` recomputes whole date ranges.
+``SessionOccupancy.longest_free_run`` is recomputed from the tickets of
+the sessions that sold seats, so searching for sessions with room for a
+group never reads the ticket table.
+
+Days are calendar days of ``show_time`` in the current time zone.
+"""
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.db import router, transaction
+from django.db.models import (
+    Case,
+    Count,
+    Exists,
+    F,
+    OuterRef,
+    Q,
+    Subquery,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from cinema.models import (
+    ArchivedTicket,
+    HallDayOccupancy,
+    MovieDaySales,
+    MovieSession,
+    SessionOccupancy,
+    Ticket,
+)
+from cinema.seating import SeatGrid
+
+
+TOTAL_FIELDS = ["sessions", "tickets_sold", "capacity"]
+
+
+def session_day(movie_session):
+    return timezone.localdate(movie_session.show_time)
+
+
+def session_keys(movie_sessions):
+    """Movie-days and hall-days of ``movie_sessions``"""
+    movie_days, hall_days = set(), set()
+    for movie_session in movie_sessions:
+        day = session_day(movie_session)
+        movie_days.add((movie_session.movie_id, day))
+        hall_days.add((movie_session.cinema_hall_id, day))
+
+    return movie_days, hall_days
+
+
+def record_tickets(tickets):
+    """
+    Add newly created ``tickets`` to the rollups with one UPDATE per
+    affected row. Rows that don't exist yet (sessions created outside
+    the API) are recomputed instead.
+
+    Runs in the order's transaction: the sessions' rows are locked before
+    their free runs are recomputed, so concurrent orders for a session
+    take turns and each counts the seats of the ones before it.
+    """
+    lock_occupancy({ticket.movie_session_id for ticket in tickets})
+
+    per_session = Counter()
+    per_movie_day = Counter()
+    per_hall_day = Counter()
+    for ticket in tickets:
+        movie_session = ticket.movie_session
+        day = session_day(movie_session)
+        per_session[
+            movie_session.id, movie_session.movie_id,
+            movie_session.cinema_hall_id, day,
+        ] += 1
+        per_movie_day[movie_session.movie_id, day] += 1
+        per_hall_day[movie_session.cinema_hall_id, day] += 1
+
+    halls = {
+        ticket.movie_session_id: (
+            ticket.movie_session.cinema_hall.rows,
+            ticket.movie_session.cinema_hall.seats_in_row,
+        )
+        for ticket in tickets
+    }
+    longest = longest_free_runs(halls)
+
+    missing_movie_days, missing_hall_days = set(), set()
+    for (session_id, movie_id, hall_id, day), sold in per_session.items():
+        if not SessionOccupancy.objects.filter(
+            movie_session_id=session_id
+        ).update(
+            tickets_sold=F("tickets_sold") + sold,
+            longest_free_run=longest[session_id],
+        ):
+            missing_movie_days.add((movie_id, day))
+            missing_hall_days.add((hall_id, day))
+    for (movie_id, day), sold in per_movie_day.items():
+        if (movie_id, day) in missing_movie_days:
+            continue
+        if not MovieDaySales.objects.filter(movie_id=movie_id, day=day).update(
+            tickets_sold=F("tickets_sold") + sold
+        ):
+            missing_movie_days.add((movie_id, day))
+    for (hall_id, day), sold in per_hall_day.items():
+        if (hall_id, day) in missing_hall_days:
+            continue
+        if not HallDayOccupancy.objects.filter(
+            cinema_hall_id=hall_id, day=day
+        ).update(tickets_sold=F("tickets_sold") + sold):
+            missing_hall_days.add((hall_id, day))
+
+    if missing_movie_days or missing_hall_days:
+        refresh(missing_movie_days, missing_hall_days)
+
+
+def lock_occupancy(session_ids):
+    """Lock the ``SessionOccupancy`` rows of ``session_ids``, in id order"""
+    list(
+        SessionOccupancy.objects.select_for_update()
+        .filter(movie_session_id__in=session_ids)
+        .order_by("pk")
+        .values_list("pk", flat=True)
+    )
+
+
+def count_per_session(model):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(movie_session=OuterRef("pk"))
+            .order_by()
+            .values("movie_session")
+            .annotate(count=Count("pk"))
+            .values("count")
+        ),
+        0,
+    )
+
+
+def seats_left():
+    """
+    Seats left of the sessions of a ``MovieSession`` queryset, from their
+    rollup or, for sessions without one yet (e.g. created in the admin),
+    by counting their tickets
+    """
+    return Coalesce(
+        F("occupancy__capacity") - F("occupancy__tickets_sold"),
+        F("cinema_hall__rows") * F("cinema_hall__seats_in_row")
+        - count_per_session(Ticket)
+        - count_per_session(ArchivedTicket),
+    )
+
+
+def longest_free_run():
+    """
+    Most adjacent free seats of the sessions of a ``MovieSession``
+    queryset, from their rollup. A session without one is free from end
+    to end if it sold no tickets; otherwise it is left out (0) until
+    ``manage.py rebuild_rollups`` computes it.
+    """
+    sold = Exists(
+        Ticket.objects.filter(movie_session=OuterRef("pk"))
+    ) | Exists(ArchivedTicket.objects.filter(movie_session=OuterRef("pk")))
+    return Coalesce(
+        F("occupancy__longest_free_run"),
+        Case(
+            When(sold, then=Value(0)),
+            default=F("cinema_hall__seats_in_row"),
+        ),
+    )
+
+
+def longest_free_runs(halls):
+    """
+    Most adjacent free seats per session of ``halls`` ({session id:
+    (rows, seats in row)}), from its live and archived tickets
+    """
+    if not halls:
+        return {}
+
+    taken = defaultdict(list)
+    for model in (Ticket, ArchivedTicket):
+        for session_id, row, seat in (
+            model.objects.filter(movie_session_id__in=list(halls))
+            .order_by()
+            .values_list("movie_session_id", "row", "seat")
+        ):
+            taken[session_id].append((row, seat))
+
+    return {
+        session_id: SeatGrid(
+            rows, seats_in_row, taken[session_id]
+        ).longest_free_run()
+        for session_id, (rows, seats_in_row) in halls.items()
+    }
+
+
+def session_rows(movie_sessions):
+    """
+    (id, movie, hall, day, sold, rows, seats in row) per session, in one
+    query
+    """
+    return (
+        movie_sessions.order_by()
+        .annotate(
+            day=TruncDate("show_time"),
+            sold=(
+                count_per_session(Ticket)
+                + count_per_session(ArchivedTicket)
+            ),
+        )
+        .values_list(
+            "id",
+            "movie_id",
+            "cinema_hall_id",
+            "day",
+            "sold",
+            "cinema_hall__rows",
+            "cinema_hall__seats_in_row",
+        )
+    )
+
+
+def write(rows, movie_days=None, hall_days=None):
+    """
+    Upsert rollups computed from session ``rows``. Only the given keys
+    are written when ``movie_days``/``hall_days`` are passed, because the
+    rows may cover other days only partially. Returns the keys written.
+    """
+    movie_totals = defaultdict(lambda: [0, 0, 0])
+    hall_totals = defaultdict(lambda: [0, 0, 0])
+    occupancy = []
+
+    rows = list(rows)
+    # sessions without tickets are free from end to end
+    longest = longest_free_runs(
+        {
+            session_id: (hall_rows, seats_in_row)
+            for session_id, _, _, _, sold, hall_rows, seats_in_row in rows
+            if sold
+        }
+    )
+
+    for session_id, movie_id, hall_id, day, sold, hall_rows, seats_in_row in (
+        rows
+    ):
+        capacity = hall_rows * seats_in_row
+        occupancy.append(
+            SessionOccupancy(
+                movie_session_id=session_id,
+                tickets_sold=sold,
+                capacity=capacity,
+                longest_free_run=longest.get(
+                    session_id, seats_in_row if hall_rows else 0
+                ),
+            )
+        )
+        for totals in (movie_totals[movie_id, day], hall_totals[hall_id, day]):
+            totals[0] += 1
+            totals[1] += sold
+            totals[2] += capacity
+
+    if movie_days is not None:
+        movie_totals = {
+            key: movie_totals[key] for key in movie_days if key in movie_totals
+        }
+    if hall_days is not None:
+        hall_totals = {
+            key: hall_totals[key] for key in hall_days if key in hall_totals
+        }
+
+    SessionOccupancy.objects.bulk_create(
+        occupancy,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=["movie_session"],
+        update_fields=["tickets_sold", "capacity", "longest_free_run"],
+    )
+    MovieDaySales.objects.bulk_create(
+        [
+            MovieDaySales(
+                movie_id=movie_id,
+                day=day,
+                sessions=sessions,
+                tickets_sold=sold,
+                capacity=capacity,
+            )
+            for (movie_id, day), (sessions, sold, capacity)
+            in movie_totals.items()
+        ],
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=["movie", "day"],
+        update_fields=TOTAL_FIELDS,
+    )
+    HallDayOccupancy.objects.bulk_create(
+        [
+            HallDayOccupancy(
+                cinema_hall_id=hall_id,
+                day=day,
+                sessions=sessions,
+                tickets_sold=sold,
+                capacity=capacity,
+            )
+            for (hall_id, day), (sessions, sold, capacity)
+            in hall_totals.items()
+        ],
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=["cinema_hall", "day"],
+        update_fields=TOTAL_FIELDS,
+    )
+
+    return set(movie_totals), set(hall_totals)
+
+
+def delete_keys(model, field, keys):
+    """Delete the rows of (id, day) ``keys``, a query per day"""
+    by_day = defaultdict(list)
+    for key_id, day in keys:
+        by_day[day].append(key_id)
+
+    for day, key_ids in by_day.items():
+        model.objects.filter(**{f"{field}__in": key_ids}, day=day).delete()
+
+
+def refresh(movie_days=(), hall_days=()):
+    """Recompute the rollups of the given movie-days and hall-days"""
+    movie_days, hall_days = set(movie_days), set(hall_days)
+    if not movie_days and not hall_days:
+        return
+
+    days = [day for _, day in movie_days | hall_days]
+    movie_sessions = MovieSession.objects.filter(
+        Q(movie_id__in={movie_id for movie_id, _ in movie_days})
+        | Q(cinema_hall_id__in={hall_id for hall_id, _ in hall_days}),
+        show_time__date__range=(min(days), max(days)),
+    )
+
+    with transaction.atomic(
+        using=router.db_for_write(MovieSession), savepoint=False
+    ):
+        written_movie_days, written_hall_days = write(
+            session_rows(movie_sessions), movie_days, hall_days
+        )
+        # days left without any session
+        delete_keys(MovieDaySales, "movie_id", movie_days - written_movie_days)
+        delete_keys(
+            HallDayOccupancy, "cinema_hall_id", hall_days - written_hall_days
+        )
+
+
+def rebuild(start=None, end=None, chunk_days=7):
+    """
+    Recompute all rollups for sessions between ``start`` and ``end``
+    (dates, inclusive; default: all sessions), ``chunk_days`` at a time
+    so that each transaction only touches a bounded slice of tickets.
+    Stretches without sessions are skipped. Yields each chunk's first
+    session day as it is done.
+    """
+    movie_sessions = MovieSession.objects.all()
+    if start:
+        movie_sessions = movie_sessions.filter(show_time__date__gte=start)
+    if end:
+        movie_sessions = movie_sessions.filter(show_time__date__lte=end)
+
+    session_days = list(movie_sessions.dates("show_time", "day"))
+    if not session_days:
+        return
+
+    chunk = timedelta(days=chunk_days)
+    window_start = start or session_days[0]
+    position = 0
+    while position < len(session_days):
+        first = session_days[position]
+        window_end = first + chunk - timedelta(days=1)
+        while (
+            position < len(session_days)
+            and session_days[position] <= window_end
+        ):
+            position += 1
+        if position == len(session_days) and end:
+            window_end = max(window_end, end)
+
+        # the window also covers the days since the previous one, so
+        # rollups of days that lost all their sessions are cleared
+        days = (window_start, window_end)
+        with transaction.atomic(using=router.db_for_write(MovieDaySales)):
+            MovieDaySales.objects.filter(day__range=days).delete()
+            HallDayOccupancy.objects.filter(day__range=days).delete()
+            write(
+                session_rows(
+                    MovieSession.objects.filter(show_time__date__range=days)
+                )
+            )
+        yield first
+        window_start = window_end + timedelta(days=1)
@@ -0,0 +1,103 @@
+"""
+Overlap detection for the sessions of a cinema hall.
+
+A session occupies its hall from ``show_time`` for ``movie.duration``
+minutes, as the half-open interval ``[start, end)``. ``HallSchedule``
+keeps the intervals of one hall sorted by start: no interval is longer
+than the longest one stored, so everything overlapping ``[start, end)``
+starts within ``(start - longest, end)`` and is found with two
+bisections instead of a scan over the whole hall.
+"""
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db.models import Max
+
+from cinema.models import Movie, MovieSession
+
+
+def session_end(show_time, duration):
+    return show_time + timedelta(minutes=duration)
+
+
+class HallSchedule:
+    def __init__(self):
+        self.starts = []
+        self.intervals = []
+        self.longest = timedelta(0)
+
+    def __len__(self):
+        return len(self.intervals)
+
+    def add(self, start, end, label):
+        position = bisect_right(self.starts, start)
+        self.starts.insert(position, start)
+        self.intervals.insert(position, (start, end, label))
+        self.longest = max(self.longest, end - start)
+
+    def _window(self, start, end):
+        low = bisect_right(self.starts, start - self.longest)
+        high = bisect_left(self.starts, end)
+        return self.intervals[low:high]
+
+    def overlapping(self, start, end):
+        """Labels of the intervals overlapping ``[start, end)``"""
+        return [
+            label
+            for interval_start, interval_end, label in self._window(start, end)
+            if interval_end > start
+        ]
+
+    def free_slots(self, start, end, min_length=timedelta(0)):
+        """Gaps of at least ``min_length`` within ``[start, end)``"""
+        min_length = max(min_length, timedelta.resolution)
+        slots = []
+        cursor = start
+
+        for interval_start, interval_end, _ in self._window(start, end):
+            if interval_start - cursor >= min_length:
+                slots.append((cursor, interval_start))
+            cursor = max(cursor, interval_end)
+
+        if end - cursor >= min_length:
+            slots.append((cursor, end))
+
+        return slots
+
+
+class ScheduleIndex:
+    """``HallSchedule`` per cinema hall, filled from the database"""
+
+    def __init__(self):
+        self.halls = defaultdict(HallSchedule)
+
+    def __getitem__(self, cinema_hall_id):
+        return self.halls[cinema_hall_id]
+
+    @classmethod
+    def load(cls, cinema_hall_ids, start, end, exclude=None):
+        """
+        Load the sessions that can overlap ``[start, end)`` in the given
+        halls with two queries, skipping the session ``exclude`` (pk).
+        """
+        longest = Movie.objects.aggregate(longest=Max("duration"))["longest"]
+        sessions = MovieSession.objects.filter(
+            cinema_hall_id__in=cinema_hall_ids,
+            show_time__gt=start - timedelta(minutes=longest or 0),
+            show_time__lt=end,
+        )
+        if exclude is not None:
+            sessions = sessions.exclude(pk=exclude)
+
+        index = cls()
+        for pk, cinema_hall_id, show_time, duration in (
+            sessions.order_by().values_list(
+                "pk", "cinema_hall_id", "show_time", "movie__duration"
+            )
+        ):
+            index[cinema_hall_id].add(
+                show_time, session_end(show_time, duration), f"session {pk}"
+            )
+
+        return index
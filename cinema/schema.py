@@ -0,0 +1,164 @@
+"""
+OpenAPI documentation for the cinema viewsets.
+
+Kept out of ``cinema.views`` so that drf_spectacular is only imported
+when the schema is generated, not when the API is served.
+"""
+from functools import lru_cache
+
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import (
+    OpenApiParameter,
+    extend_schema,
+    extend_schema_view,
+)
+
+from cinema.serializers import (
+    BestSeatsQuerySerializer,
+    BookingRequestSerializer,
+    CinemaHallFreeSlotsQuerySerializer,
+    NextSessionsQuerySerializer,
+    OrderSerializer,
+    SeatSerializer,
+)
+from cinema.sparse_fields import SparseFieldsMixin
+from cinema.views import (
+    CinemaHallViewSet,
+    MovieViewSet,
+    MovieSessionViewSet,
+    OrderViewSet,
+)
+
+SPARSE_FIELDS_PARAMETERS = [
+    OpenApiParameter(
+        "fields",
+        type=OpenApiTypes.STR,
+        description="Only return these fields (ex. ?fields=id,title)",
+    ),
+    OpenApiParameter(
+        "omit",
+        type=OpenApiTypes.STR,
+        description="Leave these fields out (ex. ?omit=description)",
+    ),
+]
+
+
+@lru_cache(maxsize=None)
+def extend_cinema_views():
+    extend_schema_view(
+        free_slots=extend_schema(
+            parameters=[CinemaHallFreeSlotsQuerySerializer]
+        )
+    )(CinemaHallViewSet)
+
+    extend_schema_view(
+        list=extend_schema(
+            parameters=[
+                OpenApiParameter(
+                    "genres",
+                    type={"type": "list", "items": {"type": "number"}},
+                    description="Filter by genre id (ex. ?genres=2,5)",
+                ),
+                OpenApiParameter(
+                    "actors",
+                    type={"type": "list", "items": {"type": "number"}},
+                    description="Filter by actor id (ex. ?actors=2,5)",
+                ),
+                OpenApiParameter(
+                    "title",
+                    type=OpenApiTypes.STR,
+                    description="Filter by movie title (ex. ?title=fiction)",
+                ),
+                NextSessionsQuerySerializer,
+            ]
+        ),
+        retrieve=extend_schema(parameters=[NextSessionsQuerySerializer]),
+    )(MovieViewSet)
+
+    extend_schema_view(
+        list=extend_schema(
+            parameters=[
+                OpenApiParameter(
+                    "movie",
+                    type=OpenApiTypes.INT,
+                    description="Filter by movie id (ex. ?movie=2)",
+                ),
+                OpenApiParameter(
+                    "date",
+                    type=OpenApiTypes.DATE,
+                    description=(
+                        "Filter by datetime of MovieSession "
+                        "(ex. ?date=2022-10-23)"
+                    ),
+                ),
+                OpenApiParameter(
+                    "free_seats",
+                    type=OpenApiTypes.INT,
+                    description=(
+                        "Only sessions with at least this many free seats "
+                        "(ex. ?free_seats=6)"
+                    ),
+                ),
+                OpenApiParameter(
+                    "adjacent_seats",
+                    type=OpenApiTypes.INT,
+                    description=(
+                        "Only sessions with this many free seats next to "
+                        "each other in one row (ex. ?adjacent_seats=6)"
+                    ),
+                ),
+            ]
+        ),
+        best_seats=extend_schema(
+            parameters=[BestSeatsQuerySerializer],
+            responses=SeatSerializer(many=True),
+        ),
+    )(MovieSessionViewSet)
+    extend_schema_view(
+        create=extend_schema(
+            parameters=[
+                OpenApiParameter(
+                    "Idempotency-Key",
+                    type=OpenApiTypes.STR,
+                    location=OpenApiParameter.HEADER,
+                    description=(
+                        "Unique key of the order; retries with the same key "
+                        "get the first response back"
+                    ),
+                )
+            ],
+            # orders for sessions with queued booking are only queued
+            responses={
+                201: OrderSerializer,
+                202: BookingRequestSerializer,
+            },
+        )
+    )(OrderViewSet)
+
+    # POST of best-seats is a method mapping, not a view action
+    extend_schema(
+        request=BestSeatsQuerySerializer,
+        responses={201: OrderSerializer, 202: BookingRequestSerializer},
+    )(MovieSessionViewSet.book_best_seats)
+
+
+@lru_cache(maxsize=None)
+def document_sparse_fields(viewset):
+    extend_schema_view(
+        **{
+            action: extend_schema(parameters=SPARSE_FIELDS_PARAMETERS)
+            for action in viewset.sparse_actions
+            if hasattr(viewset, action)
+        }
+    )(viewset)
+
+
+def preprocess_endpoints(endpoints):
+    """drf_spectacular preprocessing hook attaching the docs above"""
+    extend_cinema_views()
+    for _, _, _, callback in endpoints:
+        viewset = getattr(callback, "cls", None)
+        if viewset and issubclass(viewset, SparseFieldsMixin):
+            document_sparse_fields(viewset)
+
+    return endpoints
@@ -0,0 +1,110 @@
+"""
+Seat finding for group bookings.
+
+``SeatGrid`` keeps the occupancy of a session's hall as one byte per
+seat (0 free, 1 taken), row after row, and reads the free seats of a
+row as runs of zero bytes with a regular expression, so a 1000-seat
+hall is scanned in C rather than seat by seat.
+
+Rows closer to the middle of the hall are preferred, and within a row
+the block closest to the middle of the row.
+"""
+import re
+
+from cinema.models import Ticket
+
+FREE_RUN = re.compile(rb"\x00+")
+
+
+class SeatGrid:
+    def __init__(self, rows, seats_in_row, taken=()):
+        self.rows = rows
+        self.seats_in_row = seats_in_row
+        self.cells = bytearray(rows * seats_in_row)
+        self.take_all(taken)
+
+    @classmethod
+    def load(cls, movie_session):
+        """Grid of ``movie_session`` with its sold seats, in one query"""
+        cinema_hall = movie_session.cinema_hall
+        return cls(
+            cinema_hall.rows,
+            cinema_hall.seats_in_row,
+            Ticket.objects.filter(movie_session=movie_session)
+            .order_by()
+            .values_list("row", "seat"),
+        )
+
+    def _index(self, row, seat):
+        return (row - 1) * self.seats_in_row + seat - 1
+
+    def contains(self, row, seat):
+        return 1 <= row <= self.rows and 1 <= seat <= self.seats_in_row
+
+    def take(self, row, seat):
+        self.cells[self._index(row, seat)] = 1
+
+    def take_all(self, places):
+        """
+        Take ``places``, skipping the ones outside the hall (e.g. sold
+        before the hall was made smaller)
+        """
+        for row, seat in places:
+            if self.contains(row, seat):
+                self.take(row, seat)
+
+    def is_free(self, row, seat):
+        return not self.cells[self._index(row, seat)]
+
+    def free_runs(self, row):
+        """(first seat, length) of the blocks of free seats in ``row``"""
+        start = (row - 1) * self.seats_in_row
+        return [
+            (match.start() - start + 1, match.end() - match.start())
+            for match in FREE_RUN.finditer(
+                self.cells, start, start + self.seats_in_row
+            )
+        ]
+
+    def longest_free_run(self):
+        """Most adjacent free seats in any row"""
+        return max(
+            (
+                length
+                for row in range(1, self.rows + 1)
+                for _, length in self.free_runs(row)
+            ),
+            default=0,
+        )
+
+    def rows_by_preference(self):
+        middle = (self.rows + 1) / 2
+        return sorted(
+            range(1, self.rows + 1), key=lambda row: abs(row - middle)
+        )
+
+    def best_in_row(self, row, count):
+        """First seat of the block of ``count`` closest to the middle"""
+        ideal = (self.seats_in_row - count) // 2 + 1
+        best = None
+
+        for first, length in self.free_runs(row):
+            if length < count:
+                continue
+            seat = min(max(ideal, first), first + length - count)
+            if best is None or abs(seat - ideal) < abs(best - ideal):
+                best = seat
+
+        return best
+
+    def best_seats(self, count):
+        """(row, seat) of the best ``count`` adjacent free seats, or None"""
+        if not 0 < count <= self.seats_in_row:
+            return None
+
+        for row in self.rows_by_preference():
+            first = self.best_in_row(row, count)
+            if first is not None:
+                return [(row, seat) for seat in range(first, first + count)]
+
+        return None
@@ -1,7 +1,12 @@
-from django.db import transaction
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import router, transaction
+from django.utils import timezone
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
+from cinema import jobs, outbox, rollups
 from cinema.models import (
     Genre,
     CinemaHall,
@@ -10,7 +15,13 @@ from cinema.models import (
     MovieSession,
     Ticket,
     Order,
+    BookingRequest,
+    SessionOccupancy,
+    MovieDaySales,
+    HallDayOccupancy,
 )
+from cinema.reads import reads
+from cinema.scheduling import ScheduleIndex, session_end
 
 
 class CinemaHallSerializer(serializers.ModelSerializer):
@@ -19,6 +30,20 @@ class CinemaHallSerializer(serializers.ModelSerializer):
         fields = ("id", "name", "rows", "seats_in_row", "capacity")
 
 
+class CinemaHallFreeSlotsQuerySerializer(serializers.Serializer):
+    date = serializers.DateField(help_text="Day to look at (ex. 2022-10-23)")
+    min_duration = serializers.IntegerField(
+        min_value=0,
+        default=0,
+        help_text="Only report gaps at least this many minutes long",
+    )
+
+
+class FreeSlotSerializer(serializers.Serializer):
+    start = serializers.DateTimeField()
+    end = serializers.DateTimeField()
+
+
 class GenreSerializer(serializers.ModelSerializer):
     class Meta:
         model = Genre
@@ -43,6 +68,18 @@ class MovieSerializer(serializers.ModelSerializer):
             "actors",
         )
 
+    def create(self, validated_data):
+        with transaction.atomic():
+            movie = super().create(validated_data)
+            outbox.record_movie("created", movie)
+            return movie
+
+    def update(self, instance, validated_data):
+        with transaction.atomic():
+            movie = super().update(instance, validated_data)
+            outbox.record_movie("updated", movie)
+            return movie
+
 
 class MovieListSerializer(MovieSerializer):
     genres = serializers.SlugRelatedField(
@@ -74,17 +111,124 @@ class MovieDetailSerializer(MovieSerializer):
         )
 
 
+class NextSessionsQuerySerializer(serializers.Serializer):
+    with_sessions = serializers.IntegerField(
+        min_value=1,
+        max_value=10,
+        required=False,
+        help_text=(
+            "Embed the next this many upcoming sessions with seats left "
+            "of each movie (ex. ?with_sessions=3)"
+        ),
+    )
+
+
+class MovieNextSessionSerializer(serializers.ModelSerializer):
+    cinema_hall_name = serializers.CharField(
+        source="cinema_hall.name", read_only=True
+    )
+    tickets_available = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = MovieSession
+        fields = ("id", "show_time", "cinema_hall_name", "tickets_available")
+
+
+class MovieListWithSessionsSerializer(MovieListSerializer):
+    next_sessions = MovieNextSessionSerializer(many=True, read_only=True)
+
+    class Meta(MovieListSerializer.Meta):
+        fields = MovieListSerializer.Meta.fields + ("next_sessions",)
+
+
+class MovieDetailWithSessionsSerializer(MovieDetailSerializer):
+    next_sessions = MovieNextSessionSerializer(many=True, read_only=True)
+
+    class Meta(MovieDetailSerializer.Meta):
+        fields = MovieDetailSerializer.Meta.fields + ("next_sessions",)
+
+
 class MovieImageSerializer(serializers.ModelSerializer):
     class Meta:
         model = Movie
         fields = ("id", "image")
 
+    def update(self, instance, validated_data):
+        with transaction.atomic():
+            movie = super().update(instance, validated_data)
+            outbox.record_movie("updated", movie)
+            if movie.image:
+                jobs.enqueue(
+                    "cinema.tasks.resize_movie_image",
+                    {"movie_id": movie.id},
+                    queue="images",
+                )
+            return movie
+
 
 class MovieSessionSerializer(serializers.ModelSerializer):
     class Meta:
         model = MovieSession
         fields = ("id", "show_time", "movie", "cinema_hall")
 
+    @staticmethod
+    def check_hall_is_free(show_time, movie, cinema_hall, exclude=None):
+        end = session_end(show_time, movie.duration)
+        overlapping = ScheduleIndex.load(
+            [cinema_hall.id], show_time, end, exclude=exclude
+        )[cinema_hall.id].overlapping(show_time, end)
+
+        if overlapping:
+            raise ValidationError(
+                {
+                    "show_time": [
+                        f"Cinema hall is occupied by "
+                        f"{', '.join(overlapping)} at this time."
+                    ]
+                }
+            )
+
+    def schedule(self, validated_data, instance=None):
+        """Lock the hall, so concurrent writes can't double-book it"""
+        session = {
+            field: getattr(instance, field, None)
+            for field in ("show_time", "movie", "cinema_hall")
+        }
+        session.update(validated_data)
+
+        # the hall's copy on the session's shard, if sharded
+        CinemaHall.objects.using(
+            router.db_for_write(MovieSession)
+        ).select_for_update().get(pk=session["cinema_hall"].pk)
+        self.check_hall_is_free(
+            session["show_time"],
+            session["movie"],
+            session["cinema_hall"],
+            exclude=getattr(instance, "pk", None),
+        )
+
+    def create(self, validated_data):
+        with transaction.atomic(using=router.db_for_write(MovieSession)):
+            self.schedule(validated_data)
+            movie_session = super().create(validated_data)
+            rollups.refresh(*rollups.session_keys([movie_session]))
+            outbox.record_sessions("created", [movie_session])
+            return movie_session
+
+    def update(self, instance, validated_data):
+        with transaction.atomic(using=router.db_for_write(MovieSession)):
+            self.schedule(validated_data, instance)
+            movie_days, hall_days = rollups.session_keys([instance])
+            movie_session = super().update(instance, validated_data)
+            new_movie_days, new_hall_days = rollups.session_keys(
+                [movie_session]
+            )
+            rollups.refresh(
+                movie_days | new_movie_days, hall_days | new_hall_days
+            )
+            outbox.record_sessions("updated", [movie_session])
+            return movie_session
+
 
 class MovieSessionListSerializer(MovieSessionSerializer):
     movie_title = serializers.CharField(source="movie.title", read_only=True)
@@ -110,6 +254,222 @@ class MovieSessionListSerializer(MovieSessionSerializer):
         )
 
 
+class MovieSessionBulkItemSerializer(serializers.Serializer):
+    show_time = serializers.DateTimeField()
+    movie = serializers.IntegerField(min_value=1)
+    cinema_hall = serializers.IntegerField(min_value=1)
+
+
+class MovieSessionRecurrenceSerializer(serializers.Serializer):
+    movie = serializers.IntegerField(min_value=1)
+    cinema_halls = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False
+    )
+    start_date = serializers.DateField()
+    end_date = serializers.DateField()
+    weekdays = serializers.ListField(
+        child=serializers.IntegerField(min_value=0, max_value=6),
+        required=False,
+        help_text="Days of week to schedule on, 0 is Monday (default: all)",
+    )
+    times = serializers.ListField(
+        child=serializers.TimeField(), allow_empty=False
+    )
+
+    def validate(self, attrs):
+        if attrs["end_date"] < attrs["start_date"]:
+            raise ValidationError(
+                {"end_date": "end_date must not be before start_date"}
+            )
+        if (attrs["end_date"] - attrs["start_date"]).days > 366:
+            raise ValidationError(
+                {"end_date": "Recurrence can span at most one year"}
+            )
+        return attrs
+
+    @staticmethod
+    def expand(recurrence):
+        """Yield the sessions described by a validated recurrence"""
+        weekdays = set(recurrence.get("weekdays", range(7)))
+        day = recurrence["start_date"]
+
+        while day <= recurrence["end_date"]:
+            if day.weekday() in weekdays:
+                for time in recurrence["times"]:
+                    show_time = timezone.make_aware(
+                        datetime.combine(day, time)
+                    )
+                    for cinema_hall in recurrence["cinema_halls"]:
+                        yield {
+                            "show_time": show_time,
+                            "movie": recurrence["movie"],
+                            "cinema_hall": cinema_hall,
+                        }
+            day += timedelta(days=1)
+
+
+class MovieSessionBulkSerializer(serializers.Serializer):
+    """
+    Validates a whole schedule in memory with a fixed number of queries
+    and creates it with ``bulk_create`` in a single transaction.
+
+    Sessions come from an explicit list and/or recurrence rules. Sessions
+    with an unknown movie or hall, or overlapping another session in the
+    hall (existing or earlier in the request), are collected in
+    ``errors`` with their index in the combined list (explicit sessions
+    first); with ``atomic`` (default) nothing is created if there are
+    any. Overlaps are checked on ``save()``, with the halls locked like
+    for single sessions.
+    """
+
+    sessions = MovieSessionBulkItemSerializer(many=True, required=False)
+    recurrences = MovieSessionRecurrenceSerializer(many=True, required=False)
+    atomic = serializers.BooleanField(default=True)
+
+    @staticmethod
+    def item_error(index, item, errors):
+        return {
+            "index": index,
+            "show_time": item["show_time"],
+            "movie": item["movie"],
+            "cinema_hall": item["cinema_hall"],
+            "errors": errors,
+        }
+
+    def validate(self, attrs):
+        items = list(attrs.get("sessions", []))
+        for recurrence in attrs.get("recurrences", []):
+            items.extend(MovieSessionRecurrenceSerializer.expand(recurrence))
+
+        if not items:
+            raise ValidationError(
+                "Provide at least one session or recurrence."
+            )
+        if len(items) > settings.BULK_SCHEDULE_MAX_SESSIONS:
+            raise ValidationError(
+                f"At most {settings.BULK_SCHEDULE_MAX_SESSIONS} "
+                f"sessions can be scheduled at once."
+            )
+
+        durations = dict(
+            Movie.objects.filter(
+                id__in={item["movie"] for item in items}
+            ).order_by().values_list("id", "duration")
+        )
+        hall_ids = set(
+            CinemaHall.objects.filter(
+                id__in={item["cinema_hall"] for item in items}
+            ).values_list("id", flat=True)
+        )
+
+        valid, errors = [], []
+        for index, item in enumerate(items):
+            item_errors = {}
+            if item["movie"] not in durations:
+                item_errors["movie"] = [
+                    f"Invalid pk \"{item['movie']}\" - "
+                    f"object does not exist."
+                ]
+            if item["cinema_hall"] not in hall_ids:
+                item_errors["cinema_hall"] = [
+                    f"Invalid pk \"{item['cinema_hall']}\" - "
+                    f"object does not exist."
+                ]
+
+            if item_errors:
+                errors.append(self.item_error(index, item, item_errors))
+            else:
+                valid.append((index, item))
+
+        return {
+            "items": valid,
+            "durations": durations,
+            "errors": errors,
+            "atomic": attrs["atomic"],
+        }
+
+    def check_overlaps(self, items, durations):
+        """
+        Split ``items`` ((index, item)) into those that fit in their hall
+        and the errors of those overlapping a session
+        """
+        if not items:
+            return [], []
+
+        ends = [
+            session_end(item["show_time"], durations[item["movie"]])
+            for _, item in items
+        ]
+        schedule = ScheduleIndex.load(
+            {item["cinema_hall"] for _, item in items},
+            min(item["show_time"] for _, item in items),
+            max(ends),
+        )
+
+        valid, errors = [], []
+        for (index, item), end in zip(items, ends):
+            hall_schedule = schedule[item["cinema_hall"]]
+            overlapping = hall_schedule.overlapping(item["show_time"], end)
+            if overlapping:
+                errors.append(
+                    self.item_error(
+                        index,
+                        item,
+                        {
+                            "show_time": [
+                                f"Cinema hall is occupied by "
+                                f"{', '.join(overlapping)} at this time."
+                            ]
+                        },
+                    )
+                )
+            else:
+                hall_schedule.add(item["show_time"], end, f"item {index}")
+                valid.append(item)
+
+        return valid, errors
+
+    def create(self, validated_data):
+        """
+        Create the sessions that fit, or none with ``atomic`` if any
+        doesn't; ``validated_data["errors"]`` gets the overlaps
+        """
+        items = validated_data["items"]
+        db = router.db_for_write(MovieSession)
+        with transaction.atomic(using=db):
+            # the halls' copies on the shard, in id order so that
+            # concurrent schedules can't deadlock
+            list(
+                CinemaHall.objects.using(db)
+                .select_for_update()
+                .filter(id__in={item["cinema_hall"] for _, item in items})
+                .order_by("id")
+                .values_list("id", flat=True)
+            )
+            valid, errors = self.check_overlaps(
+                items, validated_data["durations"]
+            )
+            validated_data["errors"].extend(errors)
+            validated_data["errors"].sort(key=lambda error: error["index"])
+            if validated_data["errors"] and validated_data["atomic"]:
+                return []
+
+            movie_sessions = MovieSession.objects.bulk_create(
+                [
+                    MovieSession(
+                        show_time=item["show_time"],
+                        movie_id=item["movie"],
+                        cinema_hall_id=item["cinema_hall"],
+                    )
+                    for item in valid
+                ],
+                batch_size=1000,
+            )
+            rollups.refresh(*rollups.session_keys(movie_sessions))
+            outbox.record_sessions("created", movie_sessions)
+            return movie_sessions
+
+
 class TicketSerializer(serializers.ModelSerializer):
     def validate(self, attrs):
         data = super(TicketSerializer, self).validate(attrs=attrs)
@@ -148,6 +508,31 @@ class MovieSessionDetailSerializer(MovieSessionSerializer):
         fields = ("id", "show_time", "movie", "cinema_hall", "taken_places")
 
 
+class MovieSessionSeatMapSerializer(serializers.ModelSerializer):
+    rows = serializers.IntegerField(source="cinema_hall.rows", read_only=True)
+    seats_in_row = serializers.IntegerField(
+        source="cinema_hall.seats_in_row", read_only=True
+    )
+    taken_places = TicketSeatsSerializer(
+        source="tickets", many=True, read_only=True
+    )
+
+    class Meta:
+        model = MovieSession
+        fields = ("id", "rows", "seats_in_row", "taken_places")
+
+
+class BestSeatsQuerySerializer(serializers.Serializer):
+    count = serializers.IntegerField(
+        min_value=1, help_text="Number of adjacent seats wanted"
+    )
+
+
+class SeatSerializer(serializers.Serializer):
+    row = serializers.IntegerField()
+    seat = serializers.IntegerField()
+
+
 class OrderSerializer(serializers.ModelSerializer):
     tickets = TicketSerializer(many=True, read_only=False, allow_empty=False)
 
@@ -156,13 +541,109 @@ class OrderSerializer(serializers.ModelSerializer):
         fields = ("id", "tickets", "created_at")
 
     def create(self, validated_data):
-        with transaction.atomic():
+        with transaction.atomic(using=router.db_for_write(Order)):
             tickets_data = validated_data.pop("tickets")
             order = Order.objects.create(**validated_data)
-            for ticket_data in tickets_data:
+            tickets = [
                 Ticket.objects.create(order=order, **ticket_data)
+                for ticket_data in tickets_data
+            ]
+            rollups.record_tickets(tickets)
+            outbox.record_order(order, tickets)
             return order
 
 
 class OrderListSerializer(OrderSerializer):
-    tickets = TicketListSerializer(many=True, read_only=True)
+    tickets = TicketListSerializer(
+        source="all_tickets", many=True, read_only=True
+    )
+
+
+class BookingRequestSerializer(serializers.ModelSerializer):
+    tickets = serializers.SerializerMethodField()
+
+    class Meta:
+        model = BookingRequest
+        fields = (
+            "id",
+            "movie_session",
+            "tickets",
+            "status",
+            "order",
+            "errors",
+            "created_at",
+            "processed_at",
+        )
+        read_only_fields = fields
+
+    @reads("places")
+    def get_tickets(self, obj) -> list[dict]:
+        return [{"row": row, "seat": seat} for row, seat in obj.places]
+
+
+class OccupancyReportSerializer(serializers.ModelSerializer):
+    occupancy = serializers.SerializerMethodField()
+
+    @reads("tickets_sold", "capacity")
+    def get_occupancy(self, obj) -> float:
+        if not obj.capacity:
+            return 0.0
+        return round(obj.tickets_sold / obj.capacity, 4)
+
+
+class SessionOccupancySerializer(OccupancyReportSerializer):
+    id = serializers.IntegerField(  # noqa: VNE003
+        source="movie_session_id"
+    )
+    show_time = serializers.DateTimeField(source="movie_session.show_time")
+    movie = serializers.IntegerField(source="movie_session.movie_id")
+    movie_title = serializers.CharField(source="movie_session.movie.title")
+    cinema_hall = serializers.IntegerField(
+        source="movie_session.cinema_hall_id"
+    )
+
+    class Meta:
+        model = SessionOccupancy
+        fields = (
+            "id",
+            "show_time",
+            "movie",
+            "movie_title",
+            "cinema_hall",
+            "tickets_sold",
+            "capacity",
+            "occupancy",
+            "longest_free_run",
+        )
+
+
+class MovieDaySalesSerializer(OccupancyReportSerializer):
+    movie_title = serializers.CharField(source="movie.title")
+
+    class Meta:
+        model = MovieDaySales
+        fields = (
+            "day",
+            "movie",
+            "movie_title",
+            "sessions",
+            "tickets_sold",
+            "capacity",
+            "occupancy",
+        )
+
+
+class HallDayOccupancySerializer(OccupancyReportSerializer):
+    cinema_hall_name = serializers.CharField(source="cinema_hall.name")
+
+    class Meta:
+        model = HallDayOccupancy
+        fields = (
+            "day",
+            "cinema_hall",
+            "cinema_hall_name",
+            "sessions",
+            "tickets_sold",
+            "capacity",
+            "occupancy",
+        )
@@ -0,0 +1,496 @@
+"""
+Placement of ticketing rows on the shards (see ``cinema_api.db.sharding``).
+
+Cinema halls are grouped by id, ``SHARD_HALLS_PER_GROUP`` consecutive
+ids to a group (usually the halls of one cinema). The sessions of a
+group, with their tickets, orders, queued orders, rollups and the
+``Idempotency-Key`` responses of those orders, live on one shard,
+recorded in a ``ShardPlacement`` on the default database. A
+group is placed when its first session is scheduled: on the shard that
+already has its sessions, if any (data from before sharding), else on
+the shard with the fewest groups.
+
+An order only holds tickets of one group, so it lives next to its
+sessions. Views find their shard with ``ShardedViewMixin``; lists of
+orders, sessions and reports merge the rows of all shards.
+
+``manage.py rebalance_shards`` moves groups from the shard with the most
+sessions to the one with the fewest. While a group is copied, writes to
+it are refused with 503 (``ShardMoving``); if a write that started
+before still lands on the old shard, the copy is dropped and the group
+stays where it is (``GroupChanged``).
+"""
+import time
+from collections import Counter, defaultdict
+from itertools import islice
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from cinema import rollups
+from cinema.archive import ensure_partitions
+from cinema.models import (
+    ArchivedTicket,
+    BookingRequest,
+    IdempotencyKey,
+    MovieSession,
+    Order,
+    SessionOccupancy,
+    ShardPlacement,
+    Ticket,
+)
+from cinema_api.db.sharding import (
+    MergedQuerySet,
+    current_shard,
+    is_sharded,
+    shards,
+    using_shard,
+)
+
+COPY_BATCH_SIZE = 1000
+
+
+class ShardMoving(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "This cinema is being moved, try again in a moment."
+    default_code = "shard_moving"
+
+
+class GroupChanged(Exception):
+    """Rows of a group were written on its shard while it was copied"""
+
+
+def hall_group(hall_id):
+    return hall_id // settings.SHARD_HALLS_PER_GROUP
+
+
+def group_halls(group):
+    return range(
+        group * settings.SHARD_HALLS_PER_GROUP,
+        (group + 1) * settings.SHARD_HALLS_PER_GROUP,
+    )
+
+
+def placements():
+    return ShardPlacement.objects.using(DEFAULT_DB_ALIAS)
+
+
+def holding_shard(group):
+    """Shard that has sessions of ``group``, if any"""
+    for alias in shards():
+        if MovieSession.objects.using(alias).filter(
+            cinema_hall_id__in=group_halls(group)
+        ).exists():
+            return alias
+
+    return None
+
+
+def least_loaded_shard():
+    groups = Counter(placements().values_list("shard", flat=True))
+    return min(shards(), key=lambda alias: groups[alias])
+
+
+def place(group):
+    shard = holding_shard(group) or least_loaded_shard()
+    try:
+        with transaction.atomic(using=DEFAULT_DB_ALIAS):
+            return placements().create(group=group, shard=shard)
+    except IntegrityError:
+        # placed by a concurrent request
+        return placements().get(group=group)
+
+
+def shard_for_group(group, writing=False):
+    if not is_sharded():
+        return None
+
+    placement = placements().filter(group=group).first() or place(group)
+    if writing and placement.moving:
+        raise ShardMoving()
+
+    return placement.shard
+
+
+def shard_for_hall(hall_id, writing=False):
+    return shard_for_group(hall_group(hall_id), writing)
+
+
+def home_first(pk):
+    """Shards in the order to look for row ``pk``: its home shard first"""
+    home = pk >> settings.SHARD_ID_BITS
+    return sorted(shards(), key=lambda alias: shards().index(alias) != home)
+
+
+def locate(model, pk):
+    """Shard holding the ``model`` row ``pk``, None if there isn't one"""
+    for alias in home_first(pk):
+        if model._base_manager.using(alias).filter(pk=pk).exists():
+            return alias
+
+    return None
+
+
+def locate_sessions(session_ids):
+    """``{session id: (shard, hall id)}`` for the sessions found"""
+    located = {}
+    for alias in shards():
+        missing = set(session_ids) - located.keys()
+        if not missing:
+            break
+        for pk, hall_id in MovieSession.objects.using(alias).filter(
+            pk__in=missing
+        ).values_list("pk", "cinema_hall_id"):
+            located[pk] = (alias, hall_id)
+
+    return located
+
+
+def as_ids(values):
+    """Integer ids among the ``values`` of unvalidated request data"""
+    ids = set()
+    for value in values:
+        try:
+            ids.add(int(value))
+        except (TypeError, ValueError):
+            pass
+
+    return ids
+
+
+def shard_for_halls(hall_ids):
+    """Shard for new sessions in ``hall_ids``, which must share one"""
+    placed = {shard_for_hall(hall_id, writing=True) for hall_id in hall_ids}
+    if len(placed) > 1:
+        raise ValidationError(
+            {
+                "non_field_errors": [
+                    "Sessions of different cinemas must be scheduled "
+                    "separately."
+                ]
+            }
+        )
+
+    return placed.pop() if placed else None
+
+
+def shard_for_session(pk, writing=False, cinema_hall=None):
+    """
+    Shard holding session ``pk``, None if there isn't one. Writes may
+    change its hall (``cinema_hall``, unvalidated) within its group only.
+    """
+    located = locate_sessions({pk})
+    if not located:
+        return None
+
+    shard, hall_id = located[pk]
+    if writing:
+        shard_for_hall(hall_id, writing=True)
+        if any(
+            hall_group(new_hall_id) != hall_group(hall_id)
+            for new_hall_id in as_ids([cinema_hall])
+        ):
+            raise ValidationError(
+                {"cinema_hall": ["Sessions can't move to another cinema."]}
+            )
+
+    return shard
+
+
+def shard_for_tickets(tickets_data):
+    """Shard of an order for ``tickets_data`` (unvalidated)"""
+    if not isinstance(tickets_data, list):
+        return None
+
+    session_ids = as_ids(
+        ticket.get("movie_session")
+        for ticket in tickets_data
+        if isinstance(ticket, dict)
+    )
+    groups = {
+        hall_group(hall_id)
+        for _, hall_id in locate_sessions(session_ids).values()
+    }
+    if len(groups) > 1:
+        raise ValidationError(
+            {
+                "tickets": [
+                    "Tickets of different cinemas must be ordered "
+                    "separately."
+                ]
+            }
+        )
+
+    # unknown sessions are reported by the serializer
+    return shard_for_group(groups.pop(), writing=True) if groups else None
+
+
+class ShardedViewMixin:
+    """
+    Run a view on the shard returned by ``get_shard``: by default the
+    shard holding the object of a detail route. Lists without a shard
+    merge the rows of all shards, in the queryset's ordering.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        token = current_shard.set(None)
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            current_shard.reset(token)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if is_sharded():
+            current_shard.set(self.get_shard())
+
+    def get_object_id(self):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        ids = as_ids([self.kwargs.get(lookup_url_kwarg)])
+        return ids.pop() if ids else None
+
+    def get_shard(self):
+        pk = self.get_object_id()
+        if pk is None:
+            return None
+
+        return locate(self.queryset.model, pk)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action == "list" and is_sharded() and not current_shard.get():
+            return MergedQuerySet(queryset)
+
+        return queryset
+
+
+def copy_rows(queryset, target):
+    """
+    Insert the rows of ``queryset`` on ``target`` as they are, ids and
+    ``auto_now_add`` values included (like ``loaddata``)
+    """
+    model = queryset.model
+    rows = queryset.order_by("pk").iterator(chunk_size=COPY_BATCH_SIZE)
+    copied = 0
+    while batch := list(islice(rows, COPY_BATCH_SIZE)):
+        model._base_manager.using(target)._insert(
+            batch, fields=model._meta.concrete_fields, raw=True, using=target
+        )
+        copied += len(batch)
+
+    return copied
+
+
+def copy_group(group, source, target):
+    """Copy the rows of ``group`` from ``source`` to ``target``"""
+    movie_sessions = MovieSession._base_manager.using(source).filter(
+        cinema_hall_id__in=group_halls(group)
+    )
+    tickets = Ticket._base_manager.using(source).filter(
+        movie_session__in=movie_sessions
+    )
+    archived_tickets = ArchivedTicket._base_manager.using(source).filter(
+        movie_session__in=movie_sessions
+    )
+    order_ids = {
+        *tickets.values_list("order_id", flat=True),
+        *archived_tickets.values_list("order_id", flat=True),
+    }
+
+    with using_shard(target):
+        ensure_partitions(
+            archived_tickets.values_list("show_time", flat=True)
+        )
+
+    copy_rows(movie_sessions, target)
+    copy_rows(
+        Order._base_manager.using(source).filter(pk__in=order_ids), target
+    )
+    copy_rows(tickets, target)
+    copy_rows(archived_tickets, target)
+    copy_rows(
+        SessionOccupancy._base_manager.using(source).filter(
+            movie_session__in=movie_sessions
+        ),
+        target,
+    )
+    booking_requests = BookingRequest._base_manager.using(source).filter(
+        movie_session__in=movie_sessions
+    )
+    copy_rows(booking_requests, target)
+    copy_rows(
+        idempotency_keys(source, order_ids, booking_requests), target
+    )
+
+    return order_ids
+
+
+def idempotency_keys(source, order_ids, booking_requests):
+    """Keys on ``source`` that replay the given orders or queued orders"""
+    return IdempotencyKey._base_manager.using(source).filter(
+        Q(status_code=status.HTTP_201_CREATED, response__id__in=order_ids)
+        | Q(
+            status_code=status.HTTP_202_ACCEPTED,
+            response__id__in=list(
+                booking_requests.values_list("pk", flat=True)
+            ),
+        )
+    )
+
+
+def group_rows(group, alias):
+    """``{model: ids}`` of the rows of ``group`` on shard ``alias``"""
+    movie_sessions = MovieSession._base_manager.using(alias).filter(
+        cinema_hall_id__in=group_halls(group)
+    )
+    rows = {
+        model: set(
+            model._base_manager.using(alias)
+            .filter(movie_session__in=movie_sessions)
+            .values_list("pk", flat=True)
+        )
+        for model in (Ticket, ArchivedTicket, BookingRequest)
+    }
+    rows[MovieSession] = set(movie_sessions.values_list("pk", flat=True))
+    order_ids = set(
+        Order._base_manager.using(alias)
+        .filter(
+            Q(tickets__in=rows[Ticket])
+            | Q(archived_tickets__in=rows[ArchivedTicket])
+        )
+        .values_list("pk", flat=True)
+    )
+    rows[Order] = order_ids
+    rows[IdempotencyKey] = set(
+        idempotency_keys(
+            alias,
+            order_ids,
+            BookingRequest._base_manager.using(alias).filter(
+                pk__in=rows[BookingRequest]
+            ),
+        ).values_list("pk", flat=True)
+    )
+
+    return rows
+
+
+def delete_group(group, source, order_ids):
+    movie_sessions = MovieSession._base_manager.using(source).filter(
+        cinema_hall_id__in=group_halls(group)
+    )
+    keys = rollups.session_keys(movie_sessions)
+    idempotency_keys(
+        source,
+        order_ids,
+        BookingRequest._base_manager.using(source).filter(
+            movie_session__in=movie_sessions
+        ),
+    ).delete()
+    # tickets, occupancy and queued orders go with their sessions
+    movie_sessions.delete()
+    Order._base_manager.using(source).filter(
+        pk__in=order_ids,
+        tickets__isnull=True,
+        archived_tickets__isnull=True,
+    ).delete()
+
+    return keys
+
+
+def move_group(group, target):
+    """
+    Move the rows of ``group`` to shard ``target``. Writes to the group
+    are refused meanwhile; those already in flight get
+    ``SHARD_MOVE_GRACE_SECONDS`` to finish before the copy starts. A
+    write committed on the source after that would be lost with the
+    source rows, so the copy is compared with the source before they
+    are deleted, and rolled back with ``GroupChanged`` if they differ.
+    """
+    source = shard_for_group(group)
+    if source == target:
+        return
+
+    placements().filter(group=group).update(
+        moving=True, updated_at=timezone.now()
+    )
+    try:
+        time.sleep(settings.SHARD_MOVE_GRACE_SECONDS)
+        with transaction.atomic(using=target):
+            order_ids = copy_group(group, source, target)
+            if group_rows(group, source) != group_rows(group, target):
+                raise GroupChanged(
+                    f"Group {group} was written on {source} while it was "
+                    f"copied to {target}."
+                )
+    except Exception:
+        placements().filter(group=group).update(
+            moving=False, updated_at=timezone.now()
+        )
+        raise
+
+    placements().filter(group=group).update(
+        shard=target, moving=False, updated_at=timezone.now()
+    )
+
+    with transaction.atomic(using=source):
+        keys = delete_group(group, source, order_ids)
+    for alias in (source, target):
+        with using_shard(alias):
+            rollups.refresh(*keys)
+
+
+def group_sizes():
+    """
+    ``{shard: {group: sessions}}``; groups with sessions but without a
+    placement (data from before sharding) are placed where they are
+    """
+    sizes = defaultdict(Counter)
+    placed = dict(placements().values_list("group", "shard"))
+    for alias in shards():
+        for hall_id, sessions in (
+            MovieSession.objects.using(alias)
+            .order_by()
+            .values_list("cinema_hall_id")
+            .annotate(Count("id"))
+        ):
+            sizes[alias][hall_group(hall_id)] += sessions
+
+        for group in sizes[alias].keys() - placed.keys():
+            placed[group] = place(group).shard
+
+    return {alias: sizes[alias] for alias in shards()}
+
+
+def plan_moves(sizes):
+    """
+    Moves ``(group, source, target, sessions)`` that even out the
+    sessions per shard: the largest group of the fullest shard that
+    still narrows its gap to the emptiest one, until none does
+    """
+    sizes = {alias: Counter(groups) for alias, groups in sizes.items()}
+    moves = []
+    while True:
+        loads = {
+            alias: sum(groups.values()) for alias, groups in sizes.items()
+        }
+        target = min(loads, key=loads.get)
+        for source in sorted(loads, key=loads.get, reverse=True):
+            gap = loads[source] - loads[target]
+            movable = [
+                (sessions, group)
+                for group, sessions in sizes[source].items()
+                if 0 < sessions < gap
+            ]
+            if movable:
+                break
+        else:
+            return moves
+
+        sessions, group = max(movable)
+        del sizes[source][group]
+        sizes[target][group] = sessions
+        moves.append((group, source, target, sessions))
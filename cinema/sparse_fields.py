@@ -0,0 +1,57 @@
+"""
+Sparse fieldsets for the cinema viewsets.
+
+``?fields=id,title`` limits the objects of a read response to the listed
+fields and ``?omit=description`` drops fields from them. The fields are
+dropped from the serializer, so the query planner (see
+``cinema.query_planner``) doesn't join, prefetch or load what they read.
+"""
+from rest_framework.permissions import SAFE_METHODS
+
+
+def split_names(value):
+    return {name.strip() for name in value.split(",") if name.strip()}
+
+
+def selected_fields(names, query_params):
+    """The subset of ``names`` asked for by ``fields``/``omit``"""
+    selected = set(names)
+    if query_params.get("fields"):
+        selected &= split_names(query_params["fields"])
+    if query_params.get("omit"):
+        selected -= split_names(query_params["omit"])
+
+    return selected
+
+
+class SparseFieldsMixin:
+    """
+    ``?fields=``/``?omit=`` for the read actions of a viewset, documented
+    for its ``sparse_actions``.
+    """
+
+    sparse_actions = ("list", "retrieve")
+
+    def is_sparse_request(self):
+        return self.request.method in SAFE_METHODS
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if not self.is_sparse_request():
+            return serializer
+
+        child = getattr(serializer, "child", serializer)
+        fields = getattr(child, "fields", None)
+        if fields is not None:
+            selected = selected_fields(fields, self.request.query_params)
+            for name in list(fields):
+                if name not in selected:
+                    fields.pop(name)
+
+        return serializer
+
+    def field_is_selected(self, name):
+        """Whether the response of this request contains field ``name``"""
+        if not self.is_sparse_request():
+            return True
+        return name in selected_fields([name], self.request.query_params)
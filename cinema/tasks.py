@@ -0,0 +1,69 @@
+"""Tasks to run as background jobs (see ``cinema.jobs``)"""
+from datetime import date, datetime, time, timedelta
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.utils import timezone
+
+from cinema import rollups
+from cinema.archive import archive_tickets
+from cinema.models import Movie
+from cinema_api.db.sharding import each_shard
+
+
+def rebuild_rollups(start=None, end=None, chunk_days=7):
+    """``manage.py rebuild_rollups``, with ISO dates"""
+    for _ in each_shard():
+        for _ in rollups.rebuild(
+            start and date.fromisoformat(start),
+            end and date.fromisoformat(end),
+            chunk_days,
+        ):
+            pass
+
+
+def archive_sessions(older_than_days=365, batch_size=5000):
+    """Archive the tickets of sessions older than ``older_than_days``"""
+    day = timezone.localdate() - timedelta(days=older_than_days)
+    before = timezone.make_aware(datetime.combine(day, time.min))
+    for _ in each_shard():
+        for _ in archive_tickets(before, batch_size):
+            pass
+
+
+def purge_idempotency_keys(batch_size=1000):
+    """Delete expired ``Idempotency-Key`` responses"""
+    from cinema.idempotency import purge_expired
+
+    for _ in each_shard():
+        purge_expired(batch_size)
+
+
+def resize_movie_image(movie_id):
+    """Shrink an uploaded movie image to ``MOVIE_IMAGE_MAX_SIZE``"""
+    from PIL import Image
+
+    movie = Movie.objects.filter(pk=movie_id).only("image").first()
+    if movie is None or not movie.image:
+        return
+
+    with movie.image.open("rb") as file:
+        image = Image.open(file)
+        image.load()
+    image_format = image.format
+
+    max_width, max_height = settings.MOVIE_IMAGE_MAX_SIZE
+    if image.width <= max_width and image.height <= max_height:
+        return
+
+    image.thumbnail(settings.MOVIE_IMAGE_MAX_SIZE)
+    content = BytesIO()
+    image.save(content, format=image_format)
+
+    # the movie keeps its image if saving the smaller one fails
+    storage, name = movie.image.storage, movie.image.name
+    saved_name = storage.save(name, ContentFile(content.getvalue()))
+    if saved_name != name:
+        Movie.objects.filter(pk=movie_id).update(image=saved_name)
+        storage.delete(name)
@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from cinema.admin import EstimatedCountPaginator, estimated_count
+from cinema.models import CinemaHall, Movie, MovieSession, Order, Ticket
+
+TICKET_CHANGELIST_URL = reverse("admin:cinema_ticket_changelist")
+SESSION_CHANGELIST_URL = reverse("admin:cinema_moviesession_changelist")
+
+
+class AdminTest(TestCase):
+    def setUp(self) -> None:
+        self.admin = get_user_model().objects.create_superuser(
+            "admin@test.com", "password"
+        )
+        self.client.force_login(self.admin)
+        self.hall = CinemaHall.objects.create(
+            name="Blue", rows=20, seats_in_row=20
+        )
+        self.order = Order.objects.create(user=self.admin)
+
+    def create_sessions(self, count):
+        start = timezone.make_aware(datetime(2030, 1, 1, 10))
+        sessions = []
+        for number in range(count):
+            movie = Movie.objects.create(
+                title=f"Movie {number}", description="Movie", duration=90
+            )
+            sessions.append(
+                MovieSession.objects.create(
+                    show_time=start + timedelta(days=number),
+                    movie=movie,
+                    cinema_hall=self.hall,
+                )
+            )
+        return sessions
+
+    def create_tickets(self, sessions, per_session):
+        Ticket.objects.bulk_create(
+            Ticket(
+                movie_session=movie_session,
+                order=self.order,
+                row=1,
+                seat=seat,
+            )
+            for movie_session in sessions
+            for seat in range(1, per_session + 1)
+        )
+
+    def changelist_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_ticket_changelist_query_count_does_not_grow(self):
+        self.create_tickets(self.create_sessions(1), 2)
+        few = self.changelist_queries(TICKET_CHANGELIST_URL)
+
+        self.create_tickets(self.create_sessions(10), 5)
+        self.assertEqual(self.changelist_queries(TICKET_CHANGELIST_URL), few)
+
+    def test_session_changelist_query_count_does_not_grow(self):
+        self.create_sessions(1)
+        few = self.changelist_queries(SESSION_CHANGELIST_URL)
+
+        self.create_sessions(10)
+        self.assertEqual(
+            self.changelist_queries(SESSION_CHANGELIST_URL), few
+        )
+
+    def test_order_change_form_query_count_does_not_grow(self):
+        url = reverse("admin:cinema_order_change", args=[self.order.id])
+        self.create_tickets(self.create_sessions(1), 1)
+        # the first change form also caches the content types
+        self.changelist_queries(url)
+        few = self.changelist_queries(url)
+
+        self.create_tickets(self.create_sessions(5), 2)
+        self.assertEqual(self.changelist_queries(url), few)
+        self.assertContains(self.client.get(url), "Movie 4 2030")
+
+    def test_ticket_change_form_does_not_list_sessions_and_orders(self):
+        sessions = self.create_sessions(3)
+        self.create_tickets(sessions, 1)
+        ticket = Ticket.objects.first()
+
+        response = self.client.get(
+            reverse("admin:cinema_ticket_change", args=[ticket.id])
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, "<option")
+        self.assertContains(response, "vForeignKeyRawIdAdminField")
+
+    def test_estimated_count_falls_back_to_count(self):
+        self.create_tickets(self.create_sessions(2), 3)
+        queryset = Ticket.objects.order_by("id")
+
+        if connection.vendor != "postgresql":
+            self.assertIsNone(estimated_count(queryset))
+        self.assertIsNone(estimated_count(queryset.filter(row=1)))
+        self.assertEqual(EstimatedCountPaginator(queryset, 2).count, 6)
@@ -0,0 +1,105 @@
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from cinema.models import (
+    ArchivedTicket,
+    CinemaHall,
+    Movie,
+    MovieDaySales,
+    MovieSession,
+    Order,
+    Ticket,
+)
+
+ORDER_URL = reverse("cinema:order-list")
+
+
+def archive(*args):
+    out = StringIO()
+    call_command("archive_sessions", *args, stdout=out)
+    return out.getvalue()
+
+
+class ArchiveSessionsTest(TestCase):
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "password"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        hall = CinemaHall.objects.create(name="Blue", rows=10, seats_in_row=10)
+        movie = Movie.objects.create(
+            title="Movie", description="Movie", duration=90
+        )
+        self.past = MovieSession.objects.create(
+            show_time="2022-06-02 14:00:00Z", movie=movie, cinema_hall=hall
+        )
+        self.future = MovieSession.objects.create(
+            show_time="2099-06-02 14:00:00Z", movie=movie, cinema_hall=hall
+        )
+
+        self.order = Order.objects.create(user=self.user)
+        for movie_session in (self.past, self.future):
+            for seat in (1, 2, 3):
+                Ticket.objects.create(
+                    movie_session=movie_session,
+                    order=self.order,
+                    row=1,
+                    seat=seat,
+                )
+
+    def test_archive_moves_past_tickets_in_batches(self):
+        output = archive("--before=2023-01-01", "--batch-size=2")
+
+        self.assertIn("3 tickets archived", output)
+        self.assertEqual(
+            set(Ticket.objects.values_list("movie_session", flat=True)),
+            {self.future.id},
+        )
+        self.assertEqual(
+            ArchivedTicket.objects.filter(movie_session=self.past).count(), 3
+        )
+
+    def test_orders_still_list_archived_tickets(self):
+        before = self.client.get(ORDER_URL).json()
+
+        archive("--before=2023-01-01")
+
+        self.assertEqual(self.client.get(ORDER_URL).json(), before)
+
+    def test_dry_run(self):
+        output = archive("--before=2023-01-01", "--dry-run")
+
+        self.assertIn("3 tickets would be archived", output)
+        self.assertFalse(ArchivedTicket.objects.exists())
+
+    def test_future_cutoff_rejected(self):
+        with self.assertRaises(CommandError):
+            archive("--before=2099-01-01")
+
+    def test_export_can_be_loaded_back(self):
+        with tempfile.TemporaryDirectory() as directory:
+            archive("--before=2023-01-01", f"--export={directory}")
+            exported = list(Path(directory).glob("*.ndjson.gz"))
+            ArchivedTicket.objects.all().delete()
+
+            call_command("bulk_load", *map(str, exported), stdout=StringIO())
+
+        self.assertEqual(ArchivedTicket.objects.count(), 3)
+
+    def test_rollups_count_archived_tickets(self):
+        archive("--before=2023-01-01")
+        call_command("rebuild_rollups", stdout=StringIO())
+
+        self.assertEqual(
+            MovieDaySales.objects.get(day="2022-06-02").tickets_sold, 3
+        )
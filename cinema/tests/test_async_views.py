@@ -0,0 +1,165 @@
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework_simplejwt.tokens import AccessToken
+
+from cinema.async_views import as_async_view
+from cinema.models import (
+    Actor,
+    CinemaHall,
+    Genre,
+    Movie,
+    MovieSession,
+    Order,
+    Ticket,
+)
+from cinema.views import MovieViewSet, MovieSessionViewSet
+
+
+def sample_movie_session():
+    movie = Movie.objects.create(
+        title="Sample movie", description="Sample description", duration=90
+    )
+    movie.genres.add(Genre.objects.create(name="Async drama"))
+    movie.actors.add(
+        Actor.objects.create(first_name="George", last_name="Clooney")
+    )
+    cinema_hall = CinemaHall.objects.create(
+        name="Blue", rows=10, seats_in_row=12
+    )
+
+    return MovieSession.objects.create(
+        show_time="2022-06-02 14:00:00+00:00",
+        movie=movie,
+        cinema_hall=cinema_hall,
+    )
+
+
+class AsyncReadViewTest(TestCase):
+    def setUp(self) -> None:
+        self.factory = APIRequestFactory()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "test_password"
+        )
+        self.movie_session = sample_movie_session()
+        order = Order.objects.create(user=self.user)
+        Ticket.objects.create(
+            movie_session=self.movie_session, order=order, row=2, seat=3
+        )
+
+    def get(self, viewset, actions, path, **kwargs):
+        request = self.factory.get(path)
+        force_authenticate(request, self.user)
+
+        async_response = async_to_sync(as_async_view(viewset, actions))(
+            request, **kwargs
+        )
+
+        request = self.factory.get(path)
+        force_authenticate(request, self.user)
+        sync_response = viewset.as_view(actions)(request, **kwargs)
+        sync_response.render()
+
+        return async_response, sync_response
+
+    def test_movie_list_matches_sync_view(self):
+        async_response, sync_response = self.get(
+            MovieViewSet, {"get": "list"}, "/api/cinema/movies/"
+        )
+
+        self.assertEqual(async_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(async_response.content, sync_response.content)
+
+    def test_movie_list_filters(self):
+        async_response, sync_response = self.get(
+            MovieViewSet, {"get": "list"}, "/api/cinema/movies/?title=nothing"
+        )
+
+        self.assertEqual(async_response.data, [])
+
+    def test_movie_detail_matches_sync_view(self):
+        async_response, sync_response = self.get(
+            MovieViewSet,
+            {"get": "retrieve"},
+            "/api/cinema/movies/",
+            pk=self.movie_session.movie_id,
+        )
+
+        self.assertEqual(async_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(async_response.content, sync_response.content)
+
+    def test_movie_detail_not_found(self):
+        async_response, _ = self.get(
+            MovieViewSet, {"get": "retrieve"}, "/api/cinema/movies/", pk=0
+        )
+
+        self.assertEqual(async_response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_movie_session_list_matches_sync_view(self):
+        async_response, sync_response = self.get(
+            MovieSessionViewSet,
+            {"get": "list"},
+            "/api/cinema/movie_sessions/",
+        )
+
+        self.assertEqual(async_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(async_response.content, sync_response.content)
+
+    def test_movie_session_detail_matches_sync_view(self):
+        async_response, sync_response = self.get(
+            MovieSessionViewSet,
+            {"get": "retrieve"},
+            "/api/cinema/movie_sessions/",
+            pk=self.movie_session.id,
+        )
+
+        self.assertEqual(async_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(async_response.content, sync_response.content)
+
+    def test_seat_map(self):
+        async_response, sync_response = self.get(
+            MovieSessionViewSet,
+            {"get": "seat_map"},
+            "/api/cinema/movie_sessions/",
+            pk=self.movie_session.id,
+        )
+
+        self.assertEqual(async_response.content, sync_response.content)
+        self.assertEqual(
+            async_response.data,
+            {
+                "id": self.movie_session.id,
+                "rows": 10,
+                "seats_in_row": 12,
+                "taken_places": [{"row": 2, "seat": 3}],
+            },
+        )
+
+    def test_jwt_authentication(self):
+        view = as_async_view(MovieViewSet, {"get": "list"})
+
+        request = self.factory.get(
+            "/api/cinema/movies/",
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}",
+        )
+        response = async_to_sync(view)(request)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        request = self.factory.get("/api/cinema/movies/")
+        response = async_to_sync(view)(request)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_writes_use_sync_viewset(self):
+        view = as_async_view(MovieViewSet, {"get": "list", "post": "create"})
+
+        request = self.factory.post(
+            "/api/cinema/movies/",
+            {"title": "New", "description": "New", "duration": 100},
+        )
+        force_authenticate(request, self.user)
+        response = async_to_sync(view)(request)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,220 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from cinema.models import (
+    CinemaHall,
+    Genre,
+    IdempotencyKey,
+    Movie,
+    MovieSession,
+    Order,
+)
+from cinema.throttling import get_throttle_store
+from user.authentication import AsyncJWTAuthentication
+
+BATCH_URL = reverse("batch")
+GENRE_URL = reverse("cinema:genre-list")
+HALL_URL = reverse("cinema:cinemahall-list")
+ORDER_URL = reverse("cinema:order-list")
+
+
+class BatchApiTest(TestCase):
+    def setUp(self) -> None:
+        get_throttle_store().clear()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "password"
+        )
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}"
+        )
+
+        Genre.objects.create(name="Drama")
+        hall = CinemaHall.objects.create(name="Blue", rows=10, seats_in_row=10)
+        movie = Movie.objects.create(
+            title="Sample movie", description="Description", duration=90
+        )
+        self.movie_session = MovieSession.objects.create(
+            show_time="2030-01-01T10:00:00Z", movie=movie, cinema_hall=hall
+        )
+
+    def batch(self, *requests, headers=None, **kwargs):
+        return self.client.post(
+            BATCH_URL,
+            {"requests": requests, **kwargs},
+            format="json",
+            **(headers or {}),
+        )
+
+    def order(self, seat, **kwargs):
+        return {
+            "method": "POST",
+            "path": ORDER_URL,
+            "body": {
+                "tickets": [
+                    {
+                        "row": 1,
+                        "seat": seat,
+                        "movie_session": self.movie_session.id,
+                    }
+                ]
+            },
+            **kwargs,
+        }
+
+    def test_responses_match_direct_calls(self):
+        response = self.batch(
+            {"method": "GET", "path": GENRE_URL},
+            {"path": f"{HALL_URL}?fields=name"},
+            {"path": reverse("user:manage")},
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        genres, halls, me = response.data["responses"]
+        self.assertEqual(genres["status"], status.HTTP_200_OK)
+        self.assertEqual(genres["body"], self.client.get(GENRE_URL).data)
+        self.assertEqual(halls["body"], [{"name": "Blue"}])
+        self.assertEqual(me["body"]["email"], "test@test.com")
+
+    def test_token_is_decoded_once(self):
+        with mock.patch.object(
+            AsyncJWTAuthentication,
+            "get_validated_token",
+            autospec=True,
+            side_effect=AsyncJWTAuthentication.get_validated_token,
+        ) as get_validated_token:
+            response = self.batch(
+                {"path": GENRE_URL},
+                {"path": HALL_URL},
+                {"path": ORDER_URL},
+            )
+
+        self.assertEqual(
+            [item["status"] for item in response.data["responses"]],
+            [status.HTTP_200_OK] * 3,
+        )
+        self.assertEqual(get_validated_token.call_count, 1)
+
+    def test_writes_run_in_order_and_fail_on_their_own(self):
+        ticket = {
+            "row": 1,
+            "seat": 1,
+            "movie_session": self.movie_session.id,
+        }
+        response = self.batch(
+            {
+                "method": "POST",
+                "path": ORDER_URL,
+                "body": {"tickets": [ticket]},
+            },
+            {
+                "method": "POST",
+                "path": ORDER_URL,
+                "body": {"tickets": [ticket]},
+            },
+            {"path": ORDER_URL},
+        )
+
+        created, taken, orders = response.data["responses"]
+        self.assertEqual(created["status"], status.HTTP_201_CREATED)
+        self.assertEqual(taken["status"], status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(orders["body"]["count"], 1)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_idempotency_key_of_the_batch_is_not_passed_on(self):
+        response = self.batch(
+            self.order(1),
+            self.order(2),
+            headers={"HTTP_IDEMPOTENCY_KEY": "batch"},
+        )
+
+        first, second = response.data["responses"]
+        self.assertEqual(first["status"], status.HTTP_201_CREATED)
+        self.assertEqual(second["status"], status.HTTP_201_CREATED)
+        self.assertNotEqual(first["body"]["id"], second["body"]["id"])
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_sub_request_headers(self):
+        response = self.batch(
+            self.order(1, headers={"Idempotency-Key": "first"}),
+            self.order(1, headers={"Idempotency-Key": "first"}),
+        )
+
+        created, replayed = response.data["responses"]
+        self.assertEqual(replayed["status"], status.HTTP_201_CREATED)
+        self.assertEqual(replayed["body"]["id"], created["body"]["id"])
+        self.assertEqual(Order.objects.count(), 1)
+
+        response = self.batch(
+            self.order(2, headers={"Content-Type": "text/plain"})
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_permissions_apply_to_sub_requests(self):
+        response = self.batch(
+            {"method": "POST", "path": GENRE_URL, "body": {"name": "Comedy"}}
+        )
+        self.assertEqual(
+            response.data["responses"][0]["status"], status.HTTP_403_FORBIDDEN
+        )
+
+        self.client.credentials()
+        response = self.batch({"path": GENRE_URL})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data["responses"][0]["status"],
+            status.HTTP_401_UNAUTHORIZED,
+        )
+
+    def test_unknown_route(self):
+        response = self.batch({"path": "/api/cinema/nothing/"})
+
+        self.assertEqual(
+            response.data["responses"][0]["status"], status.HTTP_404_NOT_FOUND
+        )
+
+    def test_invalid_batches(self):
+        for requests, kwargs in (
+            ([{"path": "/admin/"}], {}),
+            ([{"path": BATCH_URL}], {}),
+            ([], {}),
+            ([{"path": GENRE_URL}] * 21, {}),
+            ([{"method": "POST", "path": ORDER_URL}], {"concurrent": True}),
+        ):
+            response = self.batch(*requests, **kwargs)
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST, requests
+            )
+
+
+class ConcurrentBatchTest(TransactionTestCase):
+    def setUp(self) -> None:
+        get_throttle_store().clear()
+        self.client = APIClient()
+        self.client.force_authenticate(
+            get_user_model().objects.create_user("test@test.com", "password")
+        )
+        Genre.objects.create(name="Drama")
+        CinemaHall.objects.create(name="Blue", rows=10, seats_in_row=10)
+
+    def test_reads_run_concurrently(self):
+        response = self.client.post(
+            BATCH_URL,
+            {
+                "requests": [{"path": GENRE_URL}, {"path": HALL_URL}] * 3,
+                "concurrent": True,
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        bodies = [item["body"] for item in response.data["responses"]]
+        self.assertEqual([genre["name"] for genre in bodies[0]], ["Drama"])
+        self.assertEqual([hall["name"] for hall in bodies[1]], ["Blue"])
+        self.assertEqual(bodies[2:], bodies[:2] * 2)
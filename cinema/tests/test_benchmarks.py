@@ -0,0 +1,29 @@
+from django.test import TestCase
+
+from benchmarks.micro import cases, compare, run_suite
+
+
+class MicroBenchmarkTest(TestCase):
+    def test_every_case_runs(self):
+        results = run_suite([3, 5], min_time=0)
+
+        self.assertEqual(len(results), len(cases()) * 2)
+        for measurement in results.values():
+            self.assertGreater(measurement["ops_per_sec"], 0)
+            self.assertGreaterEqual(measurement["runs"], 1)
+
+    def test_compare_flags_regressions(self):
+        baseline = {
+            "fast[10]": {"ops_per_sec": 100, "peak_kib": 10},
+            "lean[10]": {"ops_per_sec": 100, "peak_kib": 10},
+        }
+        results = {
+            "fast[10]": {"ops_per_sec": 50, "peak_kib": 10},
+            "lean[10]": {"ops_per_sec": 90, "peak_kib": 20},
+            "new[10]": {"ops_per_sec": 1, "peak_kib": 1000},
+        }
+
+        self.assertEqual(
+            compare(results, baseline, tolerance=0.25),
+            {"fast[10]": ["50% slower"], "lean[10]": ["100% more memory"]},
+        )
@@ -0,0 +1,210 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from cinema.booking import commit_batch, queued_sessions
+from cinema.models import (
+    BookingRequest,
+    CinemaHall,
+    Movie,
+    MovieSession,
+    OutboxEvent,
+    SessionOccupancy,
+    Ticket,
+)
+from cinema.throttling import get_throttle_store
+
+ORDER_URL = reverse("cinema:order-list")
+BOOKING_URL = reverse("cinema:bookingrequest-list")
+
+
+def booking_url(booking_id):
+    return reverse("cinema:bookingrequest-detail", args=[booking_id])
+
+
+class QueuedBookingTest(TestCase):
+    def setUp(self) -> None:
+        get_throttle_store().clear()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "password"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        hall = CinemaHall.objects.create(name="Blue", rows=10, seats_in_row=10)
+        movie = Movie.objects.create(
+            title="Sample movie", description="Description", duration=90
+        )
+        self.hot_session = MovieSession.objects.create(
+            show_time="2030-01-01T10:00:00Z",
+            movie=movie,
+            cinema_hall=hall,
+            queued_booking=True,
+        )
+        self.movie_session = MovieSession.objects.create(
+            show_time="2030-01-01T20:00:00Z", movie=movie, cinema_hall=hall
+        )
+
+    def order(self, *places, movie_session=None):
+        movie_session = movie_session or self.hot_session
+        return self.client.post(
+            ORDER_URL,
+            {
+                "tickets": [
+                    {"row": row, "seat": seat, "movie_session": movie_session.id}
+                    for row, seat in places
+                ]
+            },
+            format="json",
+        )
+
+    def test_orders_for_hot_sessions_are_queued(self):
+        response = self.order((1, 1), (1, 2))
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["status"], BookingRequest.QUEUED)
+        self.assertEqual(
+            response.data["tickets"],
+            [{"row": 1, "seat": 1}, {"row": 1, "seat": 2}],
+        )
+        self.assertTrue(
+            response["Location"].endswith(booking_url(response.data["id"]))
+        )
+        self.assertFalse(Ticket.objects.exists())
+
+    def test_other_orders_are_created_right_away(self):
+        response = self.order((1, 1), movie_session=self.movie_session)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(BookingRequest.objects.exists())
+
+    def test_hot_sessions_are_ordered_on_their_own(self):
+        response = self.client.post(
+            ORDER_URL,
+            {
+                "tickets": [
+                    {"row": 1, "seat": 1, "movie_session": session.id}
+                    for session in (self.hot_session, self.movie_session)
+                ]
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(BookingRequest.objects.exists())
+
+    def test_batch_is_booked_in_order(self):
+        first = self.order((1, 1), (1, 2)).data["id"]
+        taken = self.order((1, 2), (1, 3)).data["id"]
+        twice = self.order((2, 1), (2, 1)).data["id"]
+        last = self.order((1, 3)).data["id"]
+
+        # one INSERT per table for the whole batch; the rollups of
+        # sessions created outside the API are computed on first sale
+        with self.assertNumQueries(20):
+            self.assertEqual(commit_batch(self.hot_session.id), 4)
+
+        receipts = {
+            booking_id: self.client.get(booking_url(booking_id)).data
+            for booking_id in (first, taken, twice, last)
+        }
+        self.assertEqual(receipts[first]["status"], BookingRequest.BOOKED)
+        self.assertEqual(receipts[last]["status"], BookingRequest.BOOKED)
+        self.assertEqual(receipts[taken]["status"], BookingRequest.REJECTED)
+        self.assertIn("tickets", receipts[taken]["errors"])
+        self.assertEqual(receipts[twice]["status"], BookingRequest.REJECTED)
+        self.assertIsNone(receipts[taken]["order"])
+
+        self.assertEqual(
+            sorted(
+                Ticket.objects.filter(
+                    order_id=receipts[first]["order"]
+                ).values_list("row", "seat")
+            ),
+            [(1, 1), (1, 2)],
+        )
+        self.assertEqual(
+            SessionOccupancy.objects.get(
+                movie_session=self.hot_session
+            ).tickets_sold,
+            3,
+        )
+        self.assertEqual(
+            list(
+                OutboxEvent.objects.order_by("id").values_list(
+                    "topic", flat=True
+                )
+            ),
+            ["order.created", "order.created", "booking.processed"],
+        )
+        self.assertEqual(commit_batch(self.hot_session.id), 0)
+        self.assertEqual(queued_sessions(), [])
+
+    def test_best_seats_of_hot_sessions_are_queued(self):
+        url = reverse(
+            "cinema:moviesession-best-seats", args=[self.hot_session.id]
+        )
+
+        first = self.client.post(url, {"count": 2})
+        second = self.client.post(url, {"count": 2})
+
+        self.assertEqual(first.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(first.data["status"], BookingRequest.QUEUED)
+        self.assertFalse(Ticket.objects.exists())
+        # the second block avoids the seats queued for by the first
+        self.assertEqual(
+            first.data["tickets"],
+            [{"row": 5, "seat": 5}, {"row": 5, "seat": 6}],
+        )
+        self.assertEqual(
+            second.data["tickets"],
+            [{"row": 5, "seat": 3}, {"row": 5, "seat": 4}],
+        )
+
+        self.assertEqual(commit_batch(self.hot_session.id), 2)
+        self.assertEqual(
+            Ticket.objects.filter(movie_session=self.hot_session).count(), 4
+        )
+
+    def test_sold_seats_are_rejected(self):
+        self.order((5, 5))
+        commit_batch(self.hot_session.id)
+
+        response = self.order((5, 5))
+
+        # the ticket exists by now, so the order doesn't even get queued
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_batch_size(self):
+        for seat in range(1, 4):
+            self.order((1, seat))
+
+        self.assertEqual(commit_batch(self.hot_session.id, batch_size=2), 2)
+        self.assertEqual(commit_batch(self.hot_session.id, batch_size=2), 1)
+
+    def test_receipts_belong_to_their_user(self):
+        booking_id = self.order((1, 1)).data["id"]
+        self.client.force_authenticate(
+            get_user_model().objects.create_user("other@test.com", "password")
+        )
+
+        response = self.client.get(booking_url(booking_id))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(BOOKING_URL).data["count"], 0)
+
+    def test_command(self):
+        self.order((1, 1))
+        out = StringIO()
+
+        call_command("commit_bookings", "--once", stdout=out)
+
+        self.assertIn("processed 1 orders", out.getvalue())
+        self.assertEqual(
+            BookingRequest.objects.get().status, BookingRequest.BOOKED
+        )
@@ -0,0 +1,145 @@
+import csv
+import gzip
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, TestCase
+
+from cinema.models import (
+    Genre,
+    HallDayOccupancy,
+    Movie,
+    MovieSession,
+    Order,
+    SessionOccupancy,
+    Ticket,
+)
+from cinema_api.bulk_load import copy_value, iter_json_array
+
+FIXTURE = Path(settings.BASE_DIR) / "fixture_data.json"
+
+
+def bulk_load(*args, **options):
+    call_command("bulk_load", *args, stdout=StringIO(), **options)
+
+
+class IterJsonArrayTest(SimpleTestCase):
+    def test_items_split_across_chunks(self):
+        items = [{"a": [1, 2, {"b": "x, ]"}]}, {"c": "é"}, {}]
+        text = "\n [ " + ",\n".join(json.dumps(item) for item in items) + "]"
+
+        self.assertEqual(list(iter_json_array(StringIO(text), 3)), items)
+
+    def test_truncated_array(self):
+        with self.assertRaises(ValueError):
+            list(iter_json_array(StringIO('[{"a": 1}, {"b"'), 4))
+
+    def test_copy_value(self):
+        self.assertEqual(copy_value(None), "\\N")
+        self.assertEqual(copy_value(True), "t")
+        self.assertEqual(copy_value("a\tb\\c\n"), "a\\tb\\\\c\\n")
+
+
+class BulkLoadCommandTest(TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name)
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_load_fixture(self):
+        bulk_load(str(FIXTURE))
+
+        self.assertEqual(Ticket.objects.count(), 16)
+        self.assertEqual(
+            set(Movie.objects.get(pk=1).genres.values_list("id", flat=True)),
+            {1, 2, 3},
+        )
+        # loaded raw, like loaddata: auto_now_add keeps the fixture value
+        self.assertEqual(Order.objects.get(pk=1).created_at.year, 2022)
+        self.assertEqual(Genre.objects.create(name="New").pk, 8)
+
+    def test_load_rebuilds_rollups(self):
+        bulk_load(str(FIXTURE))
+
+        self.assertEqual(
+            SessionOccupancy.objects.count(), MovieSession.objects.count()
+        )
+        for occupancy in SessionOccupancy.objects.all():
+            self.assertEqual(
+                occupancy.tickets_sold,
+                Ticket.objects.filter(
+                    movie_session_id=occupancy.movie_session_id
+                ).count(),
+            )
+        self.assertEqual(
+            sum(HallDayOccupancy.objects.values_list("tickets_sold", flat=True)),
+            16,
+        )
+
+    def test_load_gzipped_ndjson_and_exclude(self):
+        path = self.path / "data.ndjson.gz"
+        with gzip.open(path, "wt") as ndjson:
+            for obj in json.loads(FIXTURE.read_text()):
+                ndjson.write(json.dumps(obj) + "\n")
+
+        bulk_load(str(path), exclude=["user", "cinema.order", "cinema.ticket"])
+
+        self.assertEqual(MovieSession.objects.count(), 8)
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(Ticket.objects.exists())
+
+    def test_load_csv_with_many_to_many(self):
+        Genre.objects.bulk_create(
+            [Genre(pk=1, name="Drama"), Genre(pk=2, name="Crime")]
+        )
+        path = self.path / "movies.csv"
+        with open(path, "w", newline="") as movies:
+            writer = csv.writer(movies)
+            writer.writerow(["title", "description", "duration", "genres"])
+            writer.writerow(["First", "One", "90", "1|2"])
+            writer.writerow(["Second", "Two", "100", ""])
+
+        bulk_load(str(path), model="cinema.movie", batch_size=1)
+
+        self.assertEqual(
+            Movie.objects.get(title="First").genres.count(), 2
+        )
+        self.assertFalse(Movie.objects.get(title="Second").genres.exists())
+
+    def test_broken_references_roll_back(self):
+        path = self.path / "tickets.ndjson"
+        path.write_text(
+            json.dumps({"model": "cinema.genre", "pk": 1, "fields": {"name": "A"}})
+            + "\n"
+            + json.dumps(
+                {
+                    "model": "cinema.ticket",
+                    "pk": 1,
+                    "fields": {
+                        "movie_session": 404,
+                        "order": 404,
+                        "row": 1,
+                        "seat": 1,
+                    },
+                }
+            )
+        )
+
+        with self.assertRaises(CommandError):
+            bulk_load(str(path))
+
+        self.assertFalse(Genre.objects.exists())
+
+    def test_csv_requires_model(self):
+        path = self.path / "movies.csv"
+        path.write_text("title\n")
+
+        with self.assertRaises(CommandError):
+            bulk_load(str(path))
@@ -4,12 +4,16 @@ from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from cinema.models import CinemaHall
+from cinema.models import CinemaHall, Movie, MovieSession
 from cinema.serializers import CinemaHallSerializer
 
 CINEMA_HALL_URL = reverse("cinema:cinemahall-list")
 
 
+def free_slots_url(cinema_hall_id):
+    return reverse("cinema:cinemahall-free-slots", args=[cinema_hall_id])
+
+
 def sample_cinema_hall(**params):
     defaults = {
         "name": "Sample name",
@@ -61,6 +65,39 @@ class AuthenticatedCinemaHallApiTest(TestCase):
         response = self.client.post(CINEMA_HALL_URL, payload)
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
+    def test_free_slots(self):
+        cinema_hall = sample_cinema_hall()
+        movie = Movie.objects.create(
+            title="Sample movie", description="Sample", duration=120
+        )
+        for show_time in ["2030-01-06 23:00:00", "2030-01-07 14:00:00"]:
+            MovieSession.objects.create(
+                show_time=show_time, movie=movie, cinema_hall=cinema_hall
+            )
+
+        response = self.client.get(
+            free_slots_url(cinema_hall.id), {"date": "2030-01-07"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data,
+            [
+                {"start": "2030-01-07T01:00:00Z", "end": "2030-01-07T14:00:00Z"},
+                {"start": "2030-01-07T16:00:00Z", "end": "2030-01-08T00:00:00Z"},
+            ],
+        )
+
+        response = self.client.get(
+            free_slots_url(cinema_hall.id),
+            {"date": "2030-01-07", "min_duration": 600},
+        )
+        self.assertEqual(len(response.data), 1)
+
+    def test_free_slots_requires_date(self):
+        response = self.client.get(free_slots_url(sample_cinema_hall().id))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
 
 class AdminCinemaHallApiTest(TestCase):
     def setUp(self) -> None:
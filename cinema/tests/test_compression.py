@@ -0,0 +1,88 @@
+import gzip
+import json
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from cinema_api import compression
+from cinema_api.compression import CompressionMiddleware, negotiate
+
+PAYLOAD = {"movies": [{"title": f"Movie {number}"} for number in range(200)]}
+
+
+def json_view(request):
+    return JsonResponse(PAYLOAD)
+
+
+@override_settings(COMPRESSION_MIN_SIZE=1024)
+class CompressionMiddlewareTest(SimpleTestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.factory = RequestFactory()
+        self.middleware = CompressionMiddleware(json_view)
+
+    def get(self, accept_encoding="gzip", middleware=None):
+        request = self.factory.get(
+            "/api/cinema/movies/", HTTP_ACCEPT_ENCODING=accept_encoding
+        )
+        return (middleware or self.middleware)(request)
+
+    def test_gzip(self):
+        response = self.get()
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        self.assertEqual(
+            json.loads(gzip.decompress(response.content)), PAYLOAD
+        )
+        self.assertEqual(int(response["Content-Length"]), len(response.content))
+
+    def test_identity_when_not_accepted(self):
+        for accept_encoding in ("", "identity", "gzip;q=0", "br"):
+            response = self.get(accept_encoding)
+
+            self.assertFalse(response.has_header("Content-Encoding"))
+            self.assertEqual(json.loads(response.content), PAYLOAD)
+
+    def test_small_and_html_responses_are_left_alone(self):
+        small = CompressionMiddleware(lambda request: JsonResponse({}))
+        html = CompressionMiddleware(
+            lambda request: HttpResponse("<p>csrf</p>" * 500)
+        )
+
+        for middleware in (small, html):
+            response = self.get(middleware=middleware)
+            self.assertFalse(response.has_header("Content-Encoding"))
+
+    def test_hot_responses_are_compressed_once(self):
+        encoders = {"gzip": mock.Mock(wraps=compression.gzip_compress)}
+
+        with mock.patch.object(compression, "ENCODERS", encoders):
+            first = self.get()
+            second = self.get()
+
+        self.assertEqual(encoders["gzip"].call_count, 1)
+        self.assertEqual(first.content, second.content)
+
+    def test_async(self):
+        async def async_view(request):
+            return json_view(request)
+
+        middleware = CompressionMiddleware(async_view)
+        response = async_to_sync(middleware)(
+            self.factory.get("/", HTTP_ACCEPT_ENCODING="gzip")
+        )
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+
+    def test_negotiate(self):
+        encoders = {"zstd": None, "br": None, "gzip": None}
+
+        self.assertEqual(negotiate("gzip, br, zstd", encoders), "zstd")
+        self.assertEqual(negotiate("gzip, br;q=0.5", encoders), "gzip")
+        self.assertEqual(negotiate("*", encoders), "zstd")
+        self.assertEqual(negotiate("*, zstd;q=0", encoders), "br")
+        self.assertIsNone(negotiate("deflate", encoders))
@@ -0,0 +1,154 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connections
+from django.db.utils import OperationalError
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework import status
+
+from cinema_api.db.pool import ConnectionPool, PoolTimeout
+
+READINESS_URL = reverse("readiness")
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+@mock.patch("cinema.management.commands.wait_for_db.time.sleep")
+@mock.patch("cinema.management.commands.wait_for_db.connections")
+class WaitForDbCommandTest(SimpleTestCase):
+    def test_wait_for_db_ready(self, patched_connections, patched_sleep):
+        out = StringIO()
+        call_command("wait_for_db", stdout=out)
+
+        db_conn = patched_connections.__getitem__.return_value
+        db_conn.cursor.return_value.__enter__.return_value.execute \
+            .assert_called_once_with("SELECT 1")
+        patched_sleep.assert_not_called()
+        self.assertIn("db available", out.getvalue())
+
+    def test_wait_for_db_backs_off(self, patched_connections, patched_sleep):
+        db_conn = patched_connections.__getitem__.return_value
+        db_conn.cursor.side_effect = [OperationalError] * 4 + [mock.MagicMock()]
+
+        call_command("wait_for_db", stdout=StringIO())
+
+        self.assertEqual(db_conn.cursor.call_count, 5)
+        delays = [call.args[0] for call in patched_sleep.call_args_list]
+        self.assertEqual(delays, sorted(delays))
+        self.assertGreater(delays[-1], delays[0])
+
+    def test_wait_for_db_timeout(self, patched_connections, patched_sleep):
+        db_conn = patched_connections.__getitem__.return_value
+        db_conn.cursor.side_effect = OperationalError
+
+        with self.assertRaises(CommandError):
+            call_command("wait_for_db", "--timeout=0", stdout=StringIO())
+
+
+class ConnectionPoolTest(SimpleTestCase):
+    def test_reuses_released_connections(self):
+        pool = ConnectionPool(max_size=2)
+
+        connection = pool.acquire(FakeConnection)
+        pool.release(connection)
+
+        self.assertIs(pool.acquire(FakeConnection), connection)
+
+    def test_waits_then_times_out_when_exhausted(self):
+        pool = ConnectionPool(max_size=1, timeout=0.01)
+        pool.acquire(FakeConnection)
+
+        with self.assertRaises(PoolTimeout):
+            pool.acquire(FakeConnection)
+
+    def test_discards_broken_connections(self):
+        pool = ConnectionPool(max_size=1)
+
+        connection = pool.acquire(FakeConnection)
+        connection.close()
+        pool.release(connection)
+
+        self.assertIsNot(pool.acquire(FakeConnection), connection)
+
+    def test_health_check_on_idle_connections(self):
+        check = mock.Mock(side_effect=Exception)
+        pool = ConnectionPool(max_size=1, check_after=0, check=check)
+
+        connection = pool.acquire(FakeConnection)
+        pool.release(connection)
+        new_connection = pool.acquire(FakeConnection)
+
+        check.assert_called_once_with(connection)
+        self.assertTrue(connection.closed)
+        self.assertIsNot(new_connection, connection)
+
+    def test_stats(self):
+        pool = ConnectionPool(max_size=4)
+        pool.release(pool.acquire(FakeConnection))
+        pool.acquire(FakeConnection)
+
+        self.assertEqual(
+            pool.stats(),
+            {
+                "max_size": 4,
+                "in_use": 1,
+                "idle": 0,
+                "waiting": 0,
+                "saturation": 0.25,
+            },
+        )
+
+
+class ReadinessTest(TestCase):
+    # the probe connects to every configured database
+    databases = "__all__"
+
+    def test_ready(self):
+        response = self.client.get(READINESS_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.json()["databases"]["default"]["available"])
+
+    def test_pool_saturation_is_reported(self):
+        stats = {
+            "default": {
+                "max_size": 1,
+                "in_use": 1,
+                "idle": 0,
+                "waiting": 3,
+                "saturation": 1.0,
+            }
+        }
+        with mock.patch("cinema_api.views.get_pool_stats", return_value=stats):
+            response = self.client.get(READINESS_URL)
+
+        self.assertEqual(
+            response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+        self.assertEqual(
+            response.json()["databases"]["default"]["pool"]["saturation"], 1.0
+        )
+
+    def test_connection_error_is_logged_not_shown(self):
+        error = OperationalError('could not connect to "db.internal" as admin')
+        with mock.patch.object(
+            connections["default"], "cursor", side_effect=error
+        ), self.assertLogs("cinema_api.views", "ERROR") as logs:
+            response = self.client.get(READINESS_URL)
+
+        self.assertEqual(
+            response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+        self.assertEqual(
+            response.json()["databases"]["default"], {"available": False}
+        )
+        self.assertIn("db.internal", logs.output[0])
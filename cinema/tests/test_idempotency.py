@@ -0,0 +1,135 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from cinema.idempotency import fingerprint, purge_expired
+from cinema.models import (
+    CinemaHall,
+    IdempotencyKey,
+    Movie,
+    MovieSession,
+    Order,
+)
+from cinema.throttling import get_throttle_store
+
+ORDER_URL = reverse("cinema:order-list")
+
+
+class IdempotentOrderTest(TestCase):
+    def setUp(self) -> None:
+        get_throttle_store().clear()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "password"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        hall = CinemaHall.objects.create(name="Blue", rows=10, seats_in_row=10)
+        movie = Movie.objects.create(
+            title="Sample movie", description="Description", duration=90
+        )
+        self.movie_session = MovieSession.objects.create(
+            show_time="2030-01-01T10:00:00Z", movie=movie, cinema_hall=hall
+        )
+
+    def payload(self, *places):
+        return {
+            "tickets": [
+                {
+                    "row": row,
+                    "seat": seat,
+                    "movie_session": self.movie_session.id,
+                }
+                for row, seat in places
+            ]
+        }
+
+    def order(self, payload, key="order-1"):
+        return self.client.post(
+            ORDER_URL, payload, format="json", HTTP_IDEMPOTENCY_KEY=key
+        )
+
+    def test_retries_replay_the_first_response(self):
+        first = self.order(self.payload((1, 1), (1, 2)))
+        with CaptureQueriesContext(connection) as queries:
+            retry = self.order(self.payload((1, 1), (1, 2)))
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertFalse(
+            [
+                query
+                for query in queries
+                if "cinema_ticket" in query["sql"]
+                or "cinema_order" in query["sql"]
+            ]
+        )
+
+    def test_key_reused_for_another_request(self):
+        self.order(self.payload((1, 1)))
+        response = self.order(self.payload((2, 2)))
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("idempotency_key", response.data)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_keys_belong_to_their_user(self):
+        self.order(self.payload((1, 1)))
+        self.client.force_authenticate(
+            get_user_model().objects.create_user("other@test.com", "password")
+        )
+        response = self.order(self.payload((1, 2)))
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_failed_requests_can_be_retried(self):
+        response = self.order(self.payload((100, 1)))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+        response = self.order(self.payload((1, 1)))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_expired_keys_create_again(self):
+        self.order(self.payload((1, 1)))
+        IdempotencyKey.objects.update(
+            expires_at=timezone.now() - timedelta(seconds=1)
+        )
+
+        response = self.order(self.payload((1, 1)))
+
+        # the seat is taken by the first order by now
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertNotIn("idempotency_key", response.data)
+
+    def test_without_key(self):
+        self.client.post(ORDER_URL, self.payload((1, 1)), format="json")
+
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_purge_expired_in_batches(self):
+        expires_at = timezone.now() - timedelta(seconds=1)
+        IdempotencyKey.objects.bulk_create(
+            IdempotencyKey(
+                user=self.user,
+                key=f"key-{number}",
+                fingerprint=fingerprint({}),
+                expires_at=expires_at,
+            )
+            for number in range(5)
+        )
+        self.order(self.payload((1, 1)))
+
+        self.assertEqual(purge_expired(batch_size=2), 5)
+        self.assertEqual(IdempotencyKey.objects.count(), 1)
@@ -0,0 +1,198 @@
+import tempfile
+import time
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+
+from cinema import jobs
+from cinema.models import Job, Movie
+from cinema.tasks import resize_movie_image
+
+TASK = "cinema.tests.test_jobs.remember"
+FAILING_TASK = "cinema.tests.test_jobs.fail"
+SLOW_TASK = "cinema.tests.test_jobs.wait"
+
+calls = []
+
+
+def remember(**kwargs):
+    calls.append(kwargs)
+
+
+def fail():
+    raise RuntimeError("try again")
+
+
+def wait():
+    time.sleep(0.3)
+
+
+@override_settings(
+    JOB_QUEUE_CONCURRENCY={"images": 1},
+    JOB_SCHEDULE={},
+    JOB_RETRY_BACKOFF_SECONDS=10,
+)
+class JobTest(TestCase):
+    def setUp(self) -> None:
+        calls.clear()
+
+    def test_enqueued_jobs_run(self):
+        job = jobs.enqueue(TASK, {"movie_id": 1})
+
+        self.assertEqual(jobs.run_worker(once=True), 1)
+        job.refresh_from_db()
+        self.assertEqual(calls, [{"movie_id": 1}])
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(job.attempts, 1)
+
+    def test_retries_with_backoff(self):
+        job = jobs.enqueue(FAILING_TASK, max_attempts=2)
+
+        jobs.run_worker(once=True)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertIn("try again", job.last_error)
+        self.assertGreater(
+            job.run_at, timezone.now() + timedelta(seconds=5)
+        )
+        # not due yet
+        self.assertEqual(jobs.run_worker(once=True), 0)
+
+        Job.objects.update(run_at=timezone.now())
+        jobs.run_worker(once=True)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_scheduled_jobs_wait(self):
+        jobs.enqueue(TASK, run_at=timezone.now() + timedelta(hours=1))
+
+        self.assertEqual(jobs.run_worker(once=True), 0)
+        self.assertEqual(calls, [])
+
+    def test_keys_deduplicate(self):
+        self.assertIsNotNone(jobs.enqueue(TASK, key="warm"))
+        self.assertIsNone(jobs.enqueue(TASK, key="warm"))
+
+        jobs.run_worker(once=True)
+        self.assertIsNotNone(jobs.enqueue(TASK, key="warm"))
+
+    def test_queue_concurrency(self):
+        running = jobs.enqueue(TASK, queue="images")
+        waiting = jobs.enqueue(TASK, queue="images")
+        other = jobs.enqueue(TASK)
+
+        self.assertEqual(jobs.claim(worker="a").id, running.id)
+        self.assertEqual(jobs.claim(worker="b").id, other.id)
+        self.assertIsNone(jobs.claim(worker="c"))
+
+        jobs.execute(Job.objects.get(pk=running.pk))
+        self.assertEqual(jobs.claim(worker="c").id, waiting.id)
+
+    def test_queues(self):
+        jobs.enqueue(TASK, queue="images")
+
+        self.assertIsNone(jobs.claim(["default"]))
+        self.assertIsNotNone(jobs.claim(["images"]))
+
+    def test_periodic_jobs(self):
+        schedule = {"warm": {"task": TASK, "every": 3600}}
+        with self.settings(JOB_SCHEDULE=schedule):
+            self.assertEqual(jobs.run_worker(once=True), 1)
+
+        done, scheduled = Job.objects.order_by("id")
+        self.assertEqual(done.status, Job.DONE)
+        self.assertEqual(scheduled.status, Job.QUEUED)
+        self.assertEqual(scheduled.run_at, done.run_at + timedelta(hours=1))
+
+    def test_stale_jobs_are_requeued(self):
+        jobs.enqueue(TASK)
+        job = jobs.claim()
+        Job.objects.update(locked_at=timezone.now() - timedelta(days=1))
+
+        self.assertEqual(jobs.requeue_stale(), 1)
+        self.assertEqual(jobs.claim().id, job.id)
+
+    def test_stale_jobs_fail_after_last_attempt(self):
+        job = jobs.enqueue(TASK, max_attempts=1)
+        jobs.claim()
+        Job.objects.update(locked_at=timezone.now() - timedelta(days=1))
+
+        self.assertEqual(jobs.requeue_stale(), 0)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIn("stopped responding", job.last_error)
+
+    def test_command(self):
+        jobs.enqueue(TASK)
+        out = StringIO()
+
+        call_command("run_workers", "--once", stdout=out)
+
+        self.assertIn("ran 1 jobs", out.getvalue())
+
+
+@override_settings(JOB_HEARTBEAT_SECONDS=0.05)
+class HeartbeatTest(TransactionTestCase):
+    def test_running_jobs_stay_locked(self):
+        jobs.enqueue(SLOW_TASK)
+        job = jobs.claim()
+
+        jobs.execute(job)
+
+        self.assertGreater(
+            Job.objects.get().locked_at,
+            job.locked_at + timedelta(seconds=0.1),
+        )
+
+
+class ResizeMovieImageTest(TestCase):
+    def setUp(self) -> None:
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+
+    def create_movie(self):
+        content = BytesIO()
+        Image.new("RGB", (400, 200)).save(content, format="JPEG")
+        return Movie.objects.create(
+            title="Sample movie",
+            description="Description",
+            duration=90,
+            image=SimpleUploadedFile("poster.jpg", content.getvalue()),
+        )
+
+    def test_large_images_are_shrunk(self):
+        movie = self.create_movie()
+        original = movie.image.name
+
+        with self.settings(MOVIE_IMAGE_MAX_SIZE=(100, 100)):
+            jobs.enqueue(
+                "cinema.tasks.resize_movie_image", {"movie_id": movie.id}
+            )
+            jobs.run_worker(once=True)
+
+        movie.refresh_from_db()
+        with movie.image.open("rb") as file:
+            self.assertEqual(Image.open(file).size, (100, 50))
+        self.assertFalse(movie.image.storage.exists(original))
+
+    def test_images_are_kept_when_saving_fails(self):
+        movie = self.create_movie()
+
+        with self.settings(MOVIE_IMAGE_MAX_SIZE=(100, 100)), mock.patch(
+            "django.core.files.storage.FileSystemStorage.save",
+            side_effect=OSError("disk full"),
+        ):
+            with self.assertRaises(OSError):
+                resize_movie_image(movie.id)
+
+        movie.refresh_from_db()
+        with movie.image.open("rb") as file:
+            self.assertEqual(Image.open(file).size, (400, 200))
@@ -1,10 +1,19 @@
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from cinema.models import Movie, MovieSession, CinemaHall, Genre, Actor
+from cinema.models import (
+    Movie,
+    MovieSession,
+    CinemaHall,
+    Genre,
+    Actor,
+    SessionOccupancy,
+)
 from cinema.serializers import MovieListSerializer, MovieDetailSerializer
 
 MOVIE_URL = reverse("cinema:movie-list")
@@ -155,6 +164,75 @@ class AuthenticatedMovieApiTest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data, serializer.data)
 
+    def test_list_movies_with_next_sessions(self):
+        movie = sample_movie()
+        other_movie = sample_movie(title="Other movie")
+        sample_movie_session(movie=movie, show_time="2020-01-01T10:00:00Z")
+        sold_out = sample_movie_session(
+            movie=movie, show_time="2030-01-01T10:00:00Z"
+        )
+        SessionOccupancy.objects.create(
+            movie_session=sold_out, tickets_sold=400, capacity=400
+        )
+        later = sample_movie_session(
+            movie=movie, show_time="2030-01-03T10:00:00Z"
+        )
+        sooner = sample_movie_session(
+            movie=movie, show_time="2030-01-02T10:00:00Z"
+        )
+        sample_movie_session(movie=movie, show_time="2030-01-04T10:00:00Z")
+        other = sample_movie_session(
+            movie=other_movie, show_time="2030-01-05T10:00:00Z"
+        )
+
+        with CaptureQueriesContext(connection) as plain:
+            self.client.get(MOVIE_URL)
+        with CaptureQueriesContext(connection) as embedded:
+            response = self.client.get(MOVIE_URL, {"with_sessions": 2})
+
+        # one windowed query for the sessions of all the movies
+        self.assertEqual(len(embedded), len(plain) + 1)
+        self.assertIn("ROW_NUMBER()", embedded.captured_queries[-1]["sql"])
+        next_sessions = {
+            item["title"]: item["next_sessions"] for item in response.data
+        }
+        self.assertEqual(
+            [session["id"] for session in next_sessions["Sample movie"]],
+            [sooner.id, later.id],
+        )
+        self.assertEqual(
+            next_sessions["Other movie"],
+            [
+                {
+                    "id": other.id,
+                    "show_time": "2030-01-05T10:00:00Z",
+                    "cinema_hall_name": "Blue",
+                    "tickets_available": 400,
+                }
+            ],
+        )
+
+    def test_retrieve_movie_with_next_sessions(self):
+        movie = sample_movie()
+        movie_session = sample_movie_session(
+            movie=movie, show_time="2030-01-01T10:00:00Z"
+        )
+
+        response = self.client.get(detail_url(movie.id), {"with_sessions": 1})
+
+        self.assertEqual(
+            [session["id"] for session in response.data["next_sessions"]],
+            [movie_session.id],
+        )
+        self.assertNotIn(
+            "next_sessions", self.client.get(detail_url(movie.id)).data
+        )
+
+    def test_with_sessions_is_validated(self):
+        response = self.client.get(MOVIE_URL, {"with_sessions": 0})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_create_movie_forbidden(self):
         payload = {
             "title": "Sample movie",
@@ -4,8 +4,20 @@ from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from cinema.models import MovieSession, CinemaHall, Genre, Actor, Movie
-from cinema.serializers import MovieSessionListSerializer
+from cinema.models import (
+    MovieSession,
+    CinemaHall,
+    Genre,
+    Actor,
+    Movie,
+    Order,
+    Ticket,
+)
+from cinema.serializers import (
+    MovieSessionBulkSerializer,
+    MovieSessionListSerializer,
+)
+from cinema.throttling import get_throttle_store
 
 MOVIE_SESSION_URL = reverse("cinema:moviesession-list")
 
@@ -66,6 +78,10 @@ def detail_url(movie_session_id):
     return reverse("cinema:moviesession-detail", args=[movie_session_id])
 
 
+def best_seats_url(movie_session_id):
+    return reverse("cinema:moviesession-best-seats", args=[movie_session_id])
+
+
 class UnauthenticatedMovieSessionApiTest(TestCase):
     def setUp(self) -> None:
         self.client = APIClient()
@@ -143,6 +159,40 @@ class AdminMovieSessionApiTest(TestCase):
         response = self.client.post(MOVIE_SESSION_URL, payload)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
 
+    def test_create_overlapping_movie_session(self):
+        movie_session = sample_movie_session(show_time="2022-06-02 14:00:00")
+
+        payload = {
+            "movie": sample_movie(duration=30).id,
+            "cinema_hall": movie_session.cinema_hall.id,
+        }
+        for show_time, expected_status in [
+            ("2022-06-02 13:31:00", status.HTTP_400_BAD_REQUEST),
+            ("2022-06-02 15:29:00", status.HTTP_400_BAD_REQUEST),
+            ("2022-06-02 13:30:00", status.HTTP_201_CREATED),
+            ("2022-06-02 15:30:00", status.HTTP_201_CREATED),
+        ]:
+            response = self.client.post(
+                MOVIE_SESSION_URL, {**payload, "show_time": show_time}
+            )
+            self.assertEqual(response.status_code, expected_status, show_time)
+
+    def test_update_movie_session_overlap(self):
+        movie_session = sample_movie_session(show_time="2022-06-02 14:00:00")
+        other = MovieSession.objects.create(
+            show_time="2022-06-02 18:00:00",
+            movie=movie_session.movie,
+            cinema_hall=movie_session.cinema_hall,
+        )
+        url = detail_url(other.id)
+
+        response = self.client.patch(url, {"show_time": "2022-06-02 15:00:00"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(f"session {movie_session.id}", response.data["show_time"][0])
+
+        response = self.client.patch(url, {"show_time": "2022-06-02 17:30:00"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
 
 class MovieSessionModelTest(TestCase):
     @classmethod
@@ -168,3 +218,255 @@ class MovieSessionModelTest(TestCase):
         movie_session = MovieSession.objects.get(id=1)
         expected_object_name = f"{movie_session.movie.title} {movie_session.show_time}"
         self.assertEqual(str(movie_session), expected_object_name)
+
+
+MOVIE_SESSION_BULK_URL = reverse("cinema:moviesession-bulk")
+
+
+class MovieSessionBulkApiTest(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "admin@test.com",
+            "test_password",
+            is_staff=True
+        )
+        self.client.force_authenticate(self.user)
+        self.movie = sample_movie(duration=50)
+        self.hall1 = sample_cinema_hall(name="Blue")
+        self.hall2 = sample_cinema_hall(name="Red")
+
+    def test_bulk_forbidden_for_regular_user(self):
+        self.client.force_authenticate(
+            get_user_model().objects.create_user("user@test.com", "password")
+        )
+
+        response = self.client.post(MOVIE_SESSION_BULK_URL, {}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_bulk_recurrence(self):
+        payload = {
+            "recurrences": [
+                {
+                    "movie": self.movie.id,
+                    "cinema_halls": [self.hall1.id, self.hall2.id],
+                    "start_date": "2030-01-07",
+                    "end_date": "2030-01-13",
+                    "weekdays": [0, 2, 4],
+                    "times": ["14:00", "18:30"],
+                }
+            ]
+        }
+
+        response = self.client.post(
+            MOVIE_SESSION_BULK_URL, payload, format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data["created"]), 3 * 2 * 2)
+        self.assertEqual(
+            MovieSession.objects.filter(
+                id__in=response.data["created"],
+                show_time__week_day=2,
+            ).count(),
+            4,
+        )
+
+    def test_bulk_explicit_sessions(self):
+        payload = {
+            "sessions": [
+                {
+                    "show_time": f"2030-01-07T{hour:02}:00:00Z",
+                    "movie": self.movie.id,
+                    "cinema_hall": self.hall1.id,
+                }
+                for hour in range(10, 20)
+            ]
+        }
+
+        response = self.client.post(
+            MOVIE_SESSION_BULK_URL, payload, format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data["created"]), 10)
+
+    def test_bulk_query_count_is_fixed(self):
+        payload = {
+            "sessions": [
+                {
+                    "show_time": f"2030-01-{day:02}T{hour:02}:00:00Z",
+                    "movie": self.movie.id,
+                    "cinema_hall": self.hall1.id,
+                }
+                for day in range(1, 11)
+                for hour in range(0, 24)
+            ]
+        }
+
+        # movies, halls, savepoint, hall lock, longest movie, existing
+        # sessions, insert, session stats, 3 rollup upserts, outbox event,
+        # release
+        with self.assertNumQueries(13):
+            response = self.client.post(
+                MOVIE_SESSION_BULK_URL, payload, format="json"
+            )
+
+        self.assertEqual(len(response.data["created"]), 10 * 24)
+
+    def test_bulk_per_item_errors(self):
+        sample_movie_session(
+            show_time="2030-01-07T10:00:00Z", cinema_hall=self.hall1
+        )
+        payload = {
+            "sessions": [
+                {
+                    "show_time": "2030-01-07T10:00:00Z",
+                    "movie": self.movie.id,
+                    "cinema_hall": self.hall1.id,
+                },
+                {
+                    "show_time": "2030-01-07T12:00:00Z",
+                    "movie": self.movie.id,
+                    "cinema_hall": 0 + 9999,
+                },
+                {
+                    "show_time": "2030-01-07T14:00:00Z",
+                    "movie": self.movie.id,
+                    "cinema_hall": self.hall1.id,
+                },
+            ]
+        }
+
+        response = self.client.post(
+            MOVIE_SESSION_BULK_URL, payload, format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        errors = response.data["errors"]
+        self.assertEqual([error["index"] for error in errors], [0, 1])
+        self.assertIn("show_time", errors[0]["errors"])
+        self.assertIn("cinema_hall", errors[1]["errors"])
+        self.assertFalse(MovieSession.objects.filter(movie=self.movie).exists())
+
+        payload["atomic"] = False
+        response = self.client.post(
+            MOVIE_SESSION_BULK_URL, payload, format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data["created"]), 1)
+        self.assertEqual(len(response.data["errors"]), 2)
+
+    def test_bulk_overlapping_sessions(self):
+        payload = {
+            "sessions": [
+                {
+                    "show_time": show_time,
+                    "movie": self.movie.id,
+                    "cinema_hall": self.hall1.id,
+                }
+                for show_time in [
+                    "2030-01-07T10:00:00Z",
+                    "2030-01-07T10:30:00Z",
+                    "2030-01-07T10:50:00Z",
+                ]
+            ],
+            "atomic": False,
+        }
+
+        response = self.client.post(
+            MOVIE_SESSION_BULK_URL, payload, format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data["created"]), 2)
+        self.assertEqual(response.data["errors"][0]["index"], 1)
+        self.assertIn("item 0", response.data["errors"][0]["errors"]["show_time"][0])
+
+    def test_bulk_rechecks_overlaps_on_save(self):
+        serializer = MovieSessionBulkSerializer(
+            data={
+                "sessions": [
+                    {
+                        "show_time": f"2030-01-07T{hour}:00:00Z",
+                        "movie": self.movie.id,
+                        "cinema_hall": self.hall1.id,
+                    }
+                    for hour in (10, 12)
+                ]
+            }
+        )
+        self.assertTrue(serializer.is_valid())
+        # scheduled by a concurrent request meanwhile
+        sample_movie_session(
+            show_time="2030-01-07T12:00:00Z", cinema_hall=self.hall1
+        )
+
+        self.assertEqual(serializer.save(), [])
+        self.assertEqual(
+            [error["index"] for error in serializer.validated_data["errors"]],
+            [1],
+        )
+        self.assertEqual(MovieSession.objects.count(), 1)
+
+
+class BestSeatsApiTest(TestCase):
+    def setUp(self) -> None:
+        get_throttle_store().clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "test_password"
+        )
+        self.client.force_authenticate(self.user)
+        self.movie_session = sample_movie_session(
+            cinema_hall=sample_cinema_hall(rows=3, seats_in_row=6)
+        )
+        order = Order.objects.create(user=self.user)
+        for seat in (3, 4):
+            Ticket.objects.create(
+                movie_session=self.movie_session, order=order, row=2, seat=seat
+            )
+
+    def test_best_seats(self):
+        response = self.client.get(
+            best_seats_url(self.movie_session.id), {"count": 2}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data, [{"row": 2, "seat": 1}, {"row": 2, "seat": 2}]
+        )
+
+    def test_best_seats_count_required(self):
+        response = self.client.get(best_seats_url(self.movie_session.id))
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("count", response.data)
+
+    def test_no_adjacent_seats_left(self):
+        response = self.client.get(
+            best_seats_url(self.movie_session.id), {"count": 7}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("count", response.data)
+
+    def test_book_best_seats(self):
+        url = best_seats_url(self.movie_session.id)
+
+        first = self.client.post(url, {"count": 3})
+        second = self.client.post(url, {"count": 3})
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [(ticket["row"], ticket["seat"]) for ticket in first.data["tickets"]],
+            [(1, 2), (1, 3), (1, 4)],
+        )
+        self.assertEqual(
+            [(ticket["row"], ticket["seat"]) for ticket in second.data["tickets"]],
+            [(3, 2), (3, 3), (3, 4)],
+        )
+        self.assertEqual(
+            Ticket.objects.filter(order__id=second.data["id"]).count(), 3
+        )
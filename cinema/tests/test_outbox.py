@@ -0,0 +1,221 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from cinema import outbox
+from cinema.models import (
+    CinemaHall,
+    Movie,
+    MovieSession,
+    OutboxCheckpoint,
+    OutboxEvent,
+)
+from cinema.throttling import get_throttle_store
+
+ORDER_URL = reverse("cinema:order-list")
+MOVIE_SESSION_URL = reverse("cinema:moviesession-list")
+
+delivered = []
+
+
+def collect(events):
+    delivered.append([event.topic for event in events])
+
+
+def fail(events):
+    raise RuntimeError("consumer is down")
+
+
+CONSUMERS = {
+    "all": {"handler": "cinema.tests.test_outbox.collect"},
+    "orders": {
+        "handler": "cinema.tests.test_outbox.collect",
+        "topics": ["order.created"],
+    },
+}
+
+
+class OutboxWriteTest(TestCase):
+    def setUp(self) -> None:
+        get_throttle_store().clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "admin@test.com", "password", is_staff=True
+        )
+        self.client.force_authenticate(self.user)
+        self.hall = CinemaHall.objects.create(
+            name="Blue", rows=10, seats_in_row=10
+        )
+        self.movie = Movie.objects.create(
+            title="Sample movie", description="Description", duration=90
+        )
+        self.movie_session = MovieSession.objects.create(
+            show_time="2030-01-01T10:00:00Z",
+            movie=self.movie,
+            cinema_hall=self.hall,
+        )
+
+    def order(self, *places):
+        return self.client.post(
+            ORDER_URL,
+            {
+                "tickets": [
+                    {
+                        "row": row,
+                        "seat": seat,
+                        "movie_session": self.movie_session.id,
+                    }
+                    for row, seat in places
+                ]
+            },
+            format="json",
+        )
+
+    def test_one_event_per_order(self):
+        response = self.order((1, 1), (1, 2), (1, 3))
+
+        event = OutboxEvent.objects.get()
+        self.assertEqual(event.topic, "order.created")
+        self.assertEqual(event.payload["order"], response.data["id"])
+        tickets = event.payload["tickets"]
+        self.assertEqual(
+            [(ticket["row"], ticket["seat"]) for ticket in tickets],
+            [(1, 1), (1, 2), (1, 3)],
+        )
+
+    def test_failed_writes_leave_no_events(self):
+        self.order((1, 1))
+        response = self.order((2, 1), (1, 1))
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(OutboxEvent.objects.count(), 1)
+
+    def test_schedule_changes(self):
+        response = self.client.post(
+            MOVIE_SESSION_URL,
+            {
+                "show_time": "2030-01-02T10:00:00Z",
+                "movie": self.movie.id,
+                "cinema_hall": self.hall.id,
+            },
+        )
+        self.client.post(
+            reverse("cinema:moviesession-bulk"),
+            {
+                "sessions": [
+                    {
+                        "show_time": f"2030-01-0{day}T10:00:00Z",
+                        "movie": self.movie.id,
+                        "cinema_hall": self.hall.id,
+                    }
+                    for day in (3, 4)
+                ]
+            },
+            format="json",
+        )
+        self.client.delete(
+            reverse("cinema:moviesession-detail", args=[response.data["id"]])
+        )
+
+        created, bulk, deleted = OutboxEvent.objects.all()
+        self.assertEqual(created.topic, "movie_session.created")
+        self.assertEqual(len(bulk.payload["movie_sessions"]), 2)
+        self.assertEqual(deleted.topic, "movie_session.deleted")
+        self.assertEqual(
+            deleted.payload["movie_sessions"][0]["id"], response.data["id"]
+        )
+
+
+@override_settings(OUTBOX_CONSUMERS=CONSUMERS)
+class OutboxDeliveryTest(TestCase):
+    def setUp(self) -> None:
+        delivered.clear()
+        for topic in ("order.created", "movie.created", "order.created"):
+            outbox.record(topic, {})
+
+    def test_batches_in_order_with_checkpoints(self):
+        self.assertEqual(outbox.deliver("all", collect, batch_size=2), 2)
+        self.assertEqual(outbox.deliver("all", collect, batch_size=2), 1)
+        self.assertEqual(outbox.deliver("all", collect, batch_size=2), 0)
+
+        self.assertEqual(
+            delivered,
+            [["order.created", "movie.created"], ["order.created"]],
+        )
+        self.assertEqual(
+            OutboxCheckpoint.objects.get(consumer="all").last_event_id,
+            OutboxEvent.objects.last().id,
+        )
+
+    def test_topics(self):
+        outbox.deliver("orders", collect, ["order.created"])
+
+        self.assertEqual(delivered, [["order.created", "order.created"]])
+
+    def test_failed_batches_are_delivered_again(self):
+        with self.assertRaises(RuntimeError):
+            outbox.deliver("all", fail)
+        self.assertFalse(OutboxCheckpoint.objects.exists())
+
+        outbox.deliver("all", collect)
+        self.assertEqual(len(delivered[0]), 3)
+
+    def test_events_committed_late_are_delivered(self):
+        # the middle event's transaction hasn't committed yet
+        _, late, last = OutboxEvent.objects.all()
+        late_id = late.id
+        late.delete()
+
+        self.assertEqual(outbox.deliver("all", collect), 2)
+        OutboxEvent.objects.create(
+            id=late_id, topic="movie.updated", payload={}
+        )
+        self.assertEqual(outbox.deliver("all", collect), 1)
+        self.assertEqual(outbox.deliver("all", collect), 0)
+
+        self.assertEqual(
+            delivered,
+            [["order.created", "order.created"], ["movie.updated"]],
+        )
+        checkpoint = OutboxCheckpoint.objects.get(consumer="all")
+        self.assertEqual(checkpoint.last_event_id, last.id)
+        self.assertEqual(checkpoint.gaps, {})
+
+    def test_gaps_are_given_up_on(self):
+        OutboxEvent.objects.all()[1].delete()
+        outbox.deliver("all", collect)
+
+        with self.settings(OUTBOX_GAP_TIMEOUT_SECONDS=0):
+            self.assertEqual(outbox.deliver("all", collect), 0)
+
+        self.assertEqual(
+            OutboxCheckpoint.objects.get(consumer="all").gaps, {}
+        )
+
+    def test_dispatcher_delivers_and_prunes(self):
+        OutboxEvent.objects.update(
+            created_at=timezone.now() - timedelta(days=2)
+        )
+        out, err = StringIO(), StringIO()
+        with self.settings(
+            OUTBOX_CONSUMERS={
+                **CONSUMERS,
+                "broken": {"handler": "cinema.tests.test_outbox.fail"},
+            }
+        ):
+            call_command("dispatch_outbox", "--once", stdout=out, stderr=err)
+
+        self.assertEqual(len(delivered), 2)
+        self.assertIn("consumer broken failed", err.getvalue())
+        # the broken consumer still needs them
+        self.assertEqual(OutboxEvent.objects.count(), 3)
+
+        call_command("dispatch_outbox", "--once", stdout=out)
+        self.assertEqual(OutboxEvent.objects.count(), 0)
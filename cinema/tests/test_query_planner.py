@@ -0,0 +1,189 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Count
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import serializers, status
+from rest_framework.test import APIClient
+
+from cinema.models import (
+    Actor,
+    CinemaHall,
+    Genre,
+    Movie,
+    MovieSession,
+    Order,
+    Ticket,
+)
+from cinema.query_planner import QueryPlan
+from cinema.serializers import (
+    MovieSerializer,
+    MovieSessionDetailSerializer,
+    OrderListSerializer,
+)
+from cinema.throttling import get_throttle_store
+
+
+def plan(serializer, queryset):
+    return QueryPlan.for_serializer(queryset, serializer)
+
+
+class QueryPlanTest(TestCase):
+    def test_nested_serializers(self):
+        session_plan = plan(
+            MovieSessionDetailSerializer(), MovieSession.objects.all()
+        )
+
+        self.assertEqual(
+            list(session_plan.select_related()), ["movie", "cinema_hall"]
+        )
+        self.assertEqual(
+            [prefetch.prefetch_to for prefetch in session_plan.prefetches()],
+            ["tickets", "movie__genres", "movie__actors"],
+        )
+        self.assertEqual(
+            set(session_plan.only()),
+            {
+                "id",
+                "show_time",
+                "movie",
+                "cinema_hall",
+                "movie__id",
+                "movie__title",
+                "movie__image",
+                "cinema_hall__id",
+                "cinema_hall__name",
+                "cinema_hall__rows",
+                "cinema_hall__seats_in_row",
+            },
+        )
+        self.assertEqual(
+            session_plan.prefetched["tickets"].columns,
+            {"id", "row", "seat", "movie_session"},
+        )
+        self.assertEqual(
+            session_plan.joined["movie"].prefetched["actors"].columns,
+            {"id", "first_name", "last_name"},
+        )
+
+    def test_declared_reads_of_properties(self):
+        order_plan = plan(OrderListSerializer(), Order.objects.all())
+
+        self.assertEqual(
+            set(order_plan.prefetched), {"tickets", "archived_tickets"}
+        )
+        for tickets in order_plan.prefetched.values():
+            self.assertEqual(
+                list(tickets.select_related()),
+                [
+                    "movie_session",
+                    "movie_session__movie",
+                    "movie_session__cinema_hall",
+                ],
+            )
+            self.assertIn("order", tickets.columns)
+
+    def test_primary_keys(self):
+        movie_plan = plan(MovieSerializer(), Movie.objects.all())
+
+        self.assertFalse(movie_plan.joined)
+        self.assertEqual(movie_plan.prefetched["genres"].columns, {"id"})
+
+    def test_undeclared_reads_load_whole_objects(self):
+        class ActorNameSerializer(serializers.ModelSerializer):
+            name = serializers.SerializerMethodField()
+
+            class Meta:
+                model = Actor
+                fields = ("name",)
+
+            def get_name(self, obj):
+                return str(obj)
+
+        actor_plan = plan(ActorNameSerializer(), Actor.objects.all())
+
+        self.assertTrue(actor_plan.whole)
+        self.assertEqual(
+            set(actor_plan.only()), {"id", "first_name", "last_name"}
+        )
+
+    def test_annotations_are_not_columns(self):
+        class AnnotatedSerializer(serializers.ModelSerializer):
+            tickets_count = serializers.IntegerField()
+
+            class Meta:
+                model = MovieSession
+                fields = ("id", "tickets_count")
+
+        session_plan = plan(
+            AnnotatedSerializer(),
+            MovieSession.objects.annotate(tickets_count=Count("tickets")),
+        )
+
+        self.assertEqual(session_plan.columns, {"id"})
+
+
+class PlannedQueriesTest(TestCase):
+    def setUp(self) -> None:
+        get_throttle_store().clear()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "password"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        hall = CinemaHall.objects.create(name="Blue", rows=10, seats_in_row=10)
+        genre = Genre.objects.create(name="Drama")
+        actor = Actor.objects.create(first_name="George", last_name="Clooney")
+        movie = Movie.objects.create(
+            title="Sample movie", description="Description", duration=90
+        )
+        movie.genres.add(genre)
+        movie.actors.add(actor)
+        self.movie_session = MovieSession.objects.create(
+            show_time="2030-01-01T10:00:00Z", movie=movie, cinema_hall=hall
+        )
+
+        for seat in range(1, 4):
+            order = Order.objects.create(user=self.user)
+            Ticket.objects.create(
+                order=order,
+                movie_session=self.movie_session,
+                row=1,
+                seat=seat,
+            )
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, [
+            query["sql"] for query in queries if "cinema_" in query["sql"]
+        ]
+
+    def test_movie_session_detail(self):
+        response, queries = self.get(
+            reverse(
+                "cinema:moviesession-detail", args=[self.movie_session.id]
+            )
+        )
+
+        self.assertEqual(response.data["movie"]["genres"], ["Drama"])
+        self.assertEqual(len(response.data["taken_places"]), 3)
+        # session with movie and hall, tickets, genres, actors
+        self.assertEqual(len(queries), 4)
+        self.assertNotIn("description", queries[0])
+
+    def test_order_list_does_not_grow_with_tickets(self):
+        response, queries = self.get(reverse("cinema:order-list"))
+
+        self.assertEqual(response.data["count"], 3)
+        self.assertEqual(
+            response.data["results"][0]["tickets"][0]["movie_session"][
+                "movie_title"
+            ],
+            "Sample movie",
+        )
+        # count, orders, tickets and archived tickets with their sessions
+        self.assertEqual(len(queries), 4)
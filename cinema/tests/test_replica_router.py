@@ -0,0 +1,90 @@
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.core.cache import cache
+
+from cinema.models import Movie, Order
+from cinema_api.db.routers import (
+    ReadYourWritesMiddleware,
+    ReplicaRouter,
+    use_primary,
+)
+from user.models import User
+
+REPLICAS = {"replica_a": 2, "replica_b": 1}
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS)
+class ReplicaRouterTest(SimpleTestCase):
+    def setUp(self) -> None:
+        self.router = ReplicaRouter()
+
+    def test_weighted_round_robin(self):
+        aliases = [self.router.db_for_read(Movie) for _ in range(6)]
+
+        self.assertEqual(aliases.count("replica_a"), 4)
+        self.assertEqual(aliases.count("replica_b"), 2)
+        self.assertNotEqual(aliases[:3], ["replica_a", "replica_a", "replica_b"])
+
+    def test_writes_go_to_primary(self):
+        self.assertEqual(self.router.db_for_write(Order), "default")
+
+    def test_other_apps_read_from_primary(self):
+        self.assertIsNone(self.router.db_for_read(User))
+
+    def test_pinned_reads_go_to_primary(self):
+        token = use_primary.set(True)
+        try:
+            self.assertEqual(self.router.db_for_read(Order), "default")
+        finally:
+            use_primary.reset(token)
+
+    def test_related_reads_follow_instance(self):
+        movie = Movie()
+        movie._state.db = "default"
+
+        self.assertEqual(
+            self.router.db_for_read(Movie, instance=movie), "default"
+        )
+
+    @override_settings(DATABASE_REPLICAS={})
+    def test_no_replicas(self):
+        self.assertIsNone(self.router.db_for_read(Movie))
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS, REPLICA_PIN_SECONDS=60)
+class ReadYourWritesMiddlewareTest(SimpleTestCase):
+    def setUp(self) -> None:
+        self.factory = RequestFactory()
+        self.seen = []
+        self.status = 201
+        self.middleware = ReadYourWritesMiddleware(self.get_response)
+        cache.clear()
+
+    def get_response(self, request):
+        self.seen.append(use_primary.get())
+        return HttpResponse(status=self.status)
+
+    def test_reads_use_replicas(self):
+        self.middleware(self.factory.get("/api/cinema/orders/"))
+
+        self.assertEqual(self.seen, [False])
+
+    def test_reads_after_write_are_pinned(self):
+        headers = {"HTTP_AUTHORIZATION": "Bearer a"}
+        self.middleware(self.factory.post("/api/cinema/orders/", **headers))
+        self.middleware(self.factory.get("/api/cinema/orders/", **headers))
+        self.middleware(
+            self.factory.get(
+                "/api/cinema/orders/", HTTP_AUTHORIZATION="Bearer b"
+            )
+        )
+
+        self.assertEqual(self.seen, [True, True, False])
+        self.assertFalse(use_primary.get())
+
+    def test_failed_write_does_not_pin(self):
+        self.status = 400
+        self.middleware(self.factory.post("/api/cinema/orders/"))
+        self.middleware(self.factory.get("/api/cinema/orders/"))
+
+        self.assertEqual(self.seen, [True, False])
@@ -0,0 +1,226 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from cinema.models import (
+    CinemaHall,
+    HallDayOccupancy,
+    Movie,
+    MovieDaySales,
+    MovieSession,
+    Order,
+    SessionOccupancy,
+    Ticket,
+)
+from cinema.throttling import get_throttle_store
+
+MOVIE_URL = reverse("cinema:movie-list")
+MOVIE_SESSION_URL = reverse("cinema:moviesession-list")
+ORDER_URL = reverse("cinema:order-list")
+SESSION_REPORT_URL = reverse("cinema:session-report-list")
+MOVIE_REPORT_URL = reverse("cinema:movie-report-list")
+HALL_REPORT_URL = reverse("cinema:hall-report-list")
+
+
+class RollupsTest(TestCase):
+    def setUp(self) -> None:
+        get_throttle_store().clear()
+        self.client = APIClient()
+        self.admin = get_user_model().objects.create_user(
+            "admin@test.com", "password", is_staff=True
+        )
+        self.client.force_authenticate(self.admin)
+        self.hall = CinemaHall.objects.create(
+            name="Blue", rows=10, seats_in_row=10
+        )
+        self.movie = Movie.objects.create(
+            title="Movie", description="Movie", duration=90
+        )
+
+    def create_session(self, show_time):
+        response = self.client.post(
+            MOVIE_SESSION_URL,
+            {
+                "show_time": show_time,
+                "movie": self.movie.id,
+                "cinema_hall": self.hall.id,
+            },
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data["id"]
+
+    def buy(self, movie_session_id, *places):
+        response = self.client.post(
+            ORDER_URL,
+            {
+                "tickets": [
+                    {"row": row, "seat": seat, "movie_session": movie_session_id}
+                    for row, seat in places
+                ]
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_rollups_follow_sales(self):
+        first = self.create_session("2030-01-07 10:00:00")
+        second = self.create_session("2030-01-07 14:00:00")
+        self.buy(first, (1, 1), (1, 2))
+        self.buy(second, (5, 5))
+
+        self.assertEqual(SessionOccupancy.objects.get(pk=first).tickets_sold, 2)
+        day_sales = MovieDaySales.objects.get(movie=self.movie)
+        self.assertEqual(
+            (day_sales.sessions, day_sales.tickets_sold, day_sales.capacity),
+            (2, 3, 200),
+        )
+        self.assertEqual(
+            HallDayOccupancy.objects.get(cinema_hall=self.hall).tickets_sold, 3
+        )
+
+    def test_schedule_changes_move_rollups(self):
+        movie_session = self.create_session("2030-01-07 10:00:00")
+        self.buy(movie_session, (1, 1))
+
+        self.client.patch(
+            reverse("cinema:moviesession-detail", args=[movie_session]),
+            {"show_time": "2030-01-08 10:00:00"},
+        )
+        self.assertEqual(
+            list(MovieDaySales.objects.values_list("day", "tickets_sold")),
+            [(MovieSession.objects.get().show_time.date(), 1)],
+        )
+
+        self.client.delete(
+            reverse("cinema:moviesession-detail", args=[movie_session])
+        )
+        self.assertFalse(MovieDaySales.objects.exists())
+        self.assertFalse(HallDayOccupancy.objects.exists())
+
+    def test_rebuild_matches_incremental(self):
+        movie_session = MovieSession.objects.create(
+            show_time="2030-01-07 10:00:00",
+            movie=self.movie,
+            cinema_hall=self.hall,
+        )
+        order = Order.objects.create(user=self.admin)
+        for seat in range(1, 5):
+            Ticket.objects.create(
+                movie_session=movie_session, order=order, row=1, seat=seat
+            )
+        self.assertFalse(SessionOccupancy.objects.exists())
+
+        call_command("rebuild_rollups", stdout=StringIO())
+
+        self.assertEqual(
+            SessionOccupancy.objects.get(pk=movie_session.pk).tickets_sold, 4
+        )
+        self.assertEqual(MovieDaySales.objects.get().tickets_sold, 4)
+
+        # sessions created outside the API are picked up on the next sale
+        MovieDaySales.objects.all().delete()
+        self.buy(movie_session.id, (2, 1))
+        self.assertEqual(MovieDaySales.objects.get().tickets_sold, 5)
+
+    def test_longest_free_run_follows_sales(self):
+        movie_session = self.create_session("2030-01-07 10:00:00")
+        occupancy = SessionOccupancy.objects.get(pk=movie_session)
+        self.assertEqual(occupancy.longest_free_run, 10)
+
+        self.buy(movie_session, *[(row, 5) for row in range(1, 11)])
+        occupancy.refresh_from_db()
+        self.assertEqual(occupancy.longest_free_run, 5)
+
+        occupancy.delete()
+        call_command("rebuild_rollups", stdout=StringIO())
+        self.assertEqual(
+            SessionOccupancy.objects.get(pk=movie_session).longest_free_run, 5
+        )
+
+    def test_search_sessions_with_room_for_group(self):
+        crowded = self.create_session("2030-01-07 10:00:00")
+        quiet = self.create_session("2030-01-07 14:00:00")
+        self.buy(crowded, *[(row, 5) for row in range(1, 11)])
+        self.buy(quiet, (1, 1))
+
+        for params in ({"adjacent_seats": 6}, {"free_seats": 95}):
+            response = self.client.get(
+                MOVIE_SESSION_URL, {"date": "2030-01-07", **params}
+            )
+            self.assertEqual(
+                [movie_session["id"] for movie_session in response.data],
+                [quiet],
+            )
+
+        response = self.client.get(MOVIE_SESSION_URL, {"adjacent_seats": 5})
+        self.assertEqual(len(response.data), 2)
+
+    def test_search_sessions_without_rollup(self):
+        movie_session = self.create_session("2030-01-07 10:00:00")
+        sold = self.create_session("2030-01-07 14:00:00")
+        self.buy(sold, (1, 1), (1, 2))
+        SessionOccupancy.objects.all().delete()
+
+        def found(params):
+            response = self.client.get(MOVIE_SESSION_URL, params)
+            return [movie_session["id"] for movie_session in response.data]
+
+        self.assertEqual(found({"adjacent_seats": 10}), [movie_session])
+        self.assertEqual(found({"adjacent_seats": 11}), [])
+        self.assertEqual(found({"free_seats": 100}), [movie_session])
+        self.assertCountEqual(found({"free_seats": 98}), [movie_session, sold])
+
+    def test_next_sessions_without_rollup(self):
+        self.hall.rows = 1
+        self.hall.save()
+        movie_session = self.create_session("2030-01-07 10:00:00")
+        sold = self.create_session("2030-01-07 14:00:00")
+        sold_out = self.create_session("2030-01-07 18:00:00")
+        self.buy(sold, (1, 1), (1, 2))
+        self.buy(sold_out, *((1, seat) for seat in range(1, 11)))
+        SessionOccupancy.objects.all().delete()
+
+        response = self.client.get(MOVIE_URL, {"with_sessions": 3})
+
+        self.assertEqual(
+            [
+                (session["id"], session["tickets_available"])
+                for session in response.data[0]["next_sessions"]
+            ],
+            [(movie_session, 10), (sold, 8)],
+        )
+
+    def test_reports_read_rollups_only(self):
+        movie_session = self.create_session("2030-01-07 10:00:00")
+        self.buy(movie_session, (1, 1))
+
+        for url in (SESSION_REPORT_URL, MOVIE_REPORT_URL, HALL_REPORT_URL):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(
+                    url, {"date_from": "2030-01-07", "date_to": "2030-01-07"}
+                )
+
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data["count"], 1)
+            self.assertEqual(response.data["results"][0]["occupancy"], 0.01)
+            self.assertFalse(
+                any("cinema_ticket" in query["sql"] for query in queries)
+            )
+
+        response = self.client.get(MOVIE_REPORT_URL, {"date_from": "2030-01-08"})
+        self.assertEqual(response.data["count"], 0)
+
+    def test_reports_admin_only(self):
+        self.client.force_authenticate(
+            get_user_model().objects.create_user("user@test.com", "password")
+        )
+
+        response = self.client.get(MOVIE_REPORT_URL)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta, timezone
+
+from django.test import SimpleTestCase
+
+from cinema.scheduling import HallSchedule
+
+
+def at(hour, minute=0):
+    return datetime(2030, 1, 7, hour, minute, tzinfo=timezone.utc)
+
+
+class HallScheduleTest(SimpleTestCase):
+    def setUp(self) -> None:
+        self.schedule = HallSchedule()
+        self.schedule.add(at(10), at(12), "long")
+        self.schedule.add(at(14), at(15), "short")
+        self.schedule.add(at(16), at(17), "late")
+
+    def test_overlapping(self):
+        self.assertEqual(self.schedule.overlapping(at(11), at(11, 30)), ["long"])
+        self.assertEqual(
+            self.schedule.overlapping(at(11, 59), at(14, 1)), ["long", "short"]
+        )
+
+    def test_back_to_back_does_not_overlap(self):
+        self.assertEqual(self.schedule.overlapping(at(12), at(14)), [])
+        self.assertEqual(self.schedule.overlapping(at(15), at(16)), [])
+
+    def test_free_slots(self):
+        self.assertEqual(
+            self.schedule.free_slots(at(9), at(18)),
+            [
+                (at(9), at(10)),
+                (at(12), at(14)),
+                (at(15), at(16)),
+                (at(17), at(18)),
+            ],
+        )
+
+    def test_free_slots_min_length(self):
+        self.assertEqual(
+            self.schedule.free_slots(at(11), at(17), timedelta(hours=2)),
+            [(at(12), at(14))],
+        )
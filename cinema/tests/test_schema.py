@@ -0,0 +1,116 @@
+import gzip
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+
+from cinema_api.schema import compress, write_artifacts
+
+SCHEMA_URL = reverse("schema")
+
+schema_dir = tempfile.TemporaryDirectory()
+
+
+@override_settings(SCHEMA_ARTIFACT_DIR=Path(schema_dir.name))
+class PrecomputedSchemaTest(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command("build_schema", stdout=StringIO())
+
+    @classmethod
+    def tearDownClass(cls):
+        schema_dir.cleanup()
+        super().tearDownClass()
+
+    def test_build_is_skipped_when_code_unchanged(self):
+        out = StringIO()
+        call_command("build_schema", stdout=out)
+
+        self.assertIn("up to date", out.getvalue())
+
+    def test_schema_served_with_cache_headers(self):
+        response = self.client.get(SCHEMA_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(b"/api/cinema/movies/", response.content)
+        self.assertIn("max-age", response["Cache-Control"])
+        self.assertTrue(response["ETag"])
+
+    def test_schema_not_modified(self):
+        etag = self.client.get(SCHEMA_URL)["ETag"]
+
+        response = self.client.get(SCHEMA_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_schema_gzip(self):
+        response = self.client.get(
+            SCHEMA_URL, {"format": "json"}, HTTP_ACCEPT_ENCODING="gzip"
+        )
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        schema = json.loads(gzip.decompress(response.content))
+        self.assertIn("/api/cinema/movies/", schema["paths"])
+
+    def test_jwt_security_scheme_documented(self):
+        response = self.client.get(SCHEMA_URL, {"format": "json"})
+        schema = response.json()
+
+        self.assertIn("jwtAuth", schema["components"]["securitySchemes"])
+        self.assertIn(
+            {"jwtAuth": []},
+            schema["paths"]["/api/cinema/movies/"]["get"]["security"],
+        )
+
+    def test_list_filters_documented(self):
+        response = self.client.get(SCHEMA_URL, {"format": "json"})
+
+        parameters = response.json()["paths"]["/api/cinema/movies/"]["get"][
+            "parameters"
+        ]
+        self.assertEqual(
+            {parameter["name"] for parameter in parameters},
+            {"actors", "genres", "title", "with_sessions", "fields", "omit"},
+        )
+
+    def test_missing_schema_is_generated(self):
+        with tempfile.TemporaryDirectory() as empty_dir:
+            with override_settings(SCHEMA_ARTIFACT_DIR=Path(empty_dir)):
+                response = self.client.get(SCHEMA_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(b"/api/cinema/movies/", response.content)
+
+    def test_stale_schema_is_generated_in_debug(self):
+        with tempfile.TemporaryDirectory() as stale_dir:
+            write_artifacts(stale_dir, compress({"yaml": b"stale"}, "old"))
+            with override_settings(
+                SCHEMA_ARTIFACT_DIR=Path(stale_dir), DEBUG=True
+            ):
+                response = self.client.get(SCHEMA_URL)
+
+        self.assertIn(b"/api/cinema/movies/", response.content)
+
+    def test_stale_schema_is_an_error(self):
+        with tempfile.TemporaryDirectory() as stale_dir:
+            write_artifacts(stale_dir, compress({"yaml": b"stale"}, "old"))
+            with override_settings(
+                SCHEMA_ARTIFACT_DIR=Path(stale_dir)
+            ), mock.patch(
+                "cinema_api.schema.source_fingerprint", return_value="new"
+            ) as fingerprint:
+                for _ in range(2):
+                    with self.assertRaisesMessage(
+                        ImproperlyConfigured, "build_schema"
+                    ):
+                        self.client.get(SCHEMA_URL)
+
+        fingerprint.assert_called_once()
@@ -0,0 +1,43 @@
+from django.test import SimpleTestCase
+
+from cinema.seating import SeatGrid
+
+
+class SeatGridTest(SimpleTestCase):
+    def test_free_runs(self):
+        grid = SeatGrid(2, 8, taken=[(1, 3), (1, 4), (1, 8)])
+
+        self.assertEqual(grid.free_runs(1), [(1, 2), (5, 3)])
+        self.assertEqual(grid.free_runs(2), [(1, 8)])
+
+    def test_empty_hall_gives_middle_of_middle_row(self):
+        grid = SeatGrid(5, 10)
+
+        self.assertEqual(
+            grid.best_seats(4), [(3, 4), (3, 5), (3, 6), (3, 7)]
+        )
+
+    def test_block_is_kept_inside_the_free_run(self):
+        grid = SeatGrid(1, 10, taken=[(1, 5), (1, 6)])
+
+        self.assertEqual(grid.best_seats(3), [(1, 2), (1, 3), (1, 4)])
+
+    def test_falls_back_to_rows_further_from_the_middle(self):
+        grid = SeatGrid(5, 4, taken=[(row, 2) for row in (2, 3, 4)])
+
+        self.assertEqual(grid.best_seats(2), [(3, 3), (3, 4)])
+        self.assertEqual(grid.best_seats(3), [(1, 1), (1, 2), (1, 3)])
+
+    def test_no_block_left(self):
+        grid = SeatGrid(2, 4, taken=[(1, 2), (2, 3)])
+
+        self.assertIsNone(grid.best_seats(3))
+        self.assertIsNone(grid.best_seats(5))
+        self.assertEqual(grid.best_seats(2), [(1, 3), (1, 4)])
+
+    def test_seats_outside_the_hall_are_ignored(self):
+        # sold before the hall was made smaller
+        grid = SeatGrid(2, 4, taken=[(1, 1), (3, 1), (1, 5)])
+
+        self.assertEqual(grid.free_runs(1), [(2, 3)])
+        self.assertEqual(grid.longest_free_run(), 4)
@@ -0,0 +1,347 @@
+import copy
+import json
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connections
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from cinema.idempotency import REPLAYED_HEADER
+from cinema.models import (
+    CinemaHall,
+    IdempotencyKey,
+    Movie,
+    MovieSession,
+    Order,
+    ShardPlacement,
+    Ticket,
+)
+from cinema.sharding import copy_group, plan_moves
+from cinema.throttling import get_throttle_store
+from cinema_api.db.routers import ShardRouter
+from cinema_api.db.sharding import seed_id_ranges, using_shard
+
+SHARDS = ["default", "shard_1", "shard_2"]
+
+# shard databases next to the default one, created by the test runner
+for alias in SHARDS[1:]:
+    default = copy.deepcopy(connections.settings["default"])
+    settings.DATABASES[alias] = connections.settings[alias] = {
+        **default,
+        "TEST": {**default["TEST"], "NAME": None},
+    }
+
+MOVIE_SESSION_URL = reverse("cinema:moviesession-list")
+ORDER_URL = reverse("cinema:order-list")
+
+
+def session_url(session_id):
+    return reverse("cinema:moviesession-detail", args=[session_id])
+
+
+@override_settings(
+    DATABASE_SHARDS=SHARDS,
+    SHARD_HALLS_PER_GROUP=1,
+    SHARD_MOVE_GRACE_SECONDS=0,
+)
+class ShardingTest(TestCase):
+    databases = set(SHARDS)
+
+    @classmethod
+    def setUpTestData(cls):
+        for alias in SHARDS:
+            seed_id_ranges(using=alias)
+
+    def setUp(self) -> None:
+        get_throttle_store().clear()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "password"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.admin = get_user_model().objects.create_superuser(
+            "admin@test.com", "password"
+        )
+        self.admin_client = APIClient()
+        self.admin_client.force_authenticate(self.admin)
+
+        self.movie = Movie.objects.create(
+            title="Sample movie", description="Description", duration=90
+        )
+        self.halls = [
+            CinemaHall.objects.create(name=name, rows=10, seats_in_row=10)
+            for name in ("Blue", "Green", "Red")
+        ]
+
+    def schedule(self, hall, show_time="2030-01-01T20:00:00Z"):
+        response = self.admin_client.post(
+            MOVIE_SESSION_URL,
+            {
+                "show_time": show_time,
+                "movie": self.movie.id,
+                "cinema_hall": hall.id,
+            },
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data["id"]
+
+    def order(self, *session_ids, row=1, **extra):
+        return self.client.post(
+            ORDER_URL,
+            {
+                "tickets": [
+                    {"row": row, "seat": seat, "movie_session": session_id}
+                    for seat, session_id in enumerate(session_ids, start=1)
+                ]
+            },
+            format="json",
+            **extra,
+        )
+
+    def test_catalog_is_copied_to_every_shard(self):
+        hall = self.halls[0]
+        hall.name = "Renamed"
+        hall.save()
+        self.halls[1].delete()
+
+        for alias in SHARDS[1:]:
+            self.assertEqual(
+                CinemaHall.objects.using(alias).get(pk=hall.pk).name,
+                "Renamed",
+            )
+            self.assertFalse(
+                CinemaHall.objects.using(alias)
+                .filter(pk=self.halls[1].pk)
+                .exists()
+            )
+            self.assertTrue(
+                Movie.objects.using(alias).filter(pk=self.movie.pk).exists()
+            )
+
+    def test_bulk_load_copies_the_catalog(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".ndjson") as ndjson:
+            ndjson.write(
+                json.dumps(
+                    {
+                        "model": "cinema.cinemahall",
+                        "pk": 100,
+                        "fields": {"name": "Loaded", "rows": 5, "seats_in_row": 5},
+                    }
+                )
+            )
+            ndjson.flush()
+            call_command("bulk_load", ndjson.name, stdout=StringIO())
+
+        for alias in SHARDS[1:]:
+            self.assertTrue(
+                CinemaHall.objects.using(alias).filter(pk=100).exists()
+            )
+
+    def test_sessions_are_spread_by_hall_group(self):
+        session_ids = [self.schedule(hall) for hall in self.halls]
+
+        for alias, session_id in zip(SHARDS, session_ids):
+            self.assertEqual(
+                list(
+                    MovieSession.objects.using(alias).values_list(
+                        "id", flat=True
+                    )
+                ),
+                [session_id],
+            )
+            self.assertGreaterEqual(
+                session_id, SHARDS.index(alias) << settings.SHARD_ID_BITS
+            )
+        self.assertEqual(ShardPlacement.objects.count(), 3)
+
+    def test_reads_find_the_shard(self):
+        self.schedule(self.halls[0])
+        self.schedule(self.halls[1])
+        session_id = self.schedule(self.halls[2], "2030-01-02T20:00:00Z")
+
+        response = self.client.get(session_url(session_id))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["cinema_hall"]["name"], "Red")
+        self.assertEqual(
+            self.client.get(MOVIE_SESSION_URL).data[0]["id"], session_id
+        )
+
+    def test_orders_go_to_their_sessions_shard(self):
+        self.schedule(self.halls[0])
+        session_id = self.schedule(self.halls[1])
+
+        response = self.order(session_id, session_id)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            Ticket.objects.using("shard_1").filter(
+                order_id=response.data["id"]
+            ).count(),
+            2,
+        )
+        self.assertFalse(Order.objects.using("default").exists())
+
+    def test_idempotency_keys_live_with_their_orders(self):
+        self.schedule(self.halls[0])
+        session_id = self.schedule(self.halls[1])
+
+        response = self.order(session_id, HTTP_IDEMPOTENCY_KEY="first")
+        retry = self.order(session_id, HTTP_IDEMPOTENCY_KEY="first")
+
+        self.assertEqual(retry.data["id"], response.data["id"])
+        self.assertEqual(retry[REPLAYED_HEADER], "true")
+        self.assertEqual(Order.objects.using("shard_1").count(), 1)
+        self.assertTrue(
+            IdempotencyKey.objects.using("shard_1")
+            .filter(key="first")
+            .exists()
+        )
+        self.assertFalse(IdempotencyKey.objects.using("default").exists())
+
+    def test_orders_of_several_cinemas_are_refused(self):
+        session_ids = [self.schedule(hall) for hall in self.halls[:2]]
+
+        response = self.order(*session_ids)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("tickets", response.data)
+
+    def test_order_list_merges_the_shards(self):
+        session_ids = [self.schedule(hall) for hall in self.halls]
+        order_ids = [
+            self.order(session_id).data["id"] for session_id in session_ids
+        ]
+
+        response = self.client.get(ORDER_URL, {"page_size": 2})
+
+        self.assertEqual(response.data["count"], 3)
+        self.assertEqual(
+            [order["id"] for order in response.data["results"]],
+            order_ids[:0:-1],
+        )
+        response = self.client.get(ORDER_URL, {"page_size": 2, "page": 2})
+        self.assertEqual(
+            [order["id"] for order in response.data["results"]],
+            order_ids[:1],
+        )
+
+    def test_writes_wait_for_moving_groups(self):
+        session_id = self.schedule(self.halls[0])
+        ShardPlacement.objects.update(moving=True)
+
+        response = self.order(session_id)
+
+        self.assertEqual(
+            response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+
+    def test_plan_moves(self):
+        sizes = {"default": {1: 5, 2: 3, 3: 1}, "shard_1": {}, "shard_2": {}}
+
+        self.assertEqual(
+            plan_moves(sizes),
+            [(1, "default", "shard_1", 5), (2, "default", "shard_2", 3)],
+        )
+
+    def test_rebalance_moves_groups_with_their_orders(self):
+        blue, green = self.halls[:2]
+        ShardPlacement.objects.create(group=blue.id, shard="default")
+        ShardPlacement.objects.create(group=green.id, shard="default")
+        session_ids = [
+            self.schedule(blue, f"2030-01-0{day}T20:00:00Z")
+            for day in (1, 2)
+        ]
+        self.schedule(green)
+        order = self.order(session_ids[0], HTTP_IDEMPOTENCY_KEY="key").data
+        out = StringIO()
+
+        call_command("rebalance_shards", stdout=out)
+
+        self.assertIn("1 groups moved", out.getvalue())
+        self.assertEqual(
+            ShardPlacement.objects.get(group=blue.id).shard, "shard_1"
+        )
+        with using_shard("shard_1"):
+            self.assertEqual(
+                sorted(
+                    MovieSession.objects.values_list("id", flat=True)
+                ),
+                session_ids,
+            )
+            moved = Order.objects.get()
+            self.assertEqual(moved.id, order["id"])
+            self.assertEqual(
+                moved.created_at.isoformat().replace("+00:00", "Z"),
+                order["created_at"],
+            )
+            self.assertEqual(moved.tickets.count(), 1)
+            self.assertEqual(IdempotencyKey.objects.get().key, "key")
+        self.assertEqual(MovieSession.objects.using("default").count(), 1)
+        self.assertFalse(Order.objects.using("default").exists())
+        self.assertFalse(IdempotencyKey.objects.using("default").exists())
+        self.assertEqual(
+            self.client.get(ORDER_URL).data["results"][0]["id"], order["id"]
+        )
+
+    def test_rebalance_keeps_groups_written_while_copied(self):
+        blue, green = self.halls[:2]
+        ShardPlacement.objects.create(group=blue.id, shard="default")
+        ShardPlacement.objects.create(group=green.id, shard="default")
+        session_ids = [
+            self.schedule(blue, f"2030-01-0{day}T20:00:00Z")
+            for day in (1, 2)
+        ]
+        self.schedule(green)
+        self.order(session_ids[0])
+
+        def copy_and_write(group, source, target):
+            order_ids = copy_group(group, source, target)
+            # an order that passed the moving check before the move
+            with using_shard(source):
+                order = Order.objects.create(user=self.user)
+                Ticket.objects.create(
+                    order=order,
+                    movie_session_id=session_ids[1],
+                    row=2,
+                    seat=2,
+                )
+            return order_ids
+
+        out, err = StringIO(), StringIO()
+        with mock.patch("cinema.sharding.copy_group", copy_and_write):
+            call_command("rebalance_shards", stdout=out, stderr=err)
+
+        self.assertIn("0 groups moved", out.getvalue())
+        self.assertIn(
+            f"Group {blue.id} was written on default", err.getvalue()
+        )
+        placement = ShardPlacement.objects.get(group=blue.id)
+        self.assertEqual(placement.shard, "default")
+        self.assertFalse(placement.moving)
+        self.assertEqual(Ticket.objects.using("default").count(), 2)
+        self.assertFalse(MovieSession.objects.using("shard_1").exists())
+        self.assertFalse(Order.objects.using("shard_1").exists())
+
+    def test_router(self):
+        router = ShardRouter()
+        order = Order()
+        order._state.db = "shard_2"
+
+        with using_shard("shard_1"):
+            self.assertEqual(router.db_for_write(Ticket), "shard_1")
+            self.assertEqual(
+                router.db_for_read(Ticket, instance=order), "shard_2"
+            )
+        self.assertEqual(
+            router.db_for_read(get_user_model(), instance=order), "default"
+        )
+        self.assertIsNone(router.db_for_read(Ticket))
+        self.assertIsNone(router.db_for_read(CinemaHall))
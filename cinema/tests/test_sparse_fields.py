@@ -0,0 +1,113 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from cinema.models import Actor, CinemaHall, Genre, Movie, MovieSession
+from cinema.throttling import get_throttle_store
+
+MOVIE_URL = reverse("cinema:movie-list")
+MOVIE_SESSION_URL = reverse("cinema:moviesession-list")
+ACTOR_URL = reverse("cinema:actor-list")
+
+
+class SparseFieldsTest(TestCase):
+    def setUp(self) -> None:
+        get_throttle_store().clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com", "password"
+        )
+        self.client.force_authenticate(self.user)
+
+        hall = CinemaHall.objects.create(name="Blue", rows=10, seats_in_row=10)
+        genre = Genre.objects.create(name="Drama")
+        actor = Actor.objects.create(first_name="George", last_name="Clooney")
+        for number in range(3):
+            movie = Movie.objects.create(
+                title=f"Movie {number}",
+                description="Long description",
+                duration=90,
+            )
+            movie.genres.add(genre)
+            movie.actors.add(actor)
+            MovieSession.objects.create(
+                show_time=f"2030-01-0{number + 1}T10:00:00Z",
+                movie=movie,
+                cinema_hall=hall,
+            )
+
+    def get(self, url, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, [
+            query["sql"] for query in queries
+            if "cinema_" in query["sql"]
+        ]
+
+    def test_fields_trim_output_and_prefetches(self):
+        response, queries = self.get(MOVIE_URL, {"fields": "id,title"})
+
+        self.assertEqual(
+            [set(movie) for movie in response.data], [{"id", "title"}] * 3
+        )
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn("description", queries[0])
+        self.assertNotIn("image", queries[0])
+
+    def test_unrequested_columns_are_not_loaded(self):
+        response, queries = self.get(MOVIE_URL)
+
+        self.assertEqual(response.data[0]["genres"], ["Drama"])
+        self.assertEqual(response.data[0]["actors"], ["George Clooney"])
+        self.assertEqual(len(queries), 3)
+        self.assertNotIn("description", queries[0])
+
+    def test_omit(self):
+        response, queries = self.get(MOVIE_URL, {"omit": "genres,actors"})
+
+        self.assertEqual(set(response.data[0]), {"id", "title", "image"})
+        self.assertEqual(len(queries), 1)
+
+    def test_omitted_relations_are_not_joined(self):
+        response, queries = self.get(
+            MOVIE_SESSION_URL, {"fields": "id,show_time"}
+        )
+
+        self.assertEqual(set(response.data[0]), {"id", "show_time"})
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn("JOIN", queries[0])
+
+    def test_all_fields_by_default(self):
+        response, queries = self.get(MOVIE_SESSION_URL)
+
+        self.assertEqual(response.data[0]["movie_title"], "Movie 2")
+        self.assertEqual(response.data[0]["cinema_hall_capacity"], 100)
+        self.assertEqual(response.data[0]["tickets_available"], 100)
+        self.assertEqual(len(queries), 1)
+
+    def test_properties_keep_their_columns(self):
+        response, queries = self.get(ACTOR_URL, {"fields": "full_name"})
+
+        self.assertEqual(response.data, [{"full_name": "George Clooney"}])
+        self.assertEqual(len(queries), 1)
+
+    def test_writes_ignore_fields(self):
+        response = self.client.post(
+            f"{reverse('cinema:genre-list')}?fields=id",
+            {"name": "Comedy"},
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.post(
+            f"{reverse('cinema:genre-list')}?fields=id",
+            {"name": "Comedy"},
+        )
+        self.assertEqual(response.data["name"], "Comedy")
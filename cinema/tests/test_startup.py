@@ -0,0 +1,30 @@
+from django.test import SimpleTestCase
+from django.urls import resolve, reverse
+
+from cinema_api.startup import parse_import_times, warm_up
+
+
+class StartupTest(SimpleTestCase):
+    def test_warm_up_imports_lazy_views(self):
+        view = resolve(reverse("swagger-ui")).func
+        view.load.cache_clear()
+
+        warm_up()
+
+        self.assertEqual(view.load.cache_info().currsize, 1)
+
+    def test_parse_import_times(self):
+        lines = [
+            "import time: self [us] | cumulative | imported package",
+            "import time:       120 |        120 |   cinema.reads",
+            "import time:      1500 |       2000 | cinema.models",
+            "unrelated output",
+        ]
+
+        self.assertEqual(
+            parse_import_times(lines),
+            {
+                "cinema.reads": (0.00012, 0.00012),
+                "cinema.models": (0.0015, 0.002),
+            },
+        )
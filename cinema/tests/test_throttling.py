@@ -0,0 +1,134 @@
+import fcntl
+import os
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from cinema.throttling import (
+    ScopedGCRAThrottle,
+    SharedMemoryStore,
+    get_throttle_store,
+)
+
+ORDER_URL = reverse("cinema:order-list")
+GENRE_URL = reverse("cinema:genre-list")
+
+THROTTLE_RATES = {"anon": None, "user": None, "catalog": None, "orders": "2/min"}
+
+
+class SharedMemoryStoreTest(SimpleTestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.NamedTemporaryFile()
+        self.store = SharedMemoryStore(path=self.tmp.name, slots=16)
+
+    def tearDown(self) -> None:
+        self.tmp.close()
+
+    def test_burst_then_wait(self):
+        self.assertEqual(self.store.hit("a", 10, 3, now=100), 0)
+        self.assertEqual(self.store.hit("a", 10, 3, now=100), 0)
+        self.assertEqual(self.store.hit("a", 10, 3, now=100), 0)
+        self.assertEqual(self.store.hit("a", 10, 3, now=100), 10)
+        self.assertEqual(self.store.hit("a", 10, 3, now=110), 0)
+
+    def test_keys_are_independent(self):
+        self.store.hit("a", 10, 1, now=100)
+
+        self.assertGreater(self.store.hit("a", 10, 1, now=100), 0)
+        self.assertEqual(self.store.hit("b", 10, 1, now=100), 0)
+
+    def test_state_is_shared_between_instances(self):
+        other = SharedMemoryStore(path=self.tmp.name, slots=16)
+
+        self.store.hit("a", 10, 1, now=100)
+
+        self.assertGreater(other.hit("a", 10, 1, now=100), 0)
+
+    def test_memory_is_fixed_when_keys_exceed_slots(self):
+        for i in range(100):
+            self.assertEqual(self.store.hit(f"key{i}", 10, 1, now=100), 0)
+
+        self.assertEqual(len(self.store._map), 16 * self.store.slot.size)
+
+    def test_clear(self):
+        self.store.hit("a", 10, 1, now=100)
+        self.store.clear()
+
+        self.assertEqual(self.store.hit("a", 10, 1, now=100), 0)
+
+    def test_forked_workers_exclude_each_other(self):
+        fcntl.flock(self.store._fd, fcntl.LOCK_EX)
+        try:
+            pid = os.fork()
+            if pid == 0:
+                self.store._reopen_after_fork()
+                try:
+                    fcntl.flock(self.store._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    os._exit(0)
+                os._exit(1)
+            _, status_code = os.waitpid(pid, 0)
+        finally:
+            fcntl.flock(self.store._fd, fcntl.LOCK_UN)
+
+        self.assertEqual(os.waitstatus_to_exitcode(status_code), 0)
+
+    def test_default_path_depends_on_database(self):
+        path = SharedMemoryStore.default_path()
+
+        with override_settings(
+            DATABASES={"default": {"NAME": "other.sqlite3"}}
+        ):
+            self.assertNotEqual(SharedMemoryStore.default_path(), path)
+
+
+@mock.patch.object(ScopedGCRAThrottle, "THROTTLE_RATES", THROTTLE_RATES)
+class ScopedThrottleApiTest(TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.NamedTemporaryFile()
+        settings_override = override_settings(
+            THROTTLE_STORE={
+                "BACKEND": "cinema.throttling.SharedMemoryStore",
+                "OPTIONS": {"path": self.tmp.name, "slots": 64},
+            }
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(self.tmp.close)
+
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            "test@test.com",
+            "test_password"
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_store_follows_settings(self):
+        self.assertEqual(get_throttle_store().path, self.tmp.name)
+
+    def test_order_create_throttled(self):
+        for _ in range(2):
+            response = self.client.post(ORDER_URL, {}, format="json")
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST
+            )
+
+        response = self.client.post(ORDER_URL, {}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_order_list_not_in_orders_scope(self):
+        for _ in range(3):
+            response = self.client.get(ORDER_URL)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_catalog_reads_unaffected(self):
+        for _ in range(3):
+            self.client.post(ORDER_URL, {}, format="json")
+
+        response = self.client.get(GENRE_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -0,0 +1,269 @@
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from rest_framework.throttling import (
+    AnonRateThrottle,
+    ScopedRateThrottle,
+    SimpleRateThrottle,
+    UserRateThrottle,
+)
+
+
+class SharedMemoryStore:
+    """
+    Fixed-size GCRA state table kept in a memory-mapped file.
+
+    Each slot holds an 8-byte key hash and the key's theoretical arrival
+    time (TAT), so memory use does not depend on the request rate.
+    The file lives on tmpfs (``/dev/shm``) where available and is shared
+    by the worker processes of one deployment: unless ``path`` is given,
+    its name is derived from the settings module, the project directory
+    and the default database. Updates are serialised with ``flock`` across
+    processes and a mutex across threads; the file is reopened in forked
+    workers, as ``flock`` locks belong to the open file, which a fork
+    shares.
+    """
+
+    slot = struct.Struct("<Qd")
+
+    def __init__(self, path=None, slots=65536, probes=8):
+        self.path = str(path or self.default_path())
+        self.slots = slots
+        self.probes = min(probes, slots)
+        self._lock = threading.Lock()
+        self._open()
+
+    @staticmethod
+    def default_path():
+        """
+        A file of this deployment only, so state never leaks between
+        projects, settings modules or test runs on the same host
+        """
+        directory = (
+            "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+        )
+        deployment = "\0".join(
+            [
+                settings.SETTINGS_MODULE or "",
+                str(settings.BASE_DIR),
+                str(settings.DATABASES["default"]["NAME"]),
+            ]
+        )
+        digest = hashlib.blake2b(deployment.encode(), digest_size=8)
+        return os.path.join(
+            directory, f"cinema_api_throttle_{digest.hexdigest()}"
+        )
+
+    def _open(self):
+        size = self.slots * self.slot.size
+        self._pid = os.getpid()
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+        self._map = mmap.mmap(self._fd, size)
+
+    def _reopen_after_fork(self):
+        # A forked worker shares the parent's open file, and with it the
+        # parent's flock, so the workers would not exclude each other.
+        if self._pid != os.getpid():
+            self._map.close()
+            os.close(self._fd)
+            self._open()
+
+    @staticmethod
+    def _hash(key):
+        digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+        # Zero marks an empty slot, so never hand it out as a key hash.
+        return int.from_bytes(digest, "little") or 1
+
+    def _find_slot(self, key_hash, now):
+        """Return (offset, stored TAT or None) for the key's slot"""
+        start = key_hash % self.slots
+        free_offset = None
+        oldest_offset, oldest_tat = None, None
+
+        for probe in range(self.probes):
+            offset = ((start + probe) % self.slots) * self.slot.size
+            slot_hash, tat = self.slot.unpack_from(self._map, offset)
+
+            if slot_hash == key_hash:
+                return offset, tat
+
+            if free_offset is None and (slot_hash == 0 or tat <= now):
+                free_offset = offset
+
+            if oldest_tat is None or tat < oldest_tat:
+                oldest_offset, oldest_tat = offset, tat
+
+        # An expired TAT carries no state, so reusing it is lossless;
+        # otherwise evict the entry closest to expiring.
+        if free_offset is None:
+            free_offset = oldest_offset
+
+        return free_offset, None
+
+    def hit(self, key, interval, burst, now):
+        """
+        Record one request for ``key`` and return the seconds to wait
+        before it would be allowed, or 0 if it is allowed now.
+        """
+        key_hash = self._hash(key)
+
+        with self._lock:
+            self._reopen_after_fork()
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                offset, tat = self._find_slot(key_hash, now)
+                new_tat = max(tat or now, now) + interval
+                allow_at = new_tat - burst * interval
+
+                if now < allow_at:
+                    return allow_at - now
+
+                self.slot.pack_into(self._map, offset, key_hash, new_tat)
+                return 0
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def clear(self):
+        with self._lock:
+            self._reopen_after_fork()
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                self._map[:] = bytes(len(self._map))
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+
+class RedisStore:
+    """
+    GCRA state kept in Redis (or any server speaking its protocol),
+    updated atomically by a server-side Lua script.
+    """
+
+    script = """
+    local now = tonumber(ARGV[1])
+    local interval = tonumber(ARGV[2])
+    local burst = tonumber(ARGV[3])
+    local tat = tonumber(redis.call("GET", KEYS[1])) or now
+    if tat < now then
+        tat = now
+    end
+    local new_tat = tat + interval
+    local allow_at = new_tat - burst * interval
+    if now < allow_at then
+        return tostring(allow_at - now)
+    end
+    local ttl = math.ceil((new_tat - now) * 1000)
+    redis.call("SET", KEYS[1], tostring(new_tat), "PX", ttl)
+    return "0"
+    """
+
+    def __init__(self, url="redis://localhost:6379/0", prefix="gcra:"):
+        try:
+            import redis
+        except ImportError as exc:
+            raise ImproperlyConfigured(
+                "RedisStore requires the 'redis' package to be installed."
+            ) from exc
+
+        self.prefix = prefix
+        self.client = redis.Redis.from_url(url)
+        self._hit = self.client.register_script(self.script)
+
+    def hit(self, key, interval, burst, now):
+        return float(
+            self._hit(keys=[self.prefix + key], args=[now, interval, burst])
+        )
+
+    def clear(self):
+        for key in self.client.scan_iter(match=self.prefix + "*"):
+            self.client.delete(key)
+
+
+@lru_cache(maxsize=None)
+def get_throttle_store():
+    """Build the store configured in ``settings.THROTTLE_STORE``"""
+    config = getattr(settings, "THROTTLE_STORE", {})
+    backend = config.get("BACKEND", "cinema.throttling.SharedMemoryStore")
+    return import_string(backend)(**config.get("OPTIONS", {}))
+
+
+@receiver(setting_changed)
+def reset_throttle_store(*, setting, **kwargs):
+    if setting == "THROTTLE_STORE":
+        get_throttle_store.cache_clear()
+
+
+class GCRAThrottle(SimpleRateThrottle):
+    """
+    Rate throttle using the generic cell rate algorithm.
+
+    Instead of a list of request timestamps, only a single theoretical
+    arrival time is kept per client, so every check is O(1) regardless
+    of the rate. A rate of ``N/period`` allows bursts of N requests and
+    refills one request every ``period / N`` seconds.
+    """
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.wait_time = get_throttle_store().hit(
+            self.key,
+            self.duration / self.num_requests,
+            self.num_requests,
+            self.timer(),
+        )
+        return not self.wait_time
+
+    def wait(self):
+        return self.wait_time
+
+
+class AnonGCRAThrottle(GCRAThrottle, AnonRateThrottle):
+    pass
+
+
+class UserGCRAThrottle(GCRAThrottle, UserRateThrottle):
+    pass
+
+
+class ScopedGCRAThrottle(GCRAThrottle, ScopedRateThrottle):
+    """
+    Scoped throttle that also allows a scope per viewset action,
+    e.g. ``throttle_scopes = {"create": "orders"}``, falling back
+    to the view's ``throttle_scope``.
+    """
+
+    def get_scope(self, view):
+        scopes = getattr(view, "throttle_scopes", {})
+        return scopes.get(
+            getattr(view, "action", None),
+            getattr(view, self.scope_attr, None),
+        )
+
+    def allow_request(self, request, view):
+        self.scope = self.get_scope(view)
+        if not self.scope:
+            return True
+
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+
+        return super().allow_request(request, view)
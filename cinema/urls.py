@@ -1,3 +1,5 @@
+from django.conf import settings
+from django.urls import path
 from rest_framework import routers
 
 from cinema.views import (
@@ -7,6 +9,10 @@ from cinema.views import (
     MovieViewSet,
     MovieSessionViewSet,
     OrderViewSet,
+    BookingViewSet,
+    SessionOccupancyReportViewSet,
+    MovieDaySalesReportViewSet,
+    HallDayOccupancyReportViewSet,
 )
 
 router = routers.DefaultRouter()
@@ -16,7 +22,61 @@ router.register("actors", ActorViewSet)
 router.register("movies", MovieViewSet)
 router.register("movie_sessions", MovieSessionViewSet)
 router.register("orders", OrderViewSet)
+router.register("bookings", BookingViewSet)
+router.register(
+    "reports/sessions",
+    SessionOccupancyReportViewSet,
+    basename="session-report",
+)
+router.register(
+    "reports/movies", MovieDaySalesReportViewSet, basename="movie-report"
+)
+router.register(
+    "reports/halls", HallDayOccupancyReportViewSet, basename="hall-report"
+)
 
 urlpatterns = router.urls
 
+# the async views don't pick a shard
+if settings.ASYNC_READ_VIEWS and len(settings.DATABASE_SHARDS) == 1:
+    from cinema.async_views import as_async_view
+
+    urlpatterns = [
+        path(
+            "movies/",
+            as_async_view(MovieViewSet, {"get": "list", "post": "create"}),
+            name="movie-list",
+        ),
+        path(
+            "movies/<int:pk>/",
+            as_async_view(MovieViewSet, {"get": "retrieve"}),
+            name="movie-detail",
+        ),
+        path(
+            "movie_sessions/",
+            as_async_view(
+                MovieSessionViewSet, {"get": "list", "post": "create"}
+            ),
+            name="moviesession-list",
+        ),
+        path(
+            "movie_sessions/<int:pk>/",
+            as_async_view(
+                MovieSessionViewSet,
+                {
+                    "get": "retrieve",
+                    "put": "update",
+                    "patch": "partial_update",
+                    "delete": "destroy",
+                },
+            ),
+            name="moviesession-detail",
+        ),
+        path(
+            "movie_sessions/<int:pk>/seat-map/",
+            as_async_view(MovieSessionViewSet, {"get": "seat_map"}),
+            name="moviesession-seat-map",
+        ),
+    ] + urlpatterns
+
 app_name = "cinema"
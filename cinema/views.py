@@ -1,15 +1,21 @@
-from datetime import datetime
+from datetime import datetime, time, timedelta
 
-from django.db.models import F, Count
-from drf_spectacular.types import OpenApiTypes
-from drf_spectacular.utils import OpenApiParameter, extend_schema
+from django.db import IntegrityError, router, transaction
+from django.db.models import F, Count, Prefetch
+from django.utils import timezone
 from rest_framework import mixins, viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.pagination import PageNumberPagination
-from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework.permissions import (
+    SAFE_METHODS,
+    IsAuthenticated,
+    IsAdminUser,
+)
 from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 
+from cinema import outbox, rollups
 from cinema.models import (
     CinemaHall,
     Genre,
@@ -17,25 +23,64 @@ from cinema.models import (
     Movie,
     MovieSession,
     Order,
+    BookingRequest,
+    SessionOccupancy,
+    MovieDaySales,
+    HallDayOccupancy,
+)
+from cinema.booking import (
+    QueuedBookingMixin,
+    queued_places,
+    queued_response,
+    submit,
 )
+from cinema.idempotency import IdempotentCreateMixin
 from cinema.permissions import IsAdminOrIfAuthenticatedReadOnly
+from cinema.query_planner import QueryPlannerMixin
+from cinema.scheduling import ScheduleIndex
+from cinema.seating import SeatGrid
+from cinema.sharding import (
+    ShardedViewMixin,
+    as_ids,
+    shard_for_hall,
+    shard_for_halls,
+    shard_for_session,
+    shard_for_tickets,
+)
+from cinema.sparse_fields import SparseFieldsMixin
 from cinema.serializers import (
+    BestSeatsQuerySerializer,
+    SeatSerializer,
     CinemaHallSerializer,
+    CinemaHallFreeSlotsQuerySerializer,
+    FreeSlotSerializer,
     GenreSerializer,
     ActorSerializer,
     MovieSerializer,
     MovieListSerializer,
     MovieDetailSerializer,
+    MovieListWithSessionsSerializer,
+    MovieDetailWithSessionsSerializer,
+    NextSessionsQuerySerializer,
     MovieImageSerializer,
     MovieSessionSerializer,
     MovieSessionListSerializer,
     MovieSessionDetailSerializer,
+    MovieSessionSeatMapSerializer,
+    MovieSessionBulkSerializer,
     OrderSerializer,
     OrderListSerializer,
+    BookingRequestSerializer,
+    SessionOccupancySerializer,
+    MovieDaySalesSerializer,
+    HallDayOccupancySerializer,
 )
+from cinema_api.db.sharding import using_shard
 
 
 class CinemaHallViewSet(
+    SparseFieldsMixin,
+    QueryPlannerMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     GenericViewSet,
@@ -43,9 +88,44 @@ class CinemaHallViewSet(
     queryset = CinemaHall.objects.all()
     serializer_class = CinemaHallSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    throttle_scope = "catalog"
+
+    def get_serializer_class(self):
+        if self.action == "free_slots":
+            return FreeSlotSerializer
+
+        return CinemaHallSerializer
+
+    @action(methods=["GET"], detail=True, url_path="free-slots")
+    def free_slots(self, request, pk=None):
+        """Endpoint for the gaps between sessions in a hall on one day"""
+        cinema_hall = self.get_object()
+        query = CinemaHallFreeSlotsQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+
+        day = query.validated_data["date"]
+        start = timezone.make_aware(datetime.combine(day, time.min))
+        end = timezone.make_aware(
+            datetime.combine(day + timedelta(days=1), time.min)
+        )
+        with using_shard(shard_for_hall(cinema_hall.id)):
+            schedule = ScheduleIndex.load([cinema_hall.id], start, end)
+        slots = schedule[cinema_hall.id].free_slots(
+            start,
+            end,
+            timedelta(minutes=query.validated_data["min_duration"]),
+        )
+
+        serializer = self.get_serializer(
+            [{"start": slot[0], "end": slot[1]} for slot in slots],
+            many=True,
+        )
+        return Response(serializer.data, status=status.HTTP_200_OK)
 
 
 class GenreViewSet(
+    SparseFieldsMixin,
+    QueryPlannerMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     GenericViewSet,
@@ -53,9 +133,12 @@ class GenreViewSet(
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    throttle_scope = "catalog"
 
 
 class ActorViewSet(
+    SparseFieldsMixin,
+    QueryPlannerMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     GenericViewSet,
@@ -63,17 +146,21 @@ class ActorViewSet(
     queryset = Actor.objects.all()
     serializer_class = ActorSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    throttle_scope = "catalog"
 
 
 class MovieViewSet(
+    SparseFieldsMixin,
+    QueryPlannerMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     mixins.RetrieveModelMixin,
     viewsets.GenericViewSet,
 ):
-    queryset = Movie.objects.prefetch_related("genres", "actors")
+    queryset = Movie.objects.all()
     serializer_class = MovieSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    throttle_scope = "catalog"
 
     @staticmethod
     def _params_to_ints(qs):
@@ -101,11 +188,58 @@ class MovieViewSet(
 
         return queryset.distinct()
 
+    @staticmethod
+    def upcoming_sessions(count):
+        """
+        The next ``count`` sessions with seats left of each movie: as a
+        sliced prefetch, Django numbers the sessions of all the movies
+        with ``ROW_NUMBER() OVER (PARTITION BY movie_id ORDER BY
+        show_time)`` and keeps the first ``count`` in one query.
+        """
+        return (
+            MovieSession.objects.filter(show_time__gt=timezone.now())
+            .select_related("cinema_hall")
+            .annotate(tickets_available=rollups.seats_left())
+            .filter(tickets_available__gt=0)
+            .order_by("show_time", "id")[:count]
+        )
+
+    def sessions_per_movie(self):
+        """``?with_sessions=``, None when not asked for"""
+        if self.action not in ("list", "retrieve"):
+            return None
+
+        query = NextSessionsQuerySerializer(data=self.request.query_params)
+        query.is_valid(raise_exception=True)
+        if not self.field_is_selected("next_sessions"):
+            return None
+        return query.validated_data.get("with_sessions")
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        count = self.sessions_per_movie()
+        if count:
+            # after the planned prefetches, which would replace it
+            queryset = queryset.prefetch_related(
+                Prefetch(
+                    "moviesession_set",
+                    queryset=self.upcoming_sessions(count),
+                    to_attr="next_sessions",
+                )
+            )
+
+        return queryset
+
     def get_serializer_class(self):
+        with_sessions = self.sessions_per_movie()
         if self.action == "list":
+            if with_sessions:
+                return MovieListWithSessionsSerializer
             return MovieListSerializer
 
         if self.action == "retrieve":
+            if with_sessions:
+                return MovieDetailWithSessionsSerializer
             return MovieDetailSerializer
 
         if self.action == "upload_image":
@@ -130,46 +264,26 @@ class MovieViewSet(
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-    @extend_schema(
-        parameters=[
-            OpenApiParameter(
-                "genres",
-                type={"type": "list", "items": {"type": "number"}},
-                description="Filter by genre id (ex. ?genres=2,5)",
-            ),
-            OpenApiParameter(
-                "actors",
-                type={"type": "list", "items": {"type": "number"}},
-                description="Filter by actor id (ex. ?actors=2,5)",
-            ),
-            OpenApiParameter(
-                "title",
-                type=OpenApiTypes.STR,
-                description="Filter by movie title (ex. ?title=fiction)",
-            ),
-        ]
-    )
-    def list(self, request, *args, **kwargs):
-        return super().list(request, *args, **kwargs)
-
-
-class MovieSessionViewSet(viewsets.ModelViewSet):
-    queryset = (
-        MovieSession.objects
-        .select_related("movie", "cinema_hall")
-        .annotate(
-            tickets_available=(
-                    F("cinema_hall__rows") * F("cinema_hall__seats_in_row")
-                    - Count("tickets")
-            )
-        )
-    )
+
+class MovieSessionViewSet(
+    ShardedViewMixin,
+    SparseFieldsMixin,
+    QueryPlannerMixin,
+    viewsets.ModelViewSet,
+):
+    # the best-seats actions read the hall; planned actions replace this
+    queryset = MovieSession.objects.select_related("cinema_hall")
     serializer_class = MovieSessionSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    throttle_scope = "catalog"
+    throttle_scopes = {"book_best_seats": "orders"}
+    sparse_actions = planned_actions = ("list", "retrieve", "seat_map")
 
     def get_queryset(self):
         date = self.request.query_params.get("date")
         movie_id_str = self.request.query_params.get("movie")
+        free_seats = self.request.query_params.get("free_seats")
+        adjacent_seats = self.request.query_params.get("adjacent_seats")
 
         queryset = self.queryset
 
@@ -180,8 +294,59 @@ class MovieSessionViewSet(viewsets.ModelViewSet):
         if movie_id_str:
             queryset = queryset.filter(movie_id=int(movie_id_str))
 
+        # answered from the occupancy rollups; only sessions without one
+        # yet read their tickets
+        if free_seats:
+            queryset = queryset.alias(
+                seats_left=rollups.seats_left()
+            ).filter(seats_left__gte=int(free_seats))
+
+        if adjacent_seats:
+            queryset = queryset.alias(
+                free_run=rollups.longest_free_run()
+            ).filter(free_run__gte=int(adjacent_seats))
+
+        if self.action == "list" and self.field_is_selected(
+            "tickets_available"
+        ):
+            # aggregating drops Meta.ordering, so it is repeated here
+            queryset = queryset.annotate(
+                tickets_available=(
+                        F("cinema_hall__rows") * F("cinema_hall__seats_in_row")
+                        - Count("tickets")
+                )
+            ).order_by(*MovieSession._meta.ordering)
+
         return queryset
 
+    def get_shard(self):
+        data = self.request.data if isinstance(self.request.data, dict) else {}
+        if self.action == "create":
+            return shard_for_halls(as_ids([data.get("cinema_hall")]))
+
+        if self.action == "bulk":
+            items = [
+                *data.get("sessions", []),
+                *data.get("recurrences", []),
+            ]
+            return shard_for_halls(
+                as_ids(
+                    item.get("cinema_hall")
+                    for item in items
+                    if isinstance(item, dict)
+                )
+            )
+
+        pk = self.get_object_id()
+        if pk is None:
+            return None
+
+        return shard_for_session(
+            pk,
+            writing=self.request.method not in SAFE_METHODS,
+            cinema_hall=data.get("cinema_hall"),
+        )
+
     def get_serializer_class(self):
         if self.action == "list":
             return MovieSessionListSerializer
@@ -189,27 +354,133 @@ class MovieSessionViewSet(viewsets.ModelViewSet):
         if self.action == "retrieve":
             return MovieSessionDetailSerializer
 
+        if self.action == "seat_map":
+            return MovieSessionSeatMapSerializer
+
+        if self.action == "bulk":
+            return MovieSessionBulkSerializer
+
+        if self.action == "best_seats":
+            return SeatSerializer
+
+        if self.action == "book_best_seats":
+            return OrderSerializer
+
         return MovieSessionSerializer
 
-    @extend_schema(
-        parameters=[
-            OpenApiParameter(
-                "movie",
-                type=OpenApiTypes.INT,
-                description="Filter by movie id (ex. ?movie=2)",
-            ),
-            OpenApiParameter(
-                "date",
-                type=OpenApiTypes.DATE,
-                description=(
-                        "Filter by datetime of MovieSession "
-                        "(ex. ?date=2022-10-23)"
-                ),
-            ),
-        ]
+    def perform_destroy(self, instance):
+        with transaction.atomic(using=router.db_for_write(MovieSession)):
+            keys = rollups.session_keys([instance])
+            outbox.record_sessions("deleted", [instance])
+            instance.delete()
+            rollups.refresh(*keys)
+
+    @action(methods=["GET"], detail=True, url_path="seat-map")
+    def seat_map(self, request, pk=None):
+        """Endpoint for the hall size and taken places of a session"""
+        serializer = self.get_serializer(self.get_object())
+
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @staticmethod
+    def find_best_seats(movie_session, data):
+        query = BestSeatsQuerySerializer(data=data)
+        query.is_valid(raise_exception=True)
+        count = query.validated_data["count"]
+
+        grid = SeatGrid.load(movie_session)
+        if movie_session.queued_booking:
+            # seats queued for are likely to be booked before these
+            grid.take_all(queued_places(movie_session))
+        seats = grid.best_seats(count)
+        if seats is None:
+            raise ValidationError(
+                {"count": [f"There are no {count} adjacent free seats."]}
+            )
+
+        return seats
+
+    @action(
+        methods=["GET"],
+        detail=True,
+        url_path="best-seats",
+        permission_classes=(IsAuthenticated,),
     )
-    def list(self, request, *args, **kwargs):
-        return super().list(request, *args, **kwargs)
+    def best_seats(self, request, pk=None):
+        """Endpoint for the best block of adjacent free seats"""
+        seats = self.find_best_seats(self.get_object(), request.query_params)
+        serializer = self.get_serializer(
+            [{"row": row, "seat": seat} for row, seat in seats], many=True
+        )
+
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @best_seats.mapping.post
+    def book_best_seats(self, request, pk=None):
+        """Endpoint for ordering the best block of adjacent free seats"""
+        movie_session = self.get_object()
+
+        if movie_session.queued_booking:
+            # the session's committer books them with the rest of its queue
+            seats = self.find_best_seats(movie_session, request.data)
+            booking_request = submit(
+                request.user,
+                movie_session,
+                [{"row": row, "seat": seat} for row, seat in seats],
+            )
+            return queued_response(request, booking_request)
+
+        try:
+            with transaction.atomic(using=router.db_for_write(Order)):
+                # bookings of best seats for the session queue up here
+                MovieSession.objects.select_for_update().get(
+                    pk=movie_session.pk
+                )
+                seats = self.find_best_seats(movie_session, request.data)
+                serializer = self.get_serializer(
+                    data={
+                        "tickets": [
+                            {
+                                "movie_session": movie_session.pk,
+                                "row": row,
+                                "seat": seat,
+                            }
+                            for row, seat in seats
+                        ]
+                    }
+                )
+                serializer.is_valid(raise_exception=True)
+                serializer.save(user=request.user)
+        except IntegrityError:
+            # an order placed seat by seat took one of them meanwhile
+            raise ValidationError(
+                {"count": ["The seats have just been taken, try again."]}
+            )
+
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(methods=["POST"], detail=False, url_path="bulk")
+    def bulk(self, request):
+        """Endpoint for scheduling many sessions in one request"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        # checks the overlaps under the halls' locks
+        movie_sessions = serializer.save()
+        errors = serializer.validated_data["errors"]
+
+        if errors and serializer.validated_data["atomic"]:
+            return Response(
+                {"created": [], "errors": errors},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        return Response(
+            {
+                "created": [session.id for session in movie_sessions],
+                "errors": errors,
+            },
+            status=status.HTTP_201_CREATED,
+        )
 
 
 class OrderPagination(PageNumberPagination):
@@ -219,19 +490,30 @@ class OrderPagination(PageNumberPagination):
 
 
 class OrderViewSet(
+    ShardedViewMixin,
+    SparseFieldsMixin,
+    QueryPlannerMixin,
+    IdempotentCreateMixin,
+    QueuedBookingMixin,
     mixins.ListModelMixin,
     mixins.CreateModelMixin,
     GenericViewSet,
 ):
-    queryset = Order.objects.prefetch_related(
-        "tickets__movie_session__movie", "tickets__movie_session__cinema_hall"
-    )
+    queryset = Order.objects.all()
     serializer_class = OrderSerializer
     pagination_class = OrderPagination
     permission_classes = (IsAuthenticated,)
+    throttle_scopes = {"create": "orders"}
 
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user)
+        return self.queryset.filter(user=self.request.user)
+
+    def get_shard(self):
+        if self.action != "create":
+            return super().get_shard()
+
+        data = self.request.data if isinstance(self.request.data, dict) else {}
+        return shard_for_tickets(data.get("tickets"))
 
     def get_serializer_class(self):
         if self.action == "list":
@@ -241,3 +523,85 @@ class OrderViewSet(
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
+
+
+class BookingViewSet(
+    ShardedViewMixin,
+    SparseFieldsMixin,
+    QueryPlannerMixin,
+    mixins.ListModelMixin,
+    mixins.RetrieveModelMixin,
+    GenericViewSet,
+):
+    """Receipts of orders queued for a hot session (see cinema.booking)"""
+
+    queryset = BookingRequest.objects.all()
+    serializer_class = BookingRequestSerializer
+    pagination_class = OrderPagination
+    permission_classes = (IsAuthenticated,)
+
+    def get_queryset(self):
+        return self.queryset.filter(user=self.request.user)
+
+
+class ReportPagination(PageNumberPagination):
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+
+
+class ReportViewSet(
+    ShardedViewMixin,
+    SparseFieldsMixin,
+    QueryPlannerMixin,
+    mixins.ListModelMixin,
+    GenericViewSet,
+):
+    """Admin-only reports, read from the rollup tables only"""
+
+    permission_classes = (IsAdminUser,)
+    pagination_class = ReportPagination
+    day_field = "day"
+    filter_fields = {}
+
+    def get_queryset(self):
+        queryset = self.queryset
+        date_from = self.request.query_params.get("date_from")
+        date_to = self.request.query_params.get("date_to")
+
+        if date_from:
+            date_from = datetime.strptime(date_from, "%Y-%m-%d").date()
+            queryset = queryset.filter(**{f"{self.day_field}__gte": date_from})
+
+        if date_to:
+            date_to = datetime.strptime(date_to, "%Y-%m-%d").date()
+            queryset = queryset.filter(**{f"{self.day_field}__lte": date_to})
+
+        for param, field in self.filter_fields.items():
+            value = self.request.query_params.get(param)
+            if value:
+                queryset = queryset.filter(**{field: int(value)})
+
+        return queryset
+
+
+class SessionOccupancyReportViewSet(ReportViewSet):
+    queryset = SessionOccupancy.objects.order_by("movie_session__show_time")
+    serializer_class = SessionOccupancySerializer
+    day_field = "movie_session__show_time__date"
+    filter_fields = {
+        "movie": "movie_session__movie_id",
+        "cinema_hall": "movie_session__cinema_hall_id",
+    }
+
+
+class MovieDaySalesReportViewSet(ReportViewSet):
+    queryset = MovieDaySales.objects.all()
+    serializer_class = MovieDaySalesSerializer
+    filter_fields = {"movie": "movie_id"}
+
+
+class HallDayOccupancyReportViewSet(ReportViewSet):
+    queryset = HallDayOccupancy.objects.all()
+    serializer_class = HallDayOccupancySerializer
+    filter_fields = {"cinema_hall": "cinema_hall_id"}
@@ -0,0 +1,221 @@
+"""
+Several API calls in one round trip.
+
+``POST /api/batch/`` takes::
+
+    {
+        "requests": [
+            {"method": "GET", "path": "/api/cinema/genres/"},
+            {
+                "method": "POST",
+                "path": "/api/cinema/orders/",
+                "body": {...},
+                "headers": {"Idempotency-Key": "..."}
+            }
+        ],
+        "concurrent": false
+    }
+
+and answers ``{"responses": [{"status": 200, "body": ...}, ...]}`` in
+the same order. Sub-requests are resolved against the URLconf and call
+the views directly with a request built in memory, without going through
+HTTP parsing or the middleware again. They get the headers of the batch
+request, except for its ``Content-*`` and ``Idempotency-Key`` headers,
+plus their own ``headers``. The batch is authenticated once
+and its user is handed to each sub-request as DRF's forced
+authentication, so the JWT is decoded and its user loaded only once.
+Permissions and throttles still apply to every sub-request.
+
+By default sub-requests run one after the other on the batch request's
+database connection. Read-only batches may ask for ``"concurrent":
+true`` to run them in a thread pool of ``BATCH_MAX_WORKERS`` instead,
+each thread on a connection of its own.
+"""
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from urllib.parse import urlsplit
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.http import HttpRequest, QueryDict
+from django.urls import Resolver404, resolve
+from rest_framework import serializers, status
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+METHODS = ("GET", "POST", "PUT", "PATCH", "DELETE")
+# headers about the batch request itself, not passed on
+BATCH_ONLY_HEADERS = ("HTTP_IDEMPOTENCY_KEY",)
+CONTENT_HEADERS = ("CONTENT_", "HTTP_CONTENT_")
+
+
+def meta_key(header):
+    """``HTTP_IDEMPOTENCY_KEY`` for ``Idempotency-Key``"""
+    return f"HTTP_{header.upper().replace('-', '_')}"
+
+
+class SubRequestSerializer(serializers.Serializer):
+    method = serializers.ChoiceField(choices=METHODS, default="GET")
+    path = serializers.CharField()
+    body = serializers.JSONField(required=False)
+    headers = serializers.DictField(
+        child=serializers.CharField(allow_blank=True), required=False
+    )
+
+    def validate_path(self, path):
+        if not path.startswith(tuple(settings.BATCH_PREFIXES)):
+            raise serializers.ValidationError(
+                f"Only paths under {', '.join(settings.BATCH_PREFIXES)} "
+                f"can be batched."
+            )
+        return path
+
+    def validate_headers(self, headers):
+        if any(
+            meta_key(header).startswith(CONTENT_HEADERS)
+            for header in headers
+        ):
+            raise serializers.ValidationError(
+                "Content headers are set from the body."
+            )
+        return headers
+
+
+class BatchSerializer(serializers.Serializer):
+    requests = SubRequestSerializer(many=True, allow_empty=False)
+    concurrent = serializers.BooleanField(default=False)
+
+    def validate_requests(self, requests):
+        if len(requests) > settings.BATCH_MAX_REQUESTS:
+            raise serializers.ValidationError(
+                f"At most {settings.BATCH_MAX_REQUESTS} requests "
+                f"can be batched."
+            )
+        return requests
+
+    def validate(self, attrs):
+        if attrs["concurrent"] and any(
+            sub_request["method"] != "GET" for sub_request in attrs["requests"]
+        ):
+            raise serializers.ValidationError(
+                {"concurrent": ["Only GET requests can run concurrently."]}
+            )
+        return attrs
+
+
+def build_request(parent, method, path, body=None, headers=None):
+    """
+    An HttpRequest for ``path`` carrying the batch request's headers,
+    but those about its body or of its own, and ``headers``
+    """
+    url = urlsplit(path)
+    request = HttpRequest()
+    request.method = method
+    request.path = request.path_info = url.path
+    request.META = {
+        key: value
+        for key, value in parent.META.items()
+        if key not in BATCH_ONLY_HEADERS
+        and not key.startswith(CONTENT_HEADERS)
+    }
+    request.META.update(
+        {meta_key(header): value for header, value in (headers or {}).items()}
+    )
+    request.META.update(
+        {
+            "REQUEST_METHOD": method,
+            "PATH_INFO": url.path,
+            "QUERY_STRING": url.query,
+        }
+    )
+    request.GET = QueryDict(url.query)
+    request.COOKIES = parent.COOKIES
+
+    if body is not None:
+        content = json.dumps(body).encode()
+        request.META["CONTENT_TYPE"] = "application/json"
+        request.META["CONTENT_LENGTH"] = str(len(content))
+        request._stream = io.BytesIO(content)
+        request._read_started = False
+
+    if parent.user.is_authenticated:
+        # picked up by rest_framework.request.Request
+        request._force_auth_user = parent.user
+        request._force_auth_token = parent.auth
+
+    return request
+
+
+def dispatch(parent, sub_request):
+    request = build_request(
+        parent,
+        sub_request["method"],
+        sub_request["path"],
+        sub_request.get("body"),
+        sub_request.get("headers"),
+    )
+    try:
+        match = resolve(request.path_info)
+    except Resolver404:
+        return {
+            "status": status.HTTP_404_NOT_FOUND,
+            "body": {"detail": "Not found."},
+        }
+    request.resolver_match = match
+
+    view = match.func
+    if iscoroutinefunction(view):
+        view = async_to_sync(view)
+    response = view(request, *match.args, **match.kwargs)
+
+    # DRF responses are embedded as data and rendered once with the batch
+    if hasattr(response, "data"):
+        body = response.data
+    else:
+        content = response.content.decode(response.charset)
+        try:
+            body = json.loads(content)
+        except ValueError:
+            body = content
+
+    return {"status": response.status_code, "body": body}
+
+
+def dispatch_in_thread(parent, sub_request):
+    try:
+        return dispatch(parent, sub_request)
+    finally:
+        connections.close_all()
+
+
+class BatchView(APIView):
+    permission_classes = (AllowAny,)
+    serializer_class = BatchSerializer
+
+    def post(self, request):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        sub_requests = serializer.validated_data["requests"]
+
+        if serializer.validated_data["concurrent"]:
+            with ThreadPoolExecutor(settings.BATCH_MAX_WORKERS) as pool:
+                futures = [
+                    pool.submit(
+                        copy_context().run,
+                        dispatch_in_thread,
+                        request,
+                        sub_request,
+                    )
+                    for sub_request in sub_requests
+                ]
+                responses = [future.result() for future in futures]
+        else:
+            responses = [
+                dispatch(request, sub_request) for sub_request in sub_requests
+            ]
+
+        return Response({"responses": responses}, status=status.HTTP_200_OK)
@@ -0,0 +1,323 @@
+"""
+Streaming bulk loader for fixtures and seed data.
+
+``manage.py bulk_load`` reads Django JSON fixtures, NDJSON (one fixture
+object per line) or CSV (one model per file) incrementally and inserts
+the rows in per-model batches, so memory use depends on the batch size,
+not on the size of the file. Everything is loaded in one transaction
+with foreign key checks deferred to the end, which lets a batch be
+flushed as soon as it fills up, whatever order the rows come in.
+
+Rows that carry a primary key are inserted raw like ``loaddata`` does
+(``auto_now`` fields keep the loaded value), with ``COPY`` on
+PostgreSQL. Rows without one go through ``bulk_create`` so that their
+new ids are known for the many-to-many rows. No signals are sent; an
+``on_flush(model, instances)`` callback sees every batch instead, e.g.
+to bring derived tables up to date afterwards.
+"""
+import csv
+import gzip
+import io
+import json
+import re
+import sys
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from django.apps import apps
+from django.core.management.color import no_style
+from django.core.serializers import python
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+FORMATS = {
+    ".json": "json",
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+    ".csv": "csv",
+}
+M2M_SEPARATOR = "|"
+SEPARATORS = re.compile(r"[\s,]*")
+COPY_ESCAPES = str.maketrans(
+    {"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"}
+)
+
+
+def detect_format(path):
+    suffixes = Path(path).suffixes
+    if suffixes[-1:] == [".gz"]:
+        suffixes = suffixes[:-1]
+
+    try:
+        return FORMATS[suffixes[-1]]
+    except (IndexError, KeyError):
+        raise ValueError(f"Cannot tell the format of {path}, pass --format")
+
+
+def open_text(path):
+    if str(path) == "-":
+        return sys.stdin
+    if str(path).endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, encoding="utf-8", newline="")
+
+
+def iter_json_array(stream, chunk_size=1 << 16):
+    """Yield the items of a JSON array while reading it in chunks"""
+    decoder = json.JSONDecoder()
+    buffer, position, opened = "", 0, False
+
+    while True:
+        position = SEPARATORS.match(buffer, position).end()
+
+        if position < len(buffer):
+            if not opened:
+                if buffer[position] != "[":
+                    raise ValueError("Expected a JSON array")
+                opened, position = True, position + 1
+                continue
+            if buffer[position] == "]":
+                return
+
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                pass
+            else:
+                yield item
+                continue
+
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            raise ValueError("Unexpected end of JSON array")
+        buffer, position = buffer[position:] + chunk, 0
+
+
+def iter_ndjson(stream):
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def iter_csv(stream, model_label):
+    """
+    Yield fixture objects for ``model_label`` from CSV rows with a header.
+    Many-to-many columns hold ids separated by ``|``.
+    """
+    model = apps.get_model(model_label)
+    many_to_many = {field.name for field in model._meta.many_to_many}
+
+    for row in csv.DictReader(stream):
+        pk = row.pop("pk", None) or row.pop(model._meta.pk.name, None)
+        fields = {}
+        for name, value in row.items():
+            if name in many_to_many:
+                fields[name] = [
+                    related for related in value.split(M2M_SEPARATOR)
+                    if related
+                ]
+            elif value == "" and model._meta.get_field(name).null:
+                fields[name] = None
+            else:
+                fields[name] = value
+
+        yield {"model": model_label, "pk": pk or None, "fields": fields}
+
+
+def read_objects(path, file_format=None, model=None):
+    """Yield fixture objects (dicts) from ``path`` one at a time"""
+    file_format = file_format or detect_format(path)
+    if file_format == "csv" and not model:
+        raise ValueError("CSV files need --model")
+
+    with open_text(path) as stream:
+        if file_format == "json":
+            yield from iter_json_array(stream)
+        elif file_format == "ndjson":
+            yield from iter_ndjson(stream)
+        else:
+            yield from iter_csv(stream, model)
+
+
+def is_excluded(label, exclude):
+    label = label.lower()
+    return any(
+        label == excluded or label.split(".")[0] == excluded
+        for excluded in exclude
+    )
+
+
+def dependency_order(models):
+    """Sort models so that the models they reference come first"""
+    ordered, visiting = [], set()
+
+    def visit(model):
+        if model in visiting:
+            return
+        visiting.add(model)
+        for field in model._meta.concrete_fields:
+            if field.related_model in models:
+                visit(field.related_model)
+        ordered.append(model)
+
+    for model in models:
+        visit(model)
+
+    return ordered
+
+
+def copy_value(value):
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    return str(value).translate(COPY_ESCAPES)
+
+
+class BulkLoader:
+    def __init__(
+        self,
+        using=DEFAULT_DB_ALIAS,
+        batch_size=5000,
+        use_copy=True,
+        on_flush=None,
+    ):
+        self.using = using
+        self.on_flush = on_flush
+        self.connection = connections[using]
+        self.batch_size = batch_size
+        self.use_copy = use_copy and self.connection.vendor == "postgresql"
+        self.pending = defaultdict(list)
+        self.counts = Counter()
+        self.tables = set()
+
+    def add(self, deserialized):
+        model = type(deserialized.object)
+        batch = self.pending[model]
+        batch.append(deserialized)
+
+        if len(batch) >= self.batch_size:
+            self.flush(model)
+
+    def flush(self, model):
+        batch = self.pending.pop(model, [])
+        if not batch:
+            return
+
+        instances = [deserialized.object for deserialized in batch]
+        self.tables.add(model._meta.db_table)
+        if all(obj.pk is not None for obj in instances):
+            self.insert(model, instances, model._meta.concrete_fields)
+        else:
+            model._base_manager.using(self.using).bulk_create(
+                instances, batch_size=self.batch_size
+            )
+
+        for field in model._meta.many_to_many:
+            through = field.remote_field.through
+            source = f"{field.m2m_field_name()}_id"
+            target = f"{field.m2m_reverse_field_name()}_id"
+            rows = [
+                through(**{source: deserialized.object.pk, target: related})
+                for deserialized in batch
+                for related in deserialized.m2m_data.get(field.name, ())
+            ]
+            if rows:
+                self.insert(
+                    through,
+                    rows,
+                    [
+                        through_field
+                        for through_field in through._meta.concrete_fields
+                        if not through_field.primary_key
+                    ],
+                )
+
+        self.counts[model._meta.label_lower] += len(instances)
+        if self.on_flush:
+            self.on_flush(model, instances)
+
+    def insert(self, model, instances, fields):
+        self.tables.add(model._meta.db_table)
+
+        if self.use_copy:
+            self.copy(model, instances, fields)
+            return
+
+        queryset = model._base_manager.using(self.using)
+        size = max(self.connection.ops.bulk_batch_size(fields, instances), 1)
+        for start in range(0, len(instances), size):
+            queryset._insert(
+                instances[start:start + size],
+                fields=fields,
+                raw=True,
+                using=self.using,
+            )
+
+    def copy(self, model, instances, fields):
+        quote_name = self.connection.ops.quote_name
+        data = io.StringIO()
+        for obj in instances:
+            data.write(
+                "\t".join(
+                    copy_value(
+                        field.get_db_prep_save(
+                            getattr(obj, field.attname), self.connection
+                        )
+                    )
+                    for field in fields
+                )
+            )
+            data.write("\n")
+        data.seek(0)
+
+        columns = ", ".join(quote_name(field.column) for field in fields)
+        with self.connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {quote_name(model._meta.db_table)} ({columns}) "
+                f"FROM STDIN",
+                data,
+            )
+
+    def finish(self):
+        for model in dependency_order(list(self.pending)):
+            self.flush(model)
+
+        models = [apps.get_model(label) for label in self.counts]
+        with self.connection.cursor() as cursor:
+            for sql in self.connection.ops.sequence_reset_sql(
+                no_style(), models
+            ):
+                cursor.execute(sql)
+
+
+def load(
+    paths,
+    file_format=None,
+    model=None,
+    using=DEFAULT_DB_ALIAS,
+    batch_size=5000,
+    use_copy=True,
+    exclude=(),
+    on_flush=None,
+):
+    """Load ``paths`` in a single transaction and return counts per model"""
+    exclude = [excluded.lower() for excluded in exclude]
+    loader = BulkLoader(using, batch_size, use_copy, on_flush)
+    connection = connections[using]
+
+    with transaction.atomic(using=using):
+        with connection.constraint_checks_disabled():
+            for path in paths:
+                objects = (
+                    obj for obj in read_objects(path, file_format, model)
+                    if not is_excluded(obj["model"], exclude)
+                )
+                for deserialized in python.Deserializer(
+                    objects, using=using
+                ):
+                    loader.add(deserialized)
+            loader.finish()
+
+        connection.check_constraints(table_names=sorted(loader.tables))
+
+    return loader.counts
@@ -0,0 +1,180 @@
+"""
+Response compression.
+
+``CompressionMiddleware`` compresses bodies of at least
+``COMPRESSION_MIN_SIZE`` bytes with the encoding the client prefers out
+of zstd, brotli and gzip (zstd and brotli only when the ``zstandard`` and
+``brotli`` packages are installed). Only the API's content types are
+compressed: HTML pages of the admin carry CSRF tokens, which compression
+would expose to BREACH.
+
+Successful GET responses are compressed once: the compressed bytes are
+cached under a digest of the body, so a hot response costs a hash and a
+cache lookup per request instead of a compression. As the key is
+derived from the body itself, entries can't leak between users.
+"""
+import gzip
+import hashlib
+import re
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import patch_vary_headers
+
+
+def gzip_compress(body):
+    return gzip.compress(body, compresslevel=6, mtime=0)
+
+
+def load_encoders():
+    """Encoders by preference, best ratio per CPU second first"""
+    encoders = {}
+
+    try:
+        import zstandard
+    except ImportError:
+        pass
+    else:
+        # compressor objects can't be shared between threads
+        encoders["zstd"] = (
+            lambda body: zstandard.ZstdCompressor(level=6).compress(body)
+        )
+
+    try:
+        import brotli
+    except ImportError:
+        pass
+    else:
+        encoders["br"] = lambda body: brotli.compress(body, quality=5)
+
+    encoders["gzip"] = gzip_compress
+    return encoders
+
+
+ENCODERS = load_encoders()
+
+
+def accepted_encodings(header):
+    """``{coding: q}`` of an ``Accept-Encoding`` header"""
+    accepted = {}
+    for part in header.split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+
+        match = re.search(r"q=([0-9.]+)", params)
+        try:
+            accepted[coding] = float(match.group(1)) if match else 1.0
+        except ValueError:
+            accepted[coding] = 0.0
+
+    return accepted
+
+
+def negotiate(header, encoders=ENCODERS):
+    """The encoding to use for ``header``, or None for identity"""
+    accepted = accepted_encodings(header)
+    default = accepted.get("*", 0.0)
+    preference = list(encoders)
+
+    # highest q wins, ties go to the encoder listed first
+    best = max(
+        preference,
+        key=lambda encoding: (
+            accepted.get(encoding, default),
+            -preference.index(encoding),
+        ),
+    )
+    return best if accepted.get(best, default) > 0 else None
+
+
+def is_compressible(response):
+    if response.streaming or response.has_header("Content-Encoding"):
+        return False
+    if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+        return False
+
+    content_type = response.get("Content-Type", "").split(";")[0].strip()
+    return content_type in settings.COMPRESSION_CONTENT_TYPES
+
+
+def cache_key(request, response, encoding):
+    """Key of the compressed body, or None if it shouldn't be cached"""
+    if request.method not in ("GET", "HEAD") or response.status_code != 200:
+        return None
+    if "no-store" in response.get("Cache-Control", ""):
+        return None
+
+    digest = hashlib.blake2b(response.content, digest_size=20).hexdigest()
+    return f"compressed:{encoding}:{digest}"
+
+
+def encode(response, encoding, body):
+    if len(body) >= len(response.content):
+        return response
+
+    response.content = body
+    response["Content-Length"] = str(len(body))
+    response["Content-Encoding"] = encoding
+    # the compressed body is only equivalent, not byte for byte equal
+    if response.has_header("ETag"):
+        response["ETag"] = re.sub(r'^"', 'W/"', response["ETag"])
+
+    return response
+
+
+class CompressionMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def choose_encoding(request, response):
+        if not is_compressible(response):
+            return None
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        return negotiate(request.headers.get("Accept-Encoding", ""))
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        response = self.get_response(request)
+        encoding = self.choose_encoding(request, response)
+        if encoding is None:
+            return response
+
+        cache = caches[settings.COMPRESSION_CACHE]
+        key = cache_key(request, response, encoding)
+        body = cache.get(key) if key else None
+        if body is None:
+            body = ENCODERS[encoding](response.content)
+            if key:
+                cache.set(key, body, settings.COMPRESSION_CACHE_SECONDS)
+
+        return encode(response, encoding, body)
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        encoding = self.choose_encoding(request, response)
+        if encoding is None:
+            return response
+
+        cache = caches[settings.COMPRESSION_CACHE]
+        key = cache_key(request, response, encoding)
+        body = await cache.aget(key) if key else None
+        if body is None:
+            body = ENCODERS[encoding](response.content)
+            if key:
+                await cache.aset(
+                    key, body, settings.COMPRESSION_CACHE_SECONDS
+                )
+
+        return encode(response, encoding, body)
@@ -0,0 +1,56 @@
+"""
+PostgreSQL backend that borrows connections from an in-process pool.
+
+Closing a Django connection (at the end of every request when
+``CONN_MAX_AGE`` is 0) hands it back to the pool instead of
+disconnecting. The pool is configured with the ``POOL`` key of the
+database settings, e.g. ``{"MAX_SIZE": 20, "TIMEOUT": 10}``.
+"""
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+
+from cinema_api.db.pool import get_pool
+
+
+def ping(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1")
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    @property
+    def pool(self):
+        options = self.settings_dict.get("POOL", {})
+        return get_pool(
+            self.alias,
+            check=ping,
+            **{key.lower(): value for key, value in options.items()},
+        )
+
+    def get_new_connection(self, conn_params):
+        create = super().get_new_connection
+        connection = self.pool.acquire(lambda: create(conn_params))
+
+        # Set by the parent when it creates a connection; pooled ones
+        # keep the level they were created with.
+        self.isolation_level = IsolationLevel(
+            self.settings_dict["OPTIONS"].get(
+                "isolation_level", IsolationLevel.READ_COMMITTED
+            )
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+
+        with self.wrap_database_errors:
+            broken = self.errors_occurred or self.connection.closed
+            if not broken:
+                try:
+                    # Don't leak an open transaction to the next borrower.
+                    self.connection.rollback()
+                except self.Database.Error:
+                    broken = True
+
+            self.pool.release(self.connection, discard=broken)
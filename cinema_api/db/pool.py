@@ -0,0 +1,150 @@
+import threading
+import time
+from collections import deque
+
+from django.db.utils import OperationalError
+
+
+class PoolTimeout(OperationalError):
+    pass
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of DB-API connections shared by a whole process.
+
+    Connections are created lazily up to ``max_size``; once they are all
+    in use, callers wait up to ``timeout`` seconds for one to be released.
+    Connections idle for longer than ``check_after`` seconds are pinged
+    with ``check`` before being handed out, and ones idle for longer than
+    ``max_idle`` seconds are closed.
+    """
+
+    def __init__(
+        self,
+        max_size=10,
+        timeout=30,
+        max_idle=600,
+        check_after=30,
+        check=None,
+    ):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.check_after = check_after
+        self.check = check
+
+        self._idle = deque()
+        self._in_use = 0
+        self._waiting = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, create):
+        """Return an idle connection, or one made by ``create()``"""
+        deadline = time.monotonic() + self.timeout
+
+        with self._condition:
+            while not self._idle and self._in_use >= self.max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(
+                        f"No connection available within {self.timeout}s "
+                        f"(pool size {self.max_size})"
+                    )
+                self._waiting += 1
+                try:
+                    self._condition.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+            self._in_use += 1
+            idle = self._idle.pop() if self._idle else None
+
+        try:
+            while idle is not None:
+                connection, released_at = idle
+                if self._is_usable(connection, released_at):
+                    return connection
+
+                self._discard(connection)
+                with self._condition:
+                    idle = self._idle.pop() if self._idle else None
+
+            return create()
+        except BaseException:
+            self._release_slot()
+            raise
+
+    def release(self, connection, discard=False):
+        """Give a connection acquired from this pool back to it"""
+        if discard or getattr(connection, "closed", False):
+            self._discard(connection)
+            self._release_slot()
+            return
+
+        with self._condition:
+            self._in_use -= 1
+            self._idle.append((connection, time.monotonic()))
+            self._condition.notify()
+
+    def stats(self):
+        with self._condition:
+            return {
+                "max_size": self.max_size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "waiting": self._waiting,
+                "saturation": round(self._in_use / self.max_size, 3),
+            }
+
+    def close_all(self):
+        with self._condition:
+            idle, self._idle = self._idle, deque()
+
+        for connection, _ in idle:
+            self._discard(connection)
+
+    def _is_usable(self, connection, released_at):
+        idle_for = time.monotonic() - released_at
+        if idle_for > self.max_idle or getattr(connection, "closed", False):
+            return False
+
+        if self.check is not None and idle_for > self.check_after:
+            try:
+                self.check(connection)
+            except Exception:
+                return False
+
+        return True
+
+    def _release_slot(self):
+        with self._condition:
+            self._in_use -= 1
+            self._condition.notify()
+
+    @staticmethod
+    def _discard(connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, **options):
+    """Return the process-wide pool for a database alias"""
+    with _pools_lock:
+        if alias not in _pools:
+            _pools[alias] = ConnectionPool(**options)
+        return _pools[alias]
+
+
+def get_pool_stats():
+    """Return the stats of every pool created in this process"""
+    with _pools_lock:
+        pools = dict(_pools)
+
+    return {alias: pool.stats() for alias, pool in pools.items()}
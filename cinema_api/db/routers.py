@@ -0,0 +1,174 @@
+import hashlib
+import itertools
+from contextvars import ContextVar
+from functools import lru_cache
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import setting_changed
+from django.db import DEFAULT_DB_ALIAS
+from django.dispatch import receiver
+
+from cinema_api.db.sharding import (
+    current_shard,
+    is_sharded,
+    is_sharded_model,
+    shards,
+)
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+use_primary = ContextVar("use_primary", default=False)
+
+
+@lru_cache(maxsize=None)
+def replica_cycle():
+    """
+    Endless iterator over replica aliases in smooth weighted round-robin
+    order, e.g. weights {a: 2, b: 1} give a, b, a, a, b, a, ...
+    """
+    weights = settings.DATABASE_REPLICAS
+    if not weights:
+        return None
+
+    total = sum(weights.values())
+    current = dict.fromkeys(weights, 0)
+    sequence = []
+    for _ in range(total):
+        for alias, weight in weights.items():
+            current[alias] += weight
+        alias = max(current, key=current.get)
+        current[alias] -= total
+        sequence.append(alias)
+
+    return itertools.cycle(sequence)
+
+
+@receiver(setting_changed)
+def reset_replica_cycle(*, setting, **kwargs):
+    if setting == "DATABASE_REPLICAS":
+        replica_cycle.cache_clear()
+
+
+class ShardRouter:
+    """
+    Route the ``SHARDED_MODELS`` to the current shard (``using_shard()``)
+    or to the shard of the instance a related query starts from, when
+    there is more than one shard in ``DATABASE_SHARDS``. Other models
+    reached from rows on a shard are read from the default database.
+    """
+
+    def db_for_model(self, model, **hints):
+        if not is_sharded():
+            return None
+
+        instance = hints.get("instance")
+        db = instance._state.db if instance is not None else None
+        if not is_sharded_model(model):
+            # e.g. the user of an order
+            if db in shards() and db != DEFAULT_DB_ALIAS:
+                return DEFAULT_DB_ALIAS
+            return None
+
+        if db in shards() and (
+            db != DEFAULT_DB_ALIAS or is_sharded_model(type(instance))
+        ):
+            return db
+        return current_shard.get()
+
+    db_for_read = db_for_model
+    db_for_write = db_for_model
+
+
+class ReplicaRouter:
+    """
+    Route reads of ``REPLICA_APPS`` models to the read replicas in
+    ``DATABASE_REPLICAS`` (alias -> weight); everything else, all writes
+    and reads made while ``use_primary`` is set go to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db:
+            return instance._state.db
+
+        if use_primary.get():
+            return DEFAULT_DB_ALIAS
+
+        replicas = replica_cycle()
+        if replicas is None:
+            return None
+
+        if model._meta.app_label not in settings.REPLICA_APPS:
+            return None
+
+        return next(replicas)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        return True
+
+
+def pin_key(request):
+    ident = (
+        request.META.get("HTTP_AUTHORIZATION")
+        or request.META.get("REMOTE_ADDR")
+        or ""
+    )
+    return "replica_pin:" + hashlib.blake2b(ident.encode()).hexdigest()
+
+
+class ReadYourWritesMiddleware:
+    """
+    Serve unsafe requests from the primary only, and keep serving the
+    same client (by credentials, or address when anonymous) from the
+    primary for ``REPLICA_PIN_SECONDS`` after a successful write, so
+    e.g. a new order shows up in the following ``/orders/`` list.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+
+        key = pin_key(request)
+        is_write = request.method not in SAFE_METHODS
+        token = use_primary.set(is_write or bool(cache.get(key)))
+        try:
+            response = self.get_response(request)
+        finally:
+            use_primary.reset(token)
+
+        if is_write and response.status_code < 400:
+            cache.set(key, True, settings.REPLICA_PIN_SECONDS)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return await self.get_response(request)
+
+        key = pin_key(request)
+        is_write = request.method not in SAFE_METHODS
+        token = use_primary.set(is_write or bool(await cache.aget(key)))
+        try:
+            response = await self.get_response(request)
+        finally:
+            use_primary.reset(token)
+
+        if is_write and response.status_code < 400:
+            await cache.aset(key, True, settings.REPLICA_PIN_SECONDS)
+        return response
@@ -0,0 +1,270 @@
+"""
+Horizontal sharding of the models in ``settings.SHARDED_MODELS``.
+
+``DATABASE_SHARDS`` lists the database aliases holding sharded rows, the
+default database first. ``ShardRouter`` sends sharded models to the
+shard set with ``using_shard()`` (or to the database of the instance a
+related query starts from); code that doesn't pick a shard keeps using
+the default database, so a single shard is no sharding at all.
+
+Which rows go to which shard is the application's business (see
+``cinema.sharding``). This module provides what is independent of it:
+
+* ids: each shard numbers the rows of sharded models from
+  ``index << SHARD_ID_BITS`` on (set up by ``migrate``), so ids stay
+  unique over all shards and rows can move between them with their ids;
+* broadcast models (``SHARD_BROADCAST_MODELS``): rows saved or deleted
+  on the default database are copied to or deleted from every shard, so
+  sharded rows can reference and join them;
+* ``MergedQuerySet``: a queryset run on every shard, merged in its
+  ordering, which can be counted, sliced and paginated.
+"""
+import heapq
+from contextlib import contextmanager
+from contextvars import ContextVar
+from itertools import islice
+
+from django.apps import apps
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, models
+
+current_shard = ContextVar("current_shard", default=None)
+
+BROADCAST_BATCH_SIZE = 1000
+
+
+def shards():
+    return settings.DATABASE_SHARDS
+
+
+def is_sharded():
+    return len(settings.DATABASE_SHARDS) > 1
+
+
+def is_sharded_model(model):
+    return model._meta.label_lower in settings.SHARDED_MODELS
+
+
+@contextmanager
+def using_shard(alias):
+    """Route the sharded models to ``alias`` inside the block"""
+    token = current_shard.set(alias)
+    try:
+        yield alias
+    finally:
+        current_shard.reset(token)
+
+
+def each_shard():
+    """Yield every shard alias, with it set as the current shard"""
+    for alias in shards():
+        with using_shard(alias):
+            yield alias
+
+
+def id_range_start(alias):
+    return shards().index(alias) << settings.SHARD_ID_BITS
+
+
+def sequence_value(connection, table, column):
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute(
+                "SELECT seq FROM sqlite_sequence WHERE name = %s", [table]
+            )
+        else:
+            cursor.execute(
+                "SELECT last_value FROM pg_sequences "
+                "WHERE schemaname || '.' || sequencename = "
+                "pg_get_serial_sequence(%s, %s)",
+                [table, column],
+            )
+        row = cursor.fetchone()
+
+    return row[0] if row and row[0] is not None else 0
+
+
+def set_sequence(connection, table, column, value):
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute(
+                "DELETE FROM sqlite_sequence WHERE name = %s", [table]
+            )
+            cursor.execute(
+                "INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)",
+                [table, value],
+            )
+        else:
+            cursor.execute(
+                "SELECT setval(pg_get_serial_sequence(%s, %s), %s)",
+                [table, column, value],
+            )
+
+
+def seed_id_ranges(using=DEFAULT_DB_ALIAS, **kwargs):
+    """
+    ``post_migrate`` receiver: move the id sequences of the sharded
+    models on shard ``using`` to the start of its id range
+    """
+    if using not in shards():
+        return
+    start = id_range_start(using)
+    connection = connections[using]
+    if not start or connection.vendor not in ("sqlite", "postgresql"):
+        return
+
+    for label in settings.SHARDED_MODELS:
+        model = apps.get_model(label)
+        pk = model._meta.pk
+        # BigAutoField included
+        if not isinstance(pk, models.AutoField):
+            continue
+        table = model._meta.db_table
+        if sequence_value(connection, table, pk.column) < start:
+            set_sequence(connection, table, pk.column, start)
+
+
+def broadcast_values(instance):
+    return {
+        field.attname: field.value_from_object(instance)
+        for field in instance._meta.concrete_fields
+        if not field.primary_key
+    }
+
+
+def broadcast_save(sender, instance, using, raw=False, **kwargs):
+    """``post_save`` receiver copying broadcast rows to every shard"""
+    if (
+        using != DEFAULT_DB_ALIAS
+        or not is_sharded()
+        or sender._meta.label_lower not in settings.SHARD_BROADCAST_MODELS
+    ):
+        return
+
+    for alias in shards()[1:]:
+        sender._base_manager.using(alias).update_or_create(
+            pk=instance.pk, defaults=broadcast_values(instance)
+        )
+
+
+def broadcast_delete(sender, instance, using, **kwargs):
+    """``post_delete`` receiver deleting broadcast rows on every shard"""
+    if (
+        using != DEFAULT_DB_ALIAS
+        or not is_sharded()
+        or sender._meta.label_lower not in settings.SHARD_BROADCAST_MODELS
+    ):
+        return
+
+    for alias in shards()[1:]:
+        # also deletes the sharded rows referencing it on the shard
+        sender._base_manager.using(alias).filter(pk=instance.pk).delete()
+
+
+def sync_broadcast(alias):
+    """
+    Make the broadcast models on shard ``alias`` match the default
+    database, e.g. after ``bulk_load`` (which sends no signals)
+    """
+    for label in settings.SHARD_BROADCAST_MODELS:
+        model = apps.get_model(label)
+        fields = [
+            field.name
+            for field in model._meta.concrete_fields
+            if not field.primary_key
+        ]
+        rows = model._base_manager.using(DEFAULT_DB_ALIAS).order_by("pk")
+        target = model._base_manager.using(alias)
+
+        pks = set()
+        instances = rows.iterator(chunk_size=BROADCAST_BATCH_SIZE)
+        while batch := list(islice(instances, BROADCAST_BATCH_SIZE)):
+            pks.update(obj.pk for obj in batch)
+            target.bulk_create(
+                batch,
+                update_conflicts=True,
+                unique_fields=[model._meta.pk.name],
+                update_fields=fields,
+            )
+        target.exclude(pk__in=pks).delete()
+
+
+def attribute_path(model, lookup):
+    """``movie_session.show_time`` for ``movie_session__show_time``"""
+    path = []
+    for name in lookup.split("__"):
+        field = model._meta.get_field(name)
+        if field.is_relation and name == lookup.split("__")[-1]:
+            # compare related rows by their id
+            path.append(field.attname)
+        else:
+            path.append(name)
+        model = field.related_model or model
+
+    return ".".join(path)
+
+
+class MergedQuerySet:
+    """
+    ``queryset`` run on each of ``aliases`` (all shards by default), its
+    rows merged in the queryset's ordering, which must be in one
+    direction. Slicing fetches at most ``stop`` rows from each shard.
+    """
+
+    ordered = True
+
+    def __init__(self, queryset, aliases=None):
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        descending = {name.startswith("-") for name in ordering}
+        if len(descending) != 1:
+            raise ValueError(
+                f"Can't merge {queryset.model.__name__} rows ordered by "
+                f"{ordering!r} from several shards."
+            )
+
+        self.reverse = descending.pop()
+        paths = [
+            attribute_path(queryset.model, name.lstrip("-"))
+            for name in ordering
+        ]
+        self.key = lambda obj: tuple(
+            self.resolve(obj, path) for path in paths
+        )
+        self.querysets = [
+            queryset.using(alias) for alias in aliases or shards()
+        ]
+        self.model = queryset.model
+
+    @staticmethod
+    def resolve(obj, path):
+        for name in path.split("."):
+            obj = getattr(obj, name)
+        return obj
+
+    def merge(self, querysets):
+        return heapq.merge(*querysets, key=self.key, reverse=self.reverse)
+
+    def count(self):
+        return sum(queryset.count() for queryset in self.querysets)
+
+    def __len__(self):
+        return self.count()
+
+    def __iter__(self):
+        return self.merge(self.querysets)
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            return self[item:item + 1][0]
+
+        start, stop = item.start or 0, item.stop
+        if stop is None:
+            return list(islice(self, start, None))
+
+        return list(
+            islice(
+                self.merge(queryset[:stop] for queryset in self.querysets),
+                start,
+                stop,
+            )
+        )
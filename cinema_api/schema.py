@@ -0,0 +1,207 @@
+"""
+Precomputed OpenAPI schema.
+
+``manage.py build_schema`` renders the schema once (at deploy time) into
+``SCHEMA_ARTIFACT_DIR`` as YAML and JSON, each with a gzipped copy and an
+ETag, together with a fingerprint of the code it was generated from.
+``schema_view`` serves those bytes as they are, so drf_spectacular's
+introspection stays off the request path. Without an artifact (e.g. in a
+fresh checkout), or with one built from other code while ``DEBUG`` is
+on, the schema is generated on the first request instead; a stale
+artifact in production is an error. Either way the code is checked once
+per process.
+"""
+import gzip
+import hashlib
+import json
+import threading
+from functools import lru_cache
+from importlib.metadata import version
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.http import require_GET
+
+FORMATS = {
+    "yaml": "application/vnd.oai.openapi",
+    "json": "application/vnd.oai.openapi+json",
+}
+MANIFEST = "manifest.json"
+SCHEMA_CLASS = "drf_spectacular.openapi.AutoSchema"
+SOURCE_PACKAGES = ("cinema", "cinema_api", "user")
+
+# render_schema() switches a setting, one generation at a time
+render_lock = threading.Lock()
+
+
+def source_fingerprint():
+    """Hash of everything the generated schema depends on"""
+    digest = hashlib.sha256()
+
+    for package in SOURCE_PACKAGES:
+        package_dir = Path(settings.BASE_DIR) / package
+        for path in sorted(package_dir.rglob("*.py")):
+            if "tests" in path.parts or "migrations" in path.parts:
+                continue
+            digest.update(str(path.relative_to(settings.BASE_DIR)).encode())
+            digest.update(path.read_bytes())
+
+    for distribution in ("djangorestframework", "drf-spectacular"):
+        digest.update(version(distribution).encode())
+    digest.update(repr(settings.SPECTACULAR_SETTINGS).encode())
+
+    return digest.hexdigest()
+
+
+def render_schema():
+    """
+    Generate the schema and return ``{format: bytes}``. It switches
+    ``DEFAULT_SCHEMA_CLASS`` in the settings while generating, so a
+    process serving requests runs it at most once, under ``render_lock``.
+    """
+    from drf_spectacular.generators import SchemaGenerator
+    from drf_spectacular.renderers import (
+        OpenApiJsonRenderer,
+        OpenApiYamlRenderer,
+    )
+    from django.test.utils import override_settings
+
+    import user.schema  # noqa: F401 (registers the JWT security scheme)
+
+    rest_framework = {
+        **settings.REST_FRAMEWORK,
+        "DEFAULT_SCHEMA_CLASS": SCHEMA_CLASS,
+    }
+    with override_settings(REST_FRAMEWORK=rest_framework):
+        schema = SchemaGenerator().get_schema(request=None, public=True)
+
+    return {
+        "yaml": OpenApiYamlRenderer().render(schema, renderer_context={}),
+        "json": OpenApiJsonRenderer().render(schema, renderer_context={}),
+    }
+
+
+def compress(rendered, fingerprint):
+    """Add gzipped bodies and ETags to rendered schemas"""
+    artifacts = {"fingerprint": fingerprint, "formats": {}}
+
+    for schema_format, body in rendered.items():
+        artifacts["formats"][schema_format] = {
+            "identity": body,
+            "gzip": gzip.compress(body, compresslevel=9, mtime=0),
+            "etag": hashlib.sha256(body).hexdigest()[:32],
+        }
+
+    return artifacts
+
+
+def write_artifacts(directory, artifacts):
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    manifest = {"fingerprint": artifacts["fingerprint"], "etags": {}}
+    for schema_format, variants in artifacts["formats"].items():
+        (directory / f"schema.{schema_format}").write_bytes(
+            variants["identity"]
+        )
+        (directory / f"schema.{schema_format}.gz").write_bytes(
+            variants["gzip"]
+        )
+        manifest["etags"][schema_format] = variants["etag"]
+
+    (directory / MANIFEST).write_text(json.dumps(manifest, indent=2))
+
+
+def read_manifest(directory):
+    try:
+        return json.loads((Path(directory) / MANIFEST).read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def read_artifacts(directory):
+    directory = Path(directory)
+    manifest = read_manifest(directory)
+    if manifest is None:
+        return None
+
+    artifacts = {"fingerprint": manifest["fingerprint"], "formats": {}}
+    try:
+        for schema_format, etag in manifest["etags"].items():
+            path = directory / f"schema.{schema_format}"
+            artifacts["formats"][schema_format] = {
+                "identity": path.read_bytes(),
+                "gzip": path.with_suffix(path.suffix + ".gz").read_bytes(),
+                "etag": etag,
+            }
+    except OSError:
+        return None
+
+    return artifacts
+
+
+@lru_cache(maxsize=None)
+def load_artifacts(directory, debug):
+    """
+    Load the built schema once per process and return ``(artifacts,
+    error)``. A missing artifact, or a stale one in ``debug``, is
+    generated here instead; a stale one otherwise is an error, kept so the
+    code is not hashed again on every request.
+    """
+    artifacts = read_artifacts(directory)
+    fingerprint = source_fingerprint()
+
+    if artifacts is not None and artifacts["fingerprint"] == fingerprint:
+        return artifacts, None
+
+    if artifacts is None or debug:
+        with render_lock:
+            return compress(render_schema(), fingerprint), None
+
+    return None, ImproperlyConfigured(
+        f"The OpenAPI schema in {directory} is out of date, "
+        f"run `python manage.py build_schema`."
+    )
+
+
+def negotiate_format(request):
+    requested = request.GET.get("format")
+    if requested in FORMATS:
+        return requested
+
+    return "json" if "json" in request.headers.get("Accept", "") else "yaml"
+
+
+@require_GET
+def schema_view(request):
+    schema_format = negotiate_format(request)
+    artifacts, error = load_artifacts(
+        str(settings.SCHEMA_ARTIFACT_DIR), settings.DEBUG
+    )
+    if error:
+        raise error
+    variants = artifacts["formats"][schema_format]
+
+    use_gzip = "gzip" in request.headers.get("Accept-Encoding", "")
+    etag = f'"{variants["etag"]}{"-gz" if use_gzip else ""}"'
+
+    if etag in request.headers.get("If-None-Match", ""):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(
+            variants["gzip" if use_gzip else "identity"],
+            content_type=FORMATS[schema_format],
+        )
+        if use_gzip:
+            response["Content-Encoding"] = "gzip"
+
+    response["ETag"] = etag
+    response["Cache-Control"] = (
+        f"public, max-age={settings.SCHEMA_CACHE_SECONDS}"
+    )
+    patch_vary_headers(response, ("Accept", "Accept-Encoding"))
+
+    return response
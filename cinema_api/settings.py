@@ -47,10 +47,12 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "cinema_api.compression.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "cinema_api.db.routers.ReadYourWritesMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -82,18 +84,112 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        # Keep the connection open between requests, re-checked on reuse
+        "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", 60)),
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
-# DATABASES = {
-#     "default": {
-#         "ENGINE": "django.db.backends.postgresql",
-#         "HOST": os.getenv("POSTGRES_HOST"),
-#         "NAME": os.getenv("POSTGRES_NAME"),
-#         "USER": os.getenv("POSTGRES_USER"),
-#         "PASSWORD": os.getenv("POSTGRES_PASSWORD"),
-#     }
-# }
+if os.getenv("POSTGRES_HOST"):
+    DATABASES = {
+        "default": {
+            # PostgreSQL with an in-process connection pool: Django
+            # "closes" the connection after each request, which returns
+            # it to the pool instead of disconnecting.
+            "ENGINE": "cinema_api.db.backends.postgresql",
+            "HOST": os.getenv("POSTGRES_HOST"),
+            "NAME": os.getenv("POSTGRES_NAME"),
+            "USER": os.getenv("POSTGRES_USER"),
+            "PASSWORD": os.getenv("POSTGRES_PASSWORD"),
+            "CONN_MAX_AGE": 0,
+            "CONN_HEALTH_CHECKS": True,
+            "POOL": {
+                "MAX_SIZE": int(os.getenv("DB_POOL_MAX_SIZE", 10)),
+                "TIMEOUT": float(os.getenv("DB_POOL_TIMEOUT", 10)),
+                "MAX_IDLE": float(os.getenv("DB_POOL_MAX_IDLE", 600)),
+            },
+        }
+    }
+
+# Read replicas, as "location=weight" pairs separated by commas, where
+# location is a host for PostgreSQL or a file for SQLite, e.g.
+# DB_REPLICAS="replica-1=3,replica-2=1" or DB_REPLICAS="db_replica.sqlite3"
+
+DATABASE_REPLICAS = {}
+
+for index, replica in enumerate(os.getenv("DB_REPLICAS", "").split(",")):
+    if not replica:
+        continue
+
+    location, _, weight = replica.partition("=")
+    alias = f"replica_{index}"
+    location_key = (
+        "NAME"
+        if DATABASES["default"]["ENGINE"].endswith("sqlite3")
+        else "HOST"
+    )
+    DATABASES[alias] = {
+        **DATABASES["default"],
+        location_key: location,
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS[alias] = int(weight or 1)
+
+# Shards for the ticketing tables, as locations separated by commas (hosts
+# for PostgreSQL, files for SQLite), e.g. DB_SHARDS="db_shard_1.sqlite3".
+# The default database is the first shard (see cinema_api.db.sharding).
+
+DATABASE_SHARDS = ["default"]
+
+for index, location in enumerate(
+    filter(None, os.getenv("DB_SHARDS", "").split(",")), start=1
+):
+    alias = f"shard_{index}"
+    location_key = (
+        "NAME"
+        if DATABASES["default"]["ENGINE"].endswith("sqlite3")
+        else "HOST"
+    )
+    DATABASES[alias] = {**DATABASES["default"], location_key: location}
+    DATABASE_SHARDS.append(alias)
+
+# Models whose rows live on the shard of their cinema hall; the catalog
+# models are copied to every shard, so that sharded rows can join them
+SHARDED_MODELS = [
+    "cinema.moviesession",
+    "cinema.order",
+    "cinema.ticket",
+    "cinema.archivedticket",
+    "cinema.sessionoccupancy",
+    "cinema.moviedaysales",
+    "cinema.halldayoccupancy",
+    "cinema.bookingrequest",
+    "cinema.idempotencykey",
+    "cinema.outboxevent",
+    "cinema.outboxcheckpoint",
+]
+SHARD_BROADCAST_MODELS = ["cinema.cinemahall", "cinema.movie"]
+
+# Halls with consecutive ids, i.e. usually a cinema, share a shard
+SHARD_HALLS_PER_GROUP = 10
+
+# Each shard numbers its sharded rows from index << SHARD_ID_BITS
+SHARD_ID_BITS = 48
+
+# How long `manage.py rebalance_shards` lets writes in flight finish
+# before copying a group of halls
+SHARD_MOVE_GRACE_SECONDS = 5
+
+DATABASE_ROUTERS = [
+    "cinema_api.db.routers.ShardRouter",
+    "cinema_api.db.routers.ReplicaRouter",
+]
+
+# Apps whose reads may be served by a replica
+REPLICA_APPS = ["cinema"]
+
+# How long a client's reads stay on the primary after it writes
+REPLICA_PIN_SECONDS = 5
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -153,14 +249,38 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "user.authentication.AsyncJWTAuthentication",
     ),
-    "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    # drf_spectacular's AutoSchema is only switched in while building the
+    # schema (see cinema_api.schema), so that serving the API never
+    # imports it.
     "DEFAULT_THROTTLE_CLASSES": [
-        "rest_framework.throttling.AnonRateThrottle",
-        "rest_framework.throttling.UserRateThrottle",
+        "cinema.throttling.AnonGCRAThrottle",
+        "cinema.throttling.UserGCRAThrottle",
+        "cinema.throttling.ScopedGCRAThrottle",
     ],
     # "DEFAULT_THROTTLE_RATES": {"anon": "10/day", "user": "30/day"},
+    "DEFAULT_THROTTLE_RATES": {
+        "anon": None,
+        "user": None,
+        "catalog": "1200/min",
+        "orders": "30/min",
+    },
+}
+
+# Serve the hot catalog reads (movies, sessions, seat maps) with native
+# async views when running under ASGI
+ASYNC_READ_VIEWS = os.getenv("ASYNC_READ_VIEWS", "false").lower() == "true"
+
+# Upper bound for one POST /api/cinema/movie_sessions/bulk/
+BULK_SCHEDULE_MAX_SESSIONS = 10000
+
+THROTTLE_STORE = {
+    "BACKEND": "cinema.throttling.SharedMemoryStore",
+    "OPTIONS": {
+        "path": os.getenv("THROTTLE_STORE_PATH"),
+        "slots": 65536,
+    },
 }
 
 SIMPLE_JWT = {
@@ -170,11 +290,59 @@ SIMPLE_JWT = {
     "BLACKLIST_AFTER_ROTATION": True,
 }
 
+# Built by `manage.py build_schema` and served by /api/schema/
+SCHEMA_ARTIFACT_DIR = BASE_DIR / "build" / "schema"
+SCHEMA_CACHE_SECONDS = 3600
+
+# Response compression (see cinema_api.compression)
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_CONTENT_TYPES = [
+    "application/json",
+    "application/vnd.oai.openapi",
+    "application/vnd.oai.openapi+json",
+]
+COMPRESSION_CACHE = "default"
+COMPRESSION_CACHE_SECONDS = 300
+
+# Change events of cinema writes (see cinema.outbox)
+OUTBOX_CONSUMERS = {}
+# how long a skipped event id is looked for again (longer than write
+# transactions take; ids of rolled back ones never show up)
+OUTBOX_GAP_TIMEOUT_SECONDS = 60
+OUTBOX_RETENTION_SECONDS = 24 * 3600
+
+# Background jobs of `manage.py run_workers` (see cinema.jobs)
+JOB_QUEUE_CONCURRENCY = {"images": 2}
+JOB_SCHEDULE = {
+    "purge-idempotency-keys": {
+        "task": "cinema.tasks.purge_idempotency_keys",
+        "every": 3600,
+    },
+}
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_BACKOFF_SECONDS = 10
+# running jobs without a heartbeat for JOB_TIMEOUT_SECONDS are retried
+JOB_HEARTBEAT_SECONDS = 30
+JOB_TIMEOUT_SECONDS = 300
+JOB_RETENTION_SECONDS = 7 * 24 * 3600
+
+# Responses of orders created with an Idempotency-Key (cinema.idempotency)
+IDEMPOTENCY_KEY_TTL_SECONDS = 24 * 3600
+
+# Uploaded movie images are shrunk to fit (cinema.tasks)
+MOVIE_IMAGE_MAX_SIZE = (1200, 1800)
+
+# /api/batch/ (see cinema_api.batch)
+BATCH_PREFIXES = ["/api/cinema/", "/api/user/"]
+BATCH_MAX_REQUESTS = 20
+BATCH_MAX_WORKERS = 4
+
 SPECTACULAR_SETTINGS = {
     "TITLE": "Cinema Service API",
     "DESCRIPTION": "Order cinema tickets",
     "VERSION": "1.0.0",
     "SERVE_INCLUDE_SCHEMA": False,
+    "PREPROCESSING_HOOKS": ["cinema.schema.preprocess_endpoints"],
     "SWAGGER_UI_SETTINGS": {
         "deepLinking": True,
         "defaultModelRendering": "model",
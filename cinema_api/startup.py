@@ -0,0 +1,131 @@
+"""
+Startup cost of a worker process, and warming one up before it forks.
+
+``probe()`` boots the project the way ``wsgi.py`` does and times each
+phase: importing the apps and their models, every ``AppConfig.ready()``
+and the first request, which imports the URLconf and views. ``manage.py
+startup_profile`` runs it in a fresh interpreter under ``-X importtime``
+(this process has imported everything already) and reports the slowest
+modules next to those timings.
+
+``warm_up()`` does the work of a first request up front, for prefork
+servers that load the application once before forking workers (see
+``cinema_api.wsgi.create_app``).
+
+Only the standard library is imported at module level, so that the probe
+sees every other import.
+"""
+import json
+import sys
+import time
+
+IMPORT_TIME_PREFIX = "import time:"
+
+
+def timed(timings, key, function):
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            timings[key] = time.perf_counter() - started
+
+    return wrapper
+
+
+def probe(path, host):
+    """Boot like ``wsgi.py``, request ``path`` and print the timings"""
+    started = time.perf_counter()
+    from django.apps.config import AppConfig
+
+    apps = {}
+    create = AppConfig.create
+
+    def create_timed(entry):
+        app_started = time.perf_counter()
+        app_config = create(entry)
+        app_timings = apps[app_config.label] = {
+            "import": time.perf_counter() - app_started
+        }
+        app_config.import_models = timed(
+            app_timings, "models", app_config.import_models
+        )
+        app_config.ready = timed(app_timings, "ready", app_config.ready)
+        return app_config
+
+    AppConfig.create = create_timed
+    phases = {}
+    from django.core.wsgi import get_wsgi_application
+
+    phases["import django"] = time.perf_counter() - started
+    application = timed(phases, "setup", get_wsgi_application)()
+
+    environ = {
+        "REQUEST_METHOD": "GET",
+        "PATH_INFO": path,
+        "QUERY_STRING": "",
+        "SERVER_NAME": host,
+        "SERVER_PORT": "80",
+        "HTTP_HOST": host,
+        "wsgi.url_scheme": "http",
+        "wsgi.input": sys.stdin.buffer,
+        "wsgi.errors": sys.stderr,
+    }
+    response = {}
+
+    def start_response(status, headers, exc_info=None):
+        response["status"] = status
+
+    timed(phases, "first request", application)(environ, start_response)
+    phases["second request"] = time.perf_counter()
+    application(environ, start_response)
+    phases["second request"] = time.perf_counter() - phases["second request"]
+
+    print(
+        json.dumps(
+            {
+                "phases": phases,
+                "apps": apps,
+                "status": response.get("status"),
+                "total": time.perf_counter() - started,
+            }
+        )
+    )
+
+
+def parse_import_times(lines):
+    """``{module: (self seconds, cumulative seconds)}`` from -X importtime"""
+    modules = {}
+    for line in lines:
+        if not line.startswith(IMPORT_TIME_PREFIX):
+            continue
+        own, cumulative, name = line[len(IMPORT_TIME_PREFIX):].split("|")
+        if not own.strip().isdigit():
+            # the header line
+            continue
+        modules[name.strip()] = (
+            int(own) / 1_000_000,
+            int(cumulative) / 1_000_000,
+        )
+
+    return modules
+
+
+def warm_up():
+    """
+    Import what the first request would: the URLconf, every view it
+    routes to, including the lazily imported ones, and the serializers
+    they use
+    """
+    from django.urls import URLResolver, get_resolver
+
+    def walk(resolver):
+        for pattern in resolver.url_patterns:
+            if isinstance(pattern, URLResolver):
+                walk(pattern)
+                continue
+            load = getattr(pattern.callback, "load", None)
+            if load is not None:
+                load()
+
+    walk(get_resolver())
@@ -18,25 +18,32 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
-from drf_spectacular.views import (
-    SpectacularAPIView,
-    SpectacularSwaggerView,
-    SpectacularRedocView
-)
+
+from cinema_api.batch import BatchView
+from cinema_api.schema import schema_view
+from cinema_api.views import lazy_view, readiness
 
 urlpatterns = [
                   path("admin/", admin.site.urls),
                   path("api/cinema/", include("cinema.urls", namespace="cinema")),
                   path("api/user/", include("user.urls", namespace="user")),
-                  path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
+                  path("api/batch/", BatchView.as_view(), name="batch"),
+                  path("api/health/ready/", readiness, name="readiness"),
+                  path("api/schema/", schema_view, name="schema"),
                   path(
                       "api/doc/swagger/",
-                      SpectacularSwaggerView.as_view(url_name="schema"),
+                      lazy_view(
+                          "drf_spectacular.views.SpectacularSwaggerView",
+                          url_name="schema",
+                      ),
                       name="swagger-ui",
                   ),
                   path(
                       "api/doc/redoc/",
-                      SpectacularRedocView.as_view(url_name="schema"),
+                      lazy_view(
+                          "drf_spectacular.views.SpectacularRedocView",
+                          url_name="schema",
+                      ),
                       name="redoc",
                   ),
               ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -0,0 +1,69 @@
+import logging
+import time
+from functools import lru_cache
+
+from django.db import connections
+from django.db.utils import DatabaseError
+from django.http import JsonResponse
+from django.utils.module_loading import import_string
+from django.views.decorators.http import require_GET
+
+from cinema_api.db.pool import get_pool_stats
+
+logger = logging.getLogger(__name__)
+
+
+@require_GET
+def readiness(request):
+    """
+    Report whether every database answers a query, with pool usage.
+
+    Responds 503 when a database is unreachable or when requests are
+    already queuing for a pooled connection. Connection errors are only
+    logged: the probe is public and they name hosts and users.
+    """
+    pools = get_pool_stats()
+    databases = {}
+    ready = True
+
+    for alias in connections:
+        started = time.perf_counter()
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute("SELECT 1")
+        except DatabaseError:
+            logger.exception("Database %r is unavailable", alias)
+            databases[alias] = {"available": False}
+            ready = False
+            continue
+
+        pool = pools.get(alias)
+        databases[alias] = {
+            "available": True,
+            "latency_ms": round((time.perf_counter() - started) * 1000, 2),
+            "pool": pool,
+        }
+        if pool and pool["waiting"]:
+            ready = False
+
+    return JsonResponse(
+        {"ready": ready, "databases": databases},
+        status=200 if ready else 503,
+    )
+
+
+def lazy_view(view_path, **initkwargs):
+    """
+    Class-based view that is only imported on its first request, to keep
+    rarely used heavy modules out of the URLconf import. ``view.load()``
+    imports it ahead of time (see ``cinema_api.startup.warm_up``).
+    """
+    @lru_cache(maxsize=None)
+    def get_view():
+        return import_string(view_path).as_view(**initkwargs)
+
+    def view(request, *args, **kwargs):
+        return get_view()(request, *args, **kwargs)
+
+    view.load = get_view
+    return view
@@ -1,7 +1,9 @@
 """
 WSGI config for cinema_api project.
 
-It exposes the WSGI callable as a module-level variable named ``application``.
+It exposes the WSGI callable as a module-level variable named ``application``,
+and ``create_app()`` returning it warmed up, for servers that load it once
+before forking workers (``gunicorn --preload "cinema_api.wsgi:create_app()"``).
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/wsgi/
@@ -14,3 +16,12 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "cinema_api.settings")
 
 application = get_wsgi_application()
+
+
+def create_app(warm=True):
+    """``application``, with the first request's imports done if ``warm``"""
+    if warm:
+        from cinema_api.startup import warm_up
+
+        warm_up()
+    return application
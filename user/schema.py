@@ -0,0 +1,9 @@
+"""
+OpenAPI extensions for the user app, imported only when the schema is
+generated.
+"""
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+
+
+class AsyncJWTScheme(SimpleJWTScheme):
+    target_class = "user.authentication.AsyncJWTAuthentication"